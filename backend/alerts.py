@@ -0,0 +1,89 @@
+import os
+import uuid
+from datetime import datetime
+from typing import List
+from cache import TTLCache
+
+# Budget threshold alerts. Transaction writes already come back with the affected
+# categories' refreshed spending (the running totals the schema's triggers keep),
+# so evaluating a write is a comparison with the level last seen for each category,
+# never a rescan. An alert is recorded when spending crosses a threshold upwards;
+# falling back below the threshold resolves it, so the next crossing alerts again.
+
+# Percentages of a category's budget
+BUDGET_ALERT_THRESHOLDS = sorted(
+    float(threshold) for threshold in os.environ.get("BUDGET_ALERT_THRESHOLDS", "80,100,120").split(",")
+)
+# Last-seen levels are per process; other workers' crossings show up once this expires
+ALERT_LEVELS_TTL_SECONDS = float(os.environ.get("ALERT_LEVELS_TTL_SECONDS", "300"))
+ALERT_LEVELS_MAX_USERS = int(os.environ.get("ALERT_LEVELS_MAX_USERS", "1024"))
+
+def alert_level(percentage_used: float, thresholds: List[float] = BUDGET_ALERT_THRESHOLDS) -> float:
+    """The highest threshold `percentage_used` has reached, or 0"""
+    level = 0
+    for threshold in thresholds:
+        if percentage_used >= threshold:
+            level = threshold
+    return level
+
+def new_alert(category: dict, threshold: float):
+    return {
+        "id": str(uuid.uuid4()),
+        "category_id": category['id'],
+        "category_name": category['name'],
+        "threshold": threshold,
+        "percentage_used": round(category['percentage_used'], 2),
+        "total_spent": category['total_spent'],
+        "budget_amount": category['budget_amount'],
+        "created_at": datetime.now().isoformat()
+    }
+
+class AlertEngine:
+    def __init__(self, storage, thresholds: List[float] = BUDGET_ALERT_THRESHOLDS):
+        self.storage = storage
+        self.thresholds = thresholds
+        # user_id -> {category_id: level}, seeded from the user's active alerts
+        self._levels = TTLCache(maxsize=ALERT_LEVELS_MAX_USERS, ttl=ALERT_LEVELS_TTL_SECONDS)
+        self.raised = 0
+
+    async def _user_levels(self, user_id: str):
+        levels = self._levels.get(user_id)
+        if levels is None:
+            levels = await self.storage.active_alert_levels(user_id)
+            self._levels.set(user_id, levels)
+        return levels
+
+    async def evaluate(self, user_id: str, categories: List[dict]) -> List[dict]:
+        """Record alerts for the thresholds these categories' spending crossed.
+
+        `categories` are in the shape of category_with_spending, after a write.
+        Storage is only touched when a category's level changed. Returns the new
+        alerts, one per category: the highest threshold crossed.
+        """
+        if not self.thresholds or not categories:
+            return []
+        levels = await self._user_levels(user_id)
+        raised = []
+        for category in categories:
+            level = alert_level(category['percentage_used'], self.thresholds)
+            previous = levels.get(category['id'], 0)
+            if level < previous:
+                await self.storage.resolve_budget_alerts(user_id, category['id'], level)
+            elif level > previous:
+                # Every threshold passed is recorded, so each one resolves on its own later
+                crossed = [threshold for threshold in self.thresholds if previous < threshold <= level]
+                recorded = await self.storage.record_budget_alerts(
+                    user_id, [new_alert(category, threshold) for threshold in crossed]
+                )
+                if recorded:
+                    raised.append(max(recorded, key=lambda alert: alert['threshold']))
+            levels[category['id']] = level
+        self.raised += len(raised)
+        return raised
+
+    def forget(self, user_id: str, category_ids: List[str]):
+        """Drop deleted categories' levels; their alerts went with them"""
+        levels = self._levels.get(user_id)
+        if levels is not None:
+            for category_id in category_ids:
+                levels.pop(category_id, None)
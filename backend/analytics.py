@@ -0,0 +1,66 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+# Time-bucketed spending for the analytics endpoint. Storage backends do the
+# grouping in the database; these helpers only name the buckets and fill gaps.
+
+SERIES_INTERVALS = ("day", "week", "month")
+
+# How far back a series reaches when the caller gives no start_date
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 6}
+# Longest series one request may ask for; every bucket is built and zero-filled here
+SERIES_MAX_BUCKETS = int(os.environ.get("SERIES_MAX_BUCKETS", "731"))
+
+def truncate(value: datetime, interval: str) -> date:
+    """Start of the bucket containing `value`; weeks start on Monday like date_trunc"""
+    day = value.date() if isinstance(value, datetime) else value
+    if interval == "month":
+        return day.replace(day=1)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def next_bucket(bucket: date, interval: str) -> date:
+    if interval == "month":
+        return date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+    return bucket + timedelta(days=7 if interval == "week" else 1)
+
+def default_start(interval: str, now: Optional[datetime] = None) -> datetime:
+    bucket = truncate(now or datetime.now(), interval)
+    for _ in range(DEFAULT_BUCKETS[interval] - 1):
+        if interval == "month":
+            bucket = (bucket - timedelta(days=1)).replace(day=1)
+        else:
+            bucket -= timedelta(days=7 if interval == "week" else 1)
+    return datetime.combine(bucket, datetime.min.time())
+
+def bucket_count(start: datetime, end: datetime, interval: str) -> int:
+    """Number of buckets bucket_range(start, end, interval) returns, without building them"""
+    first = truncate(start, interval)
+    last = truncate(end, interval)
+    if interval == "month":
+        months = (last.year - first.year) * 12 + last.month - first.month
+        return max(months + 1, 0)
+    return max((last - first).days // (7 if interval == "week" else 1) + 1, 0)
+
+def bucket_range(start: datetime, end: datetime, interval: str) -> List[str]:
+    buckets = []
+    bucket = truncate(start, interval)
+    last = truncate(end, interval)
+    while bucket <= last:
+        buckets.append(bucket.isoformat())
+        bucket = next_bucket(bucket, interval)
+    return buckets
+
+def fill_series(rows: List[dict], buckets: List[str]) -> List[dict]:
+    """One point per bucket, zero-filled where nothing was spent"""
+    by_bucket: Dict[str, dict] = {row["bucket"]: row for row in rows}
+    return [
+        {
+            "bucket": bucket,
+            "total_spent": by_bucket[bucket]["total_spent"] if bucket in by_bucket else 0,
+            "transactions_count": by_bucket[bucket]["transactions_count"] if bucket in by_bucket else 0
+        }
+        for bucket in buckets
+    ]
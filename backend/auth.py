@@ -0,0 +1,99 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from fastapi import HTTPException, Request
+
+# Requests are scoped to the user in a Supabase access token: an HS256 JWT signed
+# with the project's JWT secret, whose `sub` claim is the user id.
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET")
+# Without a JWT secret (local development) every request acts as this user,
+# which also owns the rows created before data was scoped per user
+DEFAULT_USER_ID = os.environ.get("DEFAULT_USER_ID", "00000000-0000-0000-0000-000000000001")
+# Users allowed to run maintenance that spans every user's data (rollup rebuilds);
+# comma-separated ids. Without a JWT secret everyone is, as there is only one user.
+ADMIN_USER_IDS = {user_id.strip() for user_id in os.environ.get("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+# Audience Supabase issues signed-in users' access tokens for
+JWT_AUDIENCE = os.environ.get("JWT_AUDIENCE", "authenticated")
+# Allowed clock skew when checking exp/nbf
+JWT_LEEWAY_SECONDS = int(os.environ.get("JWT_LEEWAY_SECONDS", "30"))
+# Shared secret a metrics scraper sends as a Bearer token to read /api/metrics and
+# /api/cache/stats; without it only ADMIN_USER_IDS can read them
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+def unauthorized(detail: str):
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+def b64url_decode(segment: str):
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def decode_token(token: str, secret: str):
+    """Verify an HS256 JWT and return its claims"""
+    try:
+        header_segment, payload_segment, signature_segment = token.split(".")
+        header = json.loads(b64url_decode(header_segment))
+        claims = json.loads(b64url_decode(payload_segment))
+        signature = b64url_decode(signature_segment)
+    except ValueError:
+        raise unauthorized("Malformed access token")
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise unauthorized("Malformed access token")
+
+    if header.get("alg") != "HS256":
+        raise unauthorized("Unsupported token algorithm")
+    expected = hmac.new(secret.encode(), f"{header_segment}.{payload_segment}".encode(), hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise unauthorized("Invalid token signature")
+
+    for claim in ("exp", "nbf"):
+        # bool is an int subclass, but never a timestamp
+        if claim in claims and (not isinstance(claims[claim], (int, float)) or isinstance(claims[claim], bool)):
+            raise unauthorized("Malformed access token")
+    now = time.time()
+    if "exp" in claims and now > claims["exp"] + JWT_LEEWAY_SECONDS:
+        raise unauthorized("Access token expired")
+    if "nbf" in claims and now < claims["nbf"] - JWT_LEEWAY_SECONDS:
+        raise unauthorized("Access token not yet valid")
+
+    # aud may be a single string or a list of them
+    audience = claims.get("aud")
+    audiences = audience if isinstance(audience, list) else [audience]
+    if JWT_AUDIENCE not in audiences:
+        raise unauthorized("Access token is not for this audience")
+    return claims
+
+async def current_user_id(request: Request) -> str:
+    """FastAPI dependency returning the id of the user making the request.
+
+    The token comes from `Authorization: Bearer`, or from `?access_token=` for
+    clients that cannot set headers (EventSource).
+    """
+    if not SUPABASE_JWT_SECRET:
+        return DEFAULT_USER_ID
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = request.query_params.get("access_token")
+    if not token:
+        raise unauthorized("Missing access token")
+
+    user_id = decode_token(token.strip(), SUPABASE_JWT_SECRET).get("sub")
+    if not user_id or not isinstance(user_id, str):
+        raise unauthorized("Access token has no subject")
+    return user_id
+
+async def admin_user_id(request: Request) -> str:
+    """Like current_user_id, for endpoints limited to ADMIN_USER_IDS"""
+    user_id = await current_user_id(request)
+    if SUPABASE_JWT_SECRET and user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    return user_id
+
+async def metrics_reader(request: Request) -> str:
+    """Dependency for the operational endpoints: a METRICS_TOKEN bearer or an admin"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if METRICS_TOKEN and scheme.lower() == "bearer" and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+        return "metrics"
+    return await admin_user_id(request)
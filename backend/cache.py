@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Used for the hot read endpoints; writers invalidate the keys they affect
+    so a stale entry never outlives the mutation that made it stale.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation; lets a slow load avoid storing a result
+        # that a write made stale while it was running
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, generation=None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        self.generation += 1
+        for key in keys:
+            if self._entries.pop(key, _MISSING) is not _MISSING:
+                self.invalidations += 1
+
+    def invalidate_prefix(self, prefix: str):
+        """Drop every key starting with `prefix`, for families of parameterised entries"""
+        self.invalidate(*[key for key in self._entries if key.startswith(prefix)])
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / lookups) if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+class SingleFlight:
+    """Collapses concurrent identical reads into one in-flight call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving while
+    it runs await the same task and get the very same result object (or
+    exception), so `fn` should return something immutable (bytes, tuples of
+    them) that each caller decodes into its own copy. The task is shielded,
+    so a disconnecting caller does not cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def forget(self):
+        """Let callers after a write start fresh calls instead of joining older ones"""
+        self._calls.clear()
+
+    def stats(self):
+        total = self.calls + self.coalesced
+        return {
+            "in_flight": len(self),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": (self.coalesced / total) if total else 0
+        }
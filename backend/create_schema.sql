@@ -18,26 +18,547 @@ CREATE TABLE IF NOT EXISTS transactions (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Create user profile and settings tables (one row per user)
+CREATE TABLE IF NOT EXISTS user_profiles (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID NOT NULL UNIQUE,
+    name VARCHAR,
+    email VARCHAR,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS user_settings (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID NOT NULL UNIQUE,
+    dark_mode BOOLEAN DEFAULT FALSE,
+    notifications BOOLEAN DEFAULT TRUE,
+    currency VARCHAR DEFAULT 'USD',
+    language VARCHAR DEFAULT 'en',
+    timezone VARCHAR DEFAULT 'America/New_York',
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- save_profile/save_settings upsert ON CONFLICT (user_id), which needs a unique index.
+-- Tables created before this script only get one through the migration below: each
+-- user's most recently updated row is kept, then the index is added.
+DELETE FROM user_profiles WHERE ctid IN (
+    SELECT ctid FROM (
+        SELECT ctid, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST
+        ) AS position
+        FROM user_profiles
+    ) ranked
+    WHERE position > 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_profiles_user_id ON user_profiles(user_id);
+
+DELETE FROM user_settings WHERE ctid IN (
+    SELECT ctid FROM (
+        SELECT ctid, ROW_NUMBER() OVER (
+            PARTITION BY user_id ORDER BY updated_at DESC NULLS LAST, created_at DESC NULLS LAST
+        ) AS position
+        FROM user_settings
+    ) ranked
+    WHERE position > 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_settings_user_id ON user_settings(user_id);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_transactions_category_id ON transactions(category_id);
 CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
 CREATE INDEX IF NOT EXISTS idx_categories_name ON budget_categories(name);
 
+-- Multi-user tenancy: every category and transaction belongs to one user (the `sub`
+-- of the caller's access token). Rows from before this belong to the former test user.
+ALTER TABLE budget_categories ADD COLUMN IF NOT EXISTS user_id UUID;
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS user_id UUID;
+UPDATE budget_categories SET user_id = '00000000-0000-0000-0000-000000000001' WHERE user_id IS NULL;
+UPDATE transactions t
+SET user_id = COALESCE(
+    (SELECT c.user_id FROM budget_categories c WHERE c.id = t.category_id),
+    '00000000-0000-0000-0000-000000000001'
+)
+WHERE user_id IS NULL;
+ALTER TABLE budget_categories ALTER COLUMN user_id SET NOT NULL;
+ALTER TABLE transactions ALTER COLUMN user_id SET NOT NULL;
+
+-- Every API read filters on user_id first, so these per-user indexes keep a request's
+-- cost proportional to one user's rows. The keyset pagination indexes for
+-- GET /api/transactions, ordered by (date, id), lead with user_id too.
+DROP INDEX IF EXISTS idx_transactions_date_id;
+DROP INDEX IF EXISTS idx_transactions_category_date_id;
+CREATE INDEX IF NOT EXISTS idx_categories_user_created ON budget_categories(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id ON transactions(user_id, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date_id ON transactions(user_id, category_id, date DESC, id DESC);
+
+-- Maintained per-category spending totals, kept in step with transactions by a trigger
+-- so reads cost O(categories) instead of re-summing every transaction
+CREATE TABLE IF NOT EXISTS category_totals (
+    category_id UUID PRIMARY KEY REFERENCES budget_categories(id) ON DELETE CASCADE,
+    total_spent DECIMAL(14,2) NOT NULL DEFAULT 0,
+    transactions_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION apply_transaction_to_category_totals() RETURNS TRIGGER AS $$
+BEGIN
+    -- Take the old row out first; a plain UPDATE so cascaded deletes of a category are no-ops
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE category_totals
+        SET total_spent = total_spent - OLD.amount,
+            transactions_count = transactions_count - 1
+        WHERE category_id = OLD.category_id;
+    END IF;
+    -- Then add the new row, which moves the amount when category_id changed
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.category_id IS NOT NULL THEN
+        INSERT INTO category_totals (category_id, total_spent, transactions_count)
+        VALUES (NEW.category_id, NEW.amount, 1)
+        ON CONFLICT (category_id) DO UPDATE
+        SET total_spent = category_totals.total_spent + EXCLUDED.total_spent,
+            transactions_count = category_totals.transactions_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_category_totals ON transactions;
+CREATE TRIGGER transactions_category_totals
+AFTER INSERT OR DELETE OR UPDATE OF category_id, amount ON transactions
+FOR EACH ROW EXECUTE FUNCTION apply_transaction_to_category_totals();
+
+-- Reconciliation: rebuild category_totals from scratch (POST /rest/v1/rpc/rebuild_category_totals)
+CREATE OR REPLACE FUNCTION rebuild_category_totals() RETURNS void AS $$
+BEGIN
+    -- Block concurrent transaction writes so the rebuilt totals are exact
+    LOCK TABLE transactions IN SHARE MODE;
+    DELETE FROM category_totals WHERE TRUE;
+    INSERT INTO category_totals (category_id, total_spent, transactions_count)
+    SELECT category_id, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY category_id;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_category_totals();
+
+-- Delta sync (GET ...?since=): change timestamps and tombstones for deleted rows
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+DROP INDEX IF EXISTS idx_transactions_updated_at;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_updated_at ON transactions(user_id, updated_at, id);
+
+-- A category's spending changes whenever its totals row does
+ALTER TABLE category_totals ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS category_totals_touch ON category_totals;
+CREATE TRIGGER category_totals_touch
+BEFORE INSERT OR UPDATE ON category_totals
+FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Every change timestamp comes from the database clock, never the API server's, so
+-- ?since= watermarks (taken from database_now() below) compare against one clock
+DROP TRIGGER IF EXISTS transactions_touch ON transactions;
+CREATE TRIGGER transactions_touch
+BEFORE INSERT OR UPDATE ON transactions
+FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS budget_categories_touch ON budget_categories;
+CREATE TRIGGER budget_categories_touch
+BEFORE INSERT OR UPDATE ON budget_categories
+FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Current time as the TIMESTAMP columns above store it (POST /rest/v1/rpc/database_now)
+CREATE OR REPLACE FUNCTION database_now() RETURNS TIMESTAMP AS $$
+    SELECT LOCALTIMESTAMP;
+$$ LANGUAGE sql STABLE;
+
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    table_name VARCHAR NOT NULL,
+    id UUID NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (table_name, id)
+);
+
+-- Tombstones are read per user, like the rows they stand for
+ALTER TABLE deleted_rows ADD COLUMN IF NOT EXISTS user_id UUID;
+UPDATE deleted_rows SET user_id = '00000000-0000-0000-0000-000000000001' WHERE user_id IS NULL;
+ALTER TABLE deleted_rows ALTER COLUMN user_id SET NOT NULL;
+
+DROP INDEX IF EXISTS idx_deleted_rows_deleted_at;
+CREATE INDEX IF NOT EXISTS idx_deleted_rows_user_deleted_at ON deleted_rows(user_id, table_name, deleted_at);
+
+CREATE OR REPLACE FUNCTION record_deleted_row() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO deleted_rows (table_name, id, user_id) VALUES (TG_TABLE_NAME, OLD.id, OLD.user_id)
+    ON CONFLICT (table_name, id) DO UPDATE
+    SET deleted_at = EXCLUDED.deleted_at, user_id = EXCLUDED.user_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_record_deleted ON transactions;
+CREATE TRIGGER transactions_record_deleted
+AFTER DELETE ON transactions
+FOR EACH ROW EXECUTE FUNCTION record_deleted_row();
+
+DROP TRIGGER IF EXISTS budget_categories_record_deleted ON budget_categories;
+CREATE TRIGGER budget_categories_record_deleted
+AFTER DELETE ON budget_categories
+FOR EACH ROW EXECUTE FUNCTION record_deleted_row();
+
 -- Create a view for category spending summary
-CREATE OR REPLACE VIEW category_spending_summary AS
+DROP VIEW IF EXISTS category_spending_summary;
+CREATE VIEW category_spending_summary AS
 SELECT 
     c.id,
+    c.user_id,
     c.name,
     c.budget_amount,
     c.color,
     c.created_at,
     c.updated_at,
-    COALESCE(SUM(t.amount), 0) as total_spent,
-    c.budget_amount - COALESCE(SUM(t.amount), 0) as remaining_budget,
+    COALESCE(ct.total_spent, 0) as total_spent,
+    c.budget_amount - COALESCE(ct.total_spent, 0) as remaining_budget,
     CASE 
-        WHEN c.budget_amount > 0 THEN (COALESCE(SUM(t.amount), 0) / c.budget_amount) * 100
+        WHEN c.budget_amount > 0 THEN (COALESCE(ct.total_spent, 0) / c.budget_amount) * 100
         ELSE 0
-    END as percentage_used
+    END as percentage_used,
+    GREATEST(c.updated_at, ct.updated_at) as changed_at
 FROM budget_categories c
-LEFT JOIN transactions t ON c.id = t.category_id
-GROUP BY c.id, c.name, c.budget_amount, c.color, c.created_at, c.updated_at;
\ No newline at end of file
+LEFT JOIN category_totals ct ON c.id = ct.category_id;
+
+-- Create a one-row-per-user view for the dashboard totals so the API never downloads raw rows;
+-- filtering it on user_id is pushed down to idx_categories_user_created
+DROP VIEW IF EXISTS dashboard_summary;
+CREATE VIEW dashboard_summary AS
+SELECT 
+    c.user_id,
+    COALESCE(SUM(c.budget_amount), 0) as total_budget,
+    COALESCE(SUM(ct.total_spent), 0) as total_spent,
+    COUNT(*) as categories_count,
+    COALESCE(SUM(ct.transactions_count), 0) as transactions_count
+FROM budget_categories c
+LEFT JOIN category_totals ct ON c.id = ct.category_id
+GROUP BY c.user_id;
+
+-- Daily per-category rollups, so history queries cost O(days x categories)
+-- instead of O(transactions). Maintained by trigger like category_totals.
+CREATE TABLE IF NOT EXISTS daily_category_totals (
+    category_id UUID NOT NULL REFERENCES budget_categories(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    total_spent DECIMAL(14,2) NOT NULL DEFAULT 0,
+    transactions_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (category_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_category_totals_day ON daily_category_totals(day);
+
+CREATE OR REPLACE FUNCTION apply_transaction_to_daily_totals() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE daily_category_totals
+        SET total_spent = total_spent - OLD.amount,
+            transactions_count = transactions_count - 1
+        WHERE category_id = OLD.category_id AND day = OLD.date::date;
+        -- Keep only days that still have transactions
+        DELETE FROM daily_category_totals
+        WHERE category_id = OLD.category_id AND day = OLD.date::date AND transactions_count <= 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.category_id IS NOT NULL THEN
+        INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+        VALUES (NEW.category_id, NEW.date::date, NEW.amount, 1)
+        ON CONFLICT (category_id, day) DO UPDATE
+        SET total_spent = daily_category_totals.total_spent + EXCLUDED.total_spent,
+            transactions_count = daily_category_totals.transactions_count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS transactions_daily_totals ON transactions;
+CREATE TRIGGER transactions_daily_totals
+AFTER INSERT OR DELETE OR UPDATE OF category_id, amount, date ON transactions
+FOR EACH ROW EXECUTE FUNCTION apply_transaction_to_daily_totals();
+
+-- Backfill: rebuild daily_category_totals from scratch; safe to re-run
+-- (POST /rest/v1/rpc/rebuild_daily_totals)
+CREATE OR REPLACE FUNCTION rebuild_daily_totals() RETURNS void AS $$
+BEGIN
+    LOCK TABLE transactions IN SHARE MODE;
+    DELETE FROM daily_category_totals WHERE TRUE;
+    INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+    SELECT category_id, date::date, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY category_id, date::date;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_daily_totals();
+
+-- Spending grouped into day/week/month buckets for GET /api/analytics/spending
+-- (POST /rest/v1/rpc/spending_series), read from the daily rollups of one user's
+-- categories; empty buckets are omitted
+DROP FUNCTION IF EXISTS spending_series(TEXT, TIMESTAMP, TIMESTAMP, UUID, BOOLEAN);
+CREATE OR REPLACE FUNCTION spending_series(
+    owner_id UUID,
+    bucket_interval TEXT,
+    start_date TIMESTAMP DEFAULT NULL,
+    end_date TIMESTAMP DEFAULT NULL,
+    filter_category_id UUID DEFAULT NULL,
+    by_category BOOLEAN DEFAULT FALSE
+) RETURNS TABLE (bucket DATE, category_id UUID, total_spent DECIMAL, transactions_count BIGINT) AS $$
+    SELECT date_trunc(bucket_interval, d.day)::date AS bucket,
+           CASE WHEN by_category THEN d.category_id END AS category_id,
+           SUM(d.total_spent) AS total_spent,
+           SUM(d.transactions_count)::bigint AS transactions_count
+    FROM daily_category_totals d
+    WHERE d.category_id IN (SELECT c.id FROM budget_categories c WHERE c.user_id = owner_id)
+      AND (start_date IS NULL OR d.day >= start_date::date)
+      AND (end_date IS NULL OR d.day <= end_date::date)
+      AND (filter_category_id IS NULL OR d.category_id = filter_category_id)
+    GROUP BY 1, 2
+    ORDER BY 1, 2;
+$$ LANGUAGE sql STABLE;
+
+-- Atomic single-row mutations (POST /rest/v1/rpc/<name>). Each user action is one
+-- round trip and one transaction: the ownership check, the write, and the read of
+-- the refreshed spending. They return {"categories": [...]} with the affected rows
+-- of category_spending_summary, or {"error": "..."} when a row is not the owner's.
+CREATE OR REPLACE FUNCTION categories_spending(owner_id UUID, category_ids UUID[]) RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(to_jsonb(s) ORDER BY s.created_at), '[]'::jsonb)
+    FROM category_spending_summary s
+    WHERE s.user_id = owner_id AND s.id = ANY(category_ids);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION create_transaction(owner_id UUID, row_data JSONB) RETURNS JSONB AS $$
+DECLARE
+    new_row transactions := jsonb_populate_record(NULL::transactions, row_data);
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM budget_categories WHERE id = new_row.category_id AND user_id = owner_id) THEN
+        RETURN jsonb_build_object('error', 'Category not found');
+    END IF;
+    INSERT INTO transactions (id, user_id, category_id, amount, description, date, created_at, updated_at)
+    VALUES (new_row.id, owner_id, new_row.category_id, new_row.amount, new_row.description,
+            new_row.date, new_row.created_at, new_row.updated_at);
+    RETURN jsonb_build_object('categories', categories_spending(owner_id, ARRAY[new_row.category_id]));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_transaction(owner_id UUID, target_id UUID, changes JSONB) RETURNS JSONB AS $$
+DECLARE
+    current_row transactions;
+    new_row transactions;
+BEGIN
+    SELECT * INTO current_row FROM transactions WHERE id = target_id AND user_id = owner_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('error', 'Transaction not found');
+    END IF;
+    -- Fields missing from changes keep their current values
+    new_row := jsonb_populate_record(current_row, changes);
+    IF new_row.category_id IS DISTINCT FROM current_row.category_id AND NOT EXISTS (
+        SELECT 1 FROM budget_categories WHERE id = new_row.category_id AND user_id = owner_id
+    ) THEN
+        RETURN jsonb_build_object('error', 'Category not found');
+    END IF;
+    UPDATE transactions
+    SET category_id = new_row.category_id, amount = new_row.amount, description = new_row.description,
+        date = new_row.date, updated_at = new_row.updated_at
+    WHERE id = target_id;
+    RETURN jsonb_build_object('categories',
+        categories_spending(owner_id, ARRAY[current_row.category_id, new_row.category_id]));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION delete_transaction(owner_id UUID, target_id UUID) RETURNS JSONB AS $$
+DECLARE
+    deleted_category_id UUID;
+BEGIN
+    DELETE FROM transactions WHERE id = target_id AND user_id = owner_id
+    RETURNING category_id INTO deleted_category_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('error', 'Transaction not found');
+    END IF;
+    RETURN jsonb_build_object('categories', categories_spending(owner_id, ARRAY[deleted_category_id]));
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_category(owner_id UUID, target_id UUID, changes JSONB) RETURNS JSONB AS $$
+DECLARE
+    current_row budget_categories;
+    new_row budget_categories;
+BEGIN
+    SELECT * INTO current_row FROM budget_categories WHERE id = target_id AND user_id = owner_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('error', 'Category not found');
+    END IF;
+    new_row := jsonb_populate_record(current_row, changes);
+    UPDATE budget_categories
+    SET name = new_row.name, budget_amount = new_row.budget_amount, color = new_row.color,
+        updated_at = new_row.updated_at
+    WHERE id = target_id;
+    RETURN jsonb_build_object('categories', categories_spending(owner_id, ARRAY[target_id]));
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transactions, totals and rollups go with the category through ON DELETE CASCADE
+CREATE OR REPLACE FUNCTION delete_category(owner_id UUID, target_id UUID) RETURNS JSONB AS $$
+BEGIN
+    DELETE FROM budget_categories WHERE id = target_id AND user_id = owner_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('error', 'Category not found');
+    END IF;
+    RETURN jsonb_build_object('categories', '[]'::jsonb);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Batch updates (POST /rest/v1/rpc/update_transactions, update_categories): one
+-- UPDATE ... FROM the list of changes, so rows deleted meanwhile, or not the owner's,
+-- simply match nothing. `updates` is a JSON array of {"id": ..., <changed columns>};
+-- columns missing from an entry keep their values. Returns the ids updated.
+CREATE OR REPLACE FUNCTION update_transactions(owner_id UUID, updates JSONB) RETURNS JSONB AS $$
+    WITH updated AS (
+        UPDATE transactions t
+        SET (category_id, amount, description, date, updated_at) = (
+            SELECT n.category_id, n.amount, n.description, n.date, n.updated_at
+            FROM jsonb_populate_record(t, u.item - 'id' - 'user_id') AS n
+        )
+        FROM jsonb_array_elements(updates) AS u(item)
+        WHERE t.id = (u.item->>'id')::uuid AND t.user_id = owner_id
+        RETURNING t.id
+    )
+    SELECT COALESCE(jsonb_agg(id), '[]'::jsonb) FROM updated;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION update_categories(owner_id UUID, updates JSONB) RETURNS JSONB AS $$
+    WITH updated AS (
+        UPDATE budget_categories c
+        SET (name, budget_amount, color, updated_at) = (
+            SELECT n.name, n.budget_amount, n.color, n.updated_at
+            FROM jsonb_populate_record(c, u.item - 'id' - 'user_id') AS n
+        )
+        FROM jsonb_array_elements(updates) AS u(item)
+        WHERE c.id = (u.item->>'id')::uuid AND c.user_id = owner_id
+        RETURNING c.id
+    )
+    SELECT COALESCE(jsonb_agg(id), '[]'::jsonb) FROM updated;
+$$ LANGUAGE sql;
+
+-- Description search for GET /api/transactions/search (POST /rest/v1/rpc/search_transactions).
+-- Whole words match through the tsvector index; partial and misspelled words through
+-- pg_trgm word similarity. btree_gin lets both GIN indexes lead with user_id, so a
+-- search only visits the caller's rows.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS btree_gin;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_description_fts ON transactions
+    USING GIN (user_id, to_tsvector('simple', COALESCE(description, '')));
+CREATE INDEX IF NOT EXISTS idx_transactions_user_description_trgm ON transactions
+    USING GIN (user_id, description gin_trgm_ops);
+
+-- Best match first (the better of the text rank and the word similarity), then newest
+CREATE OR REPLACE FUNCTION search_transactions(
+    owner_id UUID,
+    query TEXT,
+    filter_category_id UUID DEFAULT NULL,
+    start_date TIMESTAMP DEFAULT NULL,
+    end_date TIMESTAMP DEFAULT NULL,
+    min_amount DECIMAL DEFAULT NULL,
+    max_amount DECIMAL DEFAULT NULL,
+    result_limit INTEGER DEFAULT 50,
+    result_offset INTEGER DEFAULT 0
+) RETURNS TABLE (id UUID, category_id UUID, amount DECIMAL, description TEXT, date TIMESTAMP,
+                 created_at TIMESTAMP, updated_at TIMESTAMP, rank REAL) AS $$
+    SELECT t.id, t.category_id, t.amount, t.description, t.date, t.created_at, t.updated_at,
+           GREATEST(ts_rank(to_tsvector('simple', COALESCE(t.description, '')), q.terms),
+                    word_similarity(query, t.description)) AS rank
+    FROM transactions t, websearch_to_tsquery('simple', query) AS q(terms)
+    WHERE t.user_id = owner_id
+      AND (to_tsvector('simple', COALESCE(t.description, '')) @@ q.terms OR query <% t.description)
+      AND (filter_category_id IS NULL OR t.category_id = filter_category_id)
+      AND (start_date IS NULL OR t.date >= start_date)
+      AND (end_date IS NULL OR t.date <= end_date)
+      AND (min_amount IS NULL OR t.amount >= min_amount)
+      AND (max_amount IS NULL OR t.amount <= max_amount)
+    ORDER BY rank DESC, t.date DESC, t.id DESC
+    LIMIT result_limit OFFSET result_offset;
+$$ LANGUAGE sql STABLE;
+
+-- Budget threshold alerts, raised by the API when a category's spending crosses one
+-- of BUDGET_ALERT_THRESHOLDS (percent of budget) upwards. An alert stays active until
+-- spending falls back below its threshold; the partial unique index lets each
+-- crossing be recorded once however many writes race over it.
+CREATE TABLE IF NOT EXISTS budget_alerts (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    user_id UUID NOT NULL,
+    category_id UUID NOT NULL REFERENCES budget_categories(id) ON DELETE CASCADE,
+    category_name VARCHAR,
+    threshold DECIMAL(6,2) NOT NULL,
+    percentage_used DECIMAL(8,2) NOT NULL,
+    total_spent DECIMAL(12,2) NOT NULL,
+    budget_amount DECIMAL(10,2) NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    read_at TIMESTAMP,
+    resolved_at TIMESTAMP
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_budget_alerts_active ON budget_alerts(category_id, threshold) WHERE resolved_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_budget_alerts_user_created ON budget_alerts(user_id, created_at DESC);
+
+-- PostgREST upserts cannot target a partial index, so the REST backend records
+-- alerts through this function (POST /rest/v1/rpc/record_budget_alerts); returns
+-- the alerts that were new
+CREATE OR REPLACE FUNCTION record_budget_alerts(owner_id UUID, alerts JSONB) RETURNS JSONB AS $$
+DECLARE
+    recorded JSONB := '[]'::jsonb;
+    alert budget_alerts;
+    inserted budget_alerts;
+BEGIN
+    FOR alert IN SELECT * FROM jsonb_populate_recordset(NULL::budget_alerts, alerts) LOOP
+        INSERT INTO budget_alerts (id, user_id, category_id, category_name, threshold, percentage_used,
+                                   total_spent, budget_amount, created_at)
+        SELECT alert.id, owner_id, alert.category_id, alert.category_name, alert.threshold,
+               alert.percentage_used, alert.total_spent, alert.budget_amount, alert.created_at
+        WHERE EXISTS (SELECT 1 FROM budget_categories WHERE id = alert.category_id AND user_id = owner_id)
+        ON CONFLICT (category_id, threshold) WHERE resolved_at IS NULL DO NOTHING
+        RETURNING * INTO inserted;
+        IF FOUND THEN
+            recorded := recorded || to_jsonb(inserted);
+        END IF;
+    END LOOP;
+    RETURN recorded;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Background jobs run by the API's in-process runner (backend/jobs.py): imports,
+-- exports and rollup rebuilds. The queue lives in the API process; these records
+-- keep each job's status, progress and result for the status endpoints, and let a
+-- restarted process fail the jobs its predecessor left unfinished.
+CREATE TABLE IF NOT EXISTS jobs (
+    id UUID PRIMARY KEY,
+    user_id UUID NOT NULL,
+    kind VARCHAR NOT NULL,
+    status VARCHAR NOT NULL CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'cancelled')),
+    params JSONB,
+    progress DECIMAL(5,4),
+    processed INTEGER NOT NULL DEFAULT 0,
+    result JSONB,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC);
+-- The stale-job sweep; only running jobs heartbeat
+DROP INDEX IF EXISTS idx_jobs_unfinished;
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(updated_at) WHERE status = 'running';
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Optional
+
+# In-process pub/sub behind GET /api/events (Server-Sent Events). Each connected
+# client holds a Subscription; write handlers publish change events to the
+# subscriptions of the user who made the change.
+# Events live in this process only, so with several workers each one serves the
+# writes it handled itself.
+
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "256"))
+# Recent events kept for clients reconnecting with Last-Event-ID
+EVENT_HISTORY_SIZE = int(os.environ.get("EVENT_HISTORY_SIZE", "256"))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_RETRY_MS = int(os.environ.get("EVENT_RETRY_MS", "3000"))
+
+# Sent when a client may have missed events; it should refetch what it shows
+RESYNC_EVENT = {"type": "resync", "resync": ["categories", "transactions"]}
+
+def format_sse(event: dict, event_id: Optional[int] = None):
+    # Unnamed SSE events, so one onmessage handler sees every type; the type is in the data
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+class Subscription:
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # Set when the client fell a full queue behind and was dropped
+        self.overflowed = False
+
+class EventBroker:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, history_size: int = EVENT_HISTORY_SIZE):
+        self.queue_size = queue_size
+        # user_id -> that user's subscriptions
+        self._subscribers = {}
+        # (event_id, user_id, event); ids are shared by all users, so each user sees gaps
+        self._history = deque(maxlen=history_size)
+        self._next_id = 1
+        self.published = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+    def has_subscribers(self, user_id: str):
+        return bool(self._subscribers.get(user_id))
+
+    def subscribe(self, user_id: str, last_event_id: Optional[int] = None):
+        """Register a subscriber; replays the user's events after `last_event_id` when still in history"""
+        subscription = Subscription(user_id, self.queue_size)
+        if last_event_id is not None:
+            oldest = self._history[0][0] if self._history else self._next_id
+            missed = [
+                (event_id, event) for event_id, owner, event in self._history
+                if owner == user_id and event_id > last_event_id
+            ]
+            if last_event_id + 1 < oldest or last_event_id >= self._next_id or len(missed) >= self.queue_size:
+                # Too old, or from before a restart: replay cannot be trusted
+                subscription.queue.put_nowait((None, RESYNC_EVENT))
+            else:
+                for entry in missed:
+                    subscription.queue.put_nowait(entry)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def publish(self, user_id: str, event: dict):
+        event_id = self._next_id
+        self._next_id += 1
+        self._history.append((event_id, user_id, event))
+        self.published += 1
+        for subscription in list(self._subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait((event_id, event))
+            except asyncio.QueueFull:
+                # A stalled client must not hold up writers or grow without bound
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+                self.dropped += 1
+        return event_id
+
+    async def stream(self, subscription: Subscription):
+        """SSE text for one subscriber: events, heartbeats, and a final resync if it overflowed"""
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n"
+            while True:
+                if subscription.overflowed and subscription.queue.empty():
+                    yield format_sse(RESYNC_EVENT)
+                    return
+                try:
+                    event_id, event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event, event_id)
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self):
+        return {
+            "subscribers": len(self),
+            "published": self.published,
+            "dropped": self.dropped,
+            "last_event_id": self._next_id - 1
+        }
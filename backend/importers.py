@@ -0,0 +1,99 @@
+import csv
+import io
+import re
+from datetime import datetime
+
+# Streaming parsers for bank exports. Each yields (row_number, fields) one record at a
+# time so an import never holds more than the current batch in memory.
+
+CSV_FORMAT = "csv"
+OFX_FORMAT = "ofx"
+SUPPORTED_FORMATS = (CSV_FORMAT, OFX_FORMAT)
+
+def detect_format(filename: str, content_type: str = None):
+    name = (filename or "").lower()
+    if name.endswith((".ofx", ".qfx")) or (content_type or "").endswith("ofx"):
+        return OFX_FORMAT
+    return CSV_FORMAT
+
+_DATE_ONLY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def normalize_date(value: str):
+    """Bank exports usually carry plain dates; the Transaction model wants a datetime"""
+    return f"{value}T00:00:00" if _DATE_ONLY.match(value) else value
+
+def iter_csv_rows(binary_file):
+    """Yield (line_number, row) for a CSV with category_id, amount, description, date columns"""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        for row in reader:
+            # Skip fully blank lines instead of reporting them as invalid rows
+            if not any((value or "").strip() for value in row.values()):
+                continue
+            yield reader.line_num, {
+                "category_id": (row.get("category_id") or "").strip() or None,
+                "amount": (row.get("amount") or "").strip(),
+                "description": (row.get("description") or "").strip(),
+                "date": normalize_date((row.get("date") or "").strip())
+            }
+    finally:
+        # Leave the upload's file open for the framework to clean up
+        text.detach()
+
+_OFX_TAG = re.compile(r"<(/?)([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+
+def parse_ofx_date(value: str):
+    """OFX dates look like 20240115120000.000[-5:EST]; only the leading digits matter"""
+    digits = re.match(r"\d{14}|\d{12}|\d{8}", value.strip())
+    if not digits:
+        raise ValueError(f"Invalid OFX date: {value}")
+    digits = digits.group(0)
+    formats = {8: "%Y%m%d", 12: "%Y%m%d%H%M", 14: "%Y%m%d%H%M%S"}
+    return datetime.strptime(digits, formats[len(digits)])
+
+def iter_ofx_rows(binary_file):
+    """Yield (transaction_number, row) for each <STMTTRN> block of an OFX 1.x/2.x file.
+
+    Works line by line on both SGML (unclosed leaf tags) and XML flavours.
+    OFX records spending as negative TRNAMT, so amounts are returned sign-flipped
+    and credits come back negative for the caller to skip.
+    """
+    text = io.TextIOWrapper(binary_file, encoding="utf-8", errors="replace", newline="")
+    try:
+        number = 0
+        current = None
+        for line in text:
+            for closing, tag, value in _OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if not closing:
+                        current = {}
+                    elif current is not None:
+                        number += 1
+                        yield number, _ofx_row(current)
+                        current = None
+                elif current is not None and not closing:
+                    current[tag] = value.strip()
+    finally:
+        text.detach()
+
+def _ofx_row(fields: dict):
+    amount = fields.get("TRNAMT", "")
+    try:
+        amount = -float(amount)
+    except ValueError:
+        pass
+    try:
+        date = parse_ofx_date(fields.get("DTPOSTED", "")).isoformat()
+    except ValueError:
+        date = fields.get("DTPOSTED", "")
+    description = fields.get("NAME") or fields.get("MEMO") or ""
+    if fields.get("NAME") and fields.get("MEMO"):
+        description = f"{fields['NAME']} - {fields['MEMO']}"
+    return {
+        "category_id": None,
+        "amount": amount,
+        "description": description,
+        "date": date
+    }
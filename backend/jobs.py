@@ -0,0 +1,303 @@
+import asyncio
+import glob
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+# In-process background jobs. Work that would hold a request open (bulk imports,
+# exports, rollup rebuilds) is submitted here instead: the endpoint returns the job
+# record at once and a fixed pool of worker tasks runs queued jobs in order, so at
+# most JOB_WORKERS of them share the event loop and the database at any time.
+# Records live in the storage backend, so status outlives the process that ran the
+# job; the queue itself does not. Jobs a dead process was running stop heartbeating
+# and are failed by the next process to start. Queued jobs are never swept: nothing
+# tells another process's long wait from a dead one's.
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Jobs waiting for a worker, across all users; submitting past this is refused
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+# Queued plus running jobs one user may have in this process
+JOB_MAX_PER_USER = int(os.environ.get("JOB_MAX_PER_USER", "5"))
+# Progress is written to the job record at most this often
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.environ.get("JOB_PROGRESS_INTERVAL_SECONDS", "1"))
+# Running jobs' records are touched this often, which also picks up cancellations
+# requested through another process
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "30"))
+# Running jobs whose record has not been touched for this long belong to a dead process
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "300"))
+# Finished jobs, and their output files, are deleted after this many days
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", "7"))
+JOB_PRUNE_INTERVAL_SECONDS = float(os.environ.get("JOB_PRUNE_INTERVAL_SECONDS", "3600"))
+# Uploads waiting to be imported and finished exports; must be shared by every
+# process serving the API for results to be downloadable from any of them
+JOB_FILES_DIR = os.environ.get("JOB_FILES_DIR", os.path.join(tempfile.gettempdir(), "budget_bubbles_jobs"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+UNFINISHED_STATUSES = (QUEUED, RUNNING)
+
+class JobRejected(Exception):
+    """The queue, or the user's share of it, is full"""
+
+class JobContext:
+    """Handed to a running job to report progress.
+
+    `processed` counts the job's units of work (rows, steps); `fraction` is its
+    completion in [0, 1] when that is known.
+    """
+
+    def __init__(self, runner: "JobRunner", job_id: str, user_id: str):
+        self.runner = runner
+        self.id = job_id
+        self.user_id = user_id
+        self.processed = 0
+        self.fraction = None
+        self._saved_at = time.monotonic()
+
+    def file_path(self, suffix: str):
+        return self.runner.file_path(self.id, suffix)
+
+    async def progress(self, processed: Optional[int] = None, fraction: Optional[float] = None):
+        if processed is not None:
+            self.processed = processed
+        if fraction is not None:
+            self.fraction = min(max(fraction, 0.0), 1.0)
+        if time.monotonic() - self._saved_at >= JOB_PROGRESS_INTERVAL_SECONDS:
+            await self.save()
+
+    async def save(self):
+        """Write progress to the record; cancels the job when a cancel was requested"""
+        self._saved_at = time.monotonic()
+        job = await self.runner.storage.update_job(self.id, {
+            'progress': self.fraction,
+            'processed': self.processed,
+            'updated_at': datetime.now()
+        })
+        if job is not None and job['cancel_requested']:
+            raise asyncio.CancelledError()
+
+class JobRunner:
+    def __init__(self, storage, workers: int = JOB_WORKERS, queue_size: int = JOB_QUEUE_SIZE,
+                 on_finish: Optional[Callable[[dict], Awaitable[None]]] = None):
+        self.storage = storage
+        self.workers = workers
+        self.queue_size = queue_size
+        # Called with the final record of every job this process ran
+        self.on_finish = on_finish
+        # kind -> async fn(JobContext, params) returning the job's result dict
+        self._handlers: Dict[str, Callable] = {}
+        self._queue = asyncio.Queue()
+        # job_id -> (user_id, kind, params, cleanup) for jobs waiting for a worker
+        self._queued: Dict[str, tuple] = {}
+        # job_id -> (JobContext, task) for jobs being run
+        self._running: Dict[str, tuple] = {}
+        self._tasks = []
+        self._stopping = False
+        self.finished = {SUCCEEDED: 0, FAILED: 0, CANCELLED: 0}
+
+    @property
+    def queued(self):
+        return len(self._queued)
+
+    @property
+    def running(self):
+        return len(self._running)
+
+    def register(self, kind: str, handler: Callable):
+        self._handlers[kind] = handler
+
+    def file_path(self, job_id: str, suffix: str):
+        return os.path.join(JOB_FILES_DIR, f"{job_id}.{suffix}")
+
+    async def start(self):
+        os.makedirs(JOB_FILES_DIR, exist_ok=True)
+        try:
+            stale = await self.storage.fail_stale_jobs(
+                datetime.now() - timedelta(seconds=JOB_STALE_SECONDS), "Interrupted: the server running it stopped"
+            )
+            for job_id in stale:
+                self._remove_files(job_id)
+            if stale:
+                print(f"⚠️ Marked {len(stale)} interrupted job(s) as failed")
+            await self.prune()
+        except Exception as e:
+            print(f"⚠️ Could not clean up job records: {str(e)}")
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self):
+        """Cancel the workers; jobs still queued or running are recorded as failed"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id, (_, _, _, cleanup) in list(self._queued.items()):
+            await self._finish(job_id, FAILED, error="Interrupted: the server stopped before it ran", cleanup=cleanup)
+        self._queued.clear()
+
+    async def submit(self, user_id: str, kind: str, params: Optional[dict] = None,
+                     cleanup: Optional[Callable[[], None]] = None, job_id: Optional[str] = None) -> dict:
+        """Queue a job and return its record.
+
+        `cleanup` runs once the job is over, however it ended. Files the caller
+        prepared at file_path(job_id, ...) for a `job_id` it chose are removed
+        with the job's own.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if len(self._queued) >= self.queue_size:
+            raise JobRejected("Too many jobs are waiting; try again later")
+        if self._user_jobs(user_id) >= JOB_MAX_PER_USER:
+            raise JobRejected(f"At most {JOB_MAX_PER_USER} jobs may be queued or running at once")
+
+        job_id = job_id or str(uuid.uuid4())
+        # Reserved before the first await so concurrent submits see the slot taken
+        self._queued[job_id] = (user_id, kind, params or {}, cleanup)
+        now = datetime.now()
+        try:
+            job = await self.storage.create_job({
+                'id': job_id,
+                'user_id': user_id,
+                'kind': kind,
+                'status': QUEUED,
+                'params': params or {},
+                'created_at': now,
+                'updated_at': now
+            })
+        except Exception:
+            del self._queued[job_id]
+            raise
+        self._queue.put_nowait(job_id)
+        return job
+
+    async def cancel(self, user_id: str, job_id: str) -> Optional[dict]:
+        """Cancel an unfinished job. Returns its record (unchanged when it had already
+        finished), or None when the user has no such job. A job running in another
+        process stops at its next progress write or heartbeat."""
+        job = await self.storage.request_job_cancel(user_id, job_id)
+        if job is None:
+            return await self.storage.get_job(user_id, job_id)
+        if job_id in self._queued:
+            _, _, _, cleanup = self._queued.pop(job_id)
+            return await self._finish(job_id, CANCELLED, cleanup=cleanup)
+        if job_id in self._running:
+            self._running[job_id][1].cancel()
+        return job
+
+    def _user_jobs(self, user_id: str):
+        return (
+            sum(1 for owner, _, _, _ in self._queued.values() if owner == user_id)
+            + sum(1 for context, _ in self._running.values() if context.user_id == user_id)
+        )
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            entry = self._queued.pop(job_id, None)
+            if entry is None:
+                # Cancelled while it waited
+                continue
+            await self._run(job_id, *entry)
+
+    async def _run(self, job_id: str, user_id: str, kind: str, params: dict, cleanup):
+        context = JobContext(self, job_id, user_id)
+        try:
+            job = await self.storage.update_job(job_id, {
+                'status': RUNNING, 'started_at': datetime.now(), 'updated_at': datetime.now()
+            })
+            if job is not None and job['cancel_requested']:
+                raise asyncio.CancelledError()
+            task = asyncio.create_task(self._handlers[kind](context, params))
+            self._running[job_id] = (context, task)
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping:
+                await self._finish(job_id, FAILED, context, error="Interrupted: the server stopped while it ran",
+                                   cleanup=cleanup)
+                raise
+            await self._finish(job_id, CANCELLED, context, cleanup=cleanup)
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+            print(f"❌ Job {job_id} ({kind}) failed: {detail}")
+            await self._finish(job_id, FAILED, context, error=str(detail), cleanup=cleanup)
+        else:
+            await self._finish(job_id, SUCCEEDED, context, result=result, cleanup=cleanup)
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _finish(self, job_id: str, status: str, context: Optional[JobContext] = None,
+                      result: Optional[dict] = None, error: Optional[str] = None, cleanup=None):
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                print(f"⚠️ Could not clean up after job {job_id}: {str(e)}")
+        if status != SUCCEEDED:
+            # A half-written output is of no use to anyone
+            self._remove_files(job_id)
+
+        changes = {'status': status, 'result': result, 'error': error,
+                   'finished_at': datetime.now(), 'updated_at': datetime.now()}
+        if context is not None:
+            changes['processed'] = context.processed
+            changes['progress'] = 1.0 if status == SUCCEEDED else context.fraction
+        self.finished[status] += 1
+        try:
+            job = await self.storage.update_job(job_id, changes)
+        except Exception as e:
+            print(f"⚠️ Could not record the end of job {job_id}: {str(e)}")
+            return None
+        if job is not None and self.on_finish is not None:
+            try:
+                await self.on_finish(job)
+            except Exception as e:
+                print(f"⚠️ Could not report the end of job {job_id}: {str(e)}")
+        return job
+
+    async def _heartbeat(self):
+        last_pruned = time.monotonic()
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            for job_id, (context, task) in list(self._running.items()):
+                try:
+                    await context.save()
+                except asyncio.CancelledError:
+                    if self._stopping:
+                        raise
+                    task.cancel()
+                except Exception as e:
+                    print(f"⚠️ Could not save progress of job {job_id}: {str(e)}")
+            if time.monotonic() - last_pruned >= JOB_PRUNE_INTERVAL_SECONDS:
+                last_pruned = time.monotonic()
+                try:
+                    await self.prune()
+                except Exception as e:
+                    print(f"⚠️ Could not prune old jobs: {str(e)}")
+
+    async def prune(self):
+        """Delete finished jobs past their retention, with their files"""
+        for job_id in await self.storage.prune_jobs(datetime.now() - timedelta(days=JOB_RETENTION_DAYS)):
+            self._remove_files(job_id)
+
+    def _remove_files(self, job_id: str):
+        for path in glob.glob(os.path.join(JOB_FILES_DIR, f"{job_id}.*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            **{f"{status}_total": count for status, count in self.finished.items()}
+        }
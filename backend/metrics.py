@@ -0,0 +1,158 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+
+# Minimal Prometheus-compatible metrics: counters and histograms rendered in the
+# text exposition format served by GET /api/metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def _format_labels(labelnames, values, extra: Tuple[str, str] = None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+    def samples(self):
+        return []
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield "", _format_labels(self.labelnames, labels), value
+
+class Gauge(Metric):
+    """Gauge read from a callback at scrape time, for values owned elsewhere"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, read: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._read = read
+
+    def samples(self):
+        yield "", "", self._read()
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[tuple, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = series
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self):
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labelnames, labels, ("le", _format_value(bound))), cumulative
+            yield "_sum", _format_labels(self.labelnames, labels), total[0]
+            yield "_count", _format_labels(self.labelnames, labels), cumulative
+
+REGISTRY: List[Metric] = []
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+# Metrics recorded by the API
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling API requests, by route template",
+    ["method", "route", "status"]
+)
+
+UPSTREAM_REQUEST_DURATION = Histogram(
+    "supabase_request_duration_seconds",
+    "Latency of Supabase REST calls",
+    ["method", "table", "status"]
+)
+
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "supabase_response_bytes",
+    "Size of Supabase REST response bodies",
+    ["method", "table"],
+    buckets=BYTES_BUCKETS
+)
+
+UPSTREAM_ERRORS = Counter(
+    "supabase_request_errors_total",
+    "Supabase REST calls that failed before a response arrived",
+    ["method", "table"]
+)
+
+class TimingMiddleware:
+    """ASGI middleware recording handler latency per route template.
+
+    Timing stops once the last body chunk is sent, so streaming responses are
+    measured end to end. Unmatched paths share one label to bound cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status[0])
+            )
@@ -0,0 +1,34 @@
+import asyncio
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from storage import create_storage, TOMBSTONE_RETENTION_DAYS
+
+async def reconcile_totals():
+    """Rebuild the maintained category_totals and daily_category_totals aggregates.
+
+    Both rebuilds replace the aggregate wholesale, so this doubles as the
+    (idempotent) backfill for databases created before the rollups existed.
+    Also prunes delta-sync tombstones past their retention.
+    """
+    storage = create_storage()
+    await storage.startup()
+    try:
+        print(f"🔄 Rebuilding category totals using the {storage.name} storage backend...")
+        await storage.rebuild_category_totals()
+        print("✅ Category totals rebuilt from transactions")
+        await storage.rebuild_daily_totals()
+        print("✅ Daily category rollups rebuilt from transactions")
+        await storage.prune_deleted_rows(datetime.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS))
+        print(f"🧹 Pruned deletion tombstones older than {TOMBSTONE_RETENTION_DAYS} days")
+        return True
+    except Exception as e:
+        print(f"❌ Error rebuilding category totals: {str(e)}")
+        return False
+    finally:
+        await storage.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_totals())
@@ -0,0 +1,572 @@
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+import httpx
+from fastapi import HTTPException
+from storage import Storage
+from cache import SingleFlight
+from metrics import Gauge, UPSTREAM_REQUEST_DURATION, UPSTREAM_RESPONSE_BYTES, UPSTREAM_ERRORS
+
+# Supabase configuration
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
+
+# Headers for Supabase requests
+def get_headers():
+    return {
+        'apikey': SUPABASE_KEY,
+        'Authorization': f'Bearer {SUPABASE_KEY}',
+        'Content-Type': 'application/json'
+    }
+
+# Shared async HTTP client for Supabase; opened in the startup hook and closed on shutdown
+# so every request reuses pooled keep-alive connections instead of a fresh TCP/TLS handshake
+SUPABASE_POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "20"))
+SUPABASE_POOL_KEEPALIVE = int(os.environ.get("SUPABASE_POOL_KEEPALIVE", "10"))
+SUPABASE_TIMEOUT = float(os.environ.get("SUPABASE_TIMEOUT", "10"))
+SUPABASE_CONNECT_TIMEOUT = float(os.environ.get("SUPABASE_CONNECT_TIMEOUT", "5"))
+
+http_client: Optional[httpx.AsyncClient] = None
+
+def create_http_client():
+    return httpx.AsyncClient(
+        base_url=f"{SUPABASE_URL}/rest/v1",
+        headers=get_headers(),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_POOL_SIZE,
+            max_keepalive_connections=SUPABASE_POOL_KEEPALIVE
+        ),
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT)
+    )
+
+def get_http_client():
+    global http_client
+    if http_client is None:
+        # Lazily created for callers that run outside the app lifecycle (e.g. scripts)
+        http_client = create_http_client()
+    return http_client
+
+def eq_filters(filters: dict):
+    return {k: f"eq.{v}" for k, v in filters.items()}
+
+def uuid_ids(values: List[str]):
+    """The values that are well-formed UUIDs. PostgREST fails a whole request over one
+    malformed id, while a malformed id can only ever mean a row that does not exist."""
+    valid = []
+    for value in values:
+        try:
+            uuid.UUID(str(value))
+        except ValueError:
+            continue
+        valid.append(value)
+    return valid
+
+def in_filter(values: List[str]):
+    return f"in.({','.join(values)})"
+
+async def supabase_request(method: str, path: str, **kwargs):
+    """Send a request through the shared client, recording latency, status and payload size"""
+    # Label by table or rpc function only; query strings would explode cardinality
+    table = path.lstrip("/")
+    start = time.perf_counter()
+    try:
+        response = await get_http_client().request(method, path, **kwargs)
+    except httpx.HTTPError:
+        UPSTREAM_ERRORS.inc(method, table)
+        raise
+    finally:
+        if method != "GET":
+            # Reads arriving after a write must not join reads that started before it
+            upstream_reads.forget()
+    UPSTREAM_REQUEST_DURATION.observe(time.perf_counter() - start, method, table, str(response.status_code))
+    UPSTREAM_RESPONSE_BYTES.observe(len(response.content), method, table)
+    return response
+
+# Helper functions for Supabase HTTP requests
+# Identical concurrent GETs share one upstream request; writes start a new generation
+upstream_reads = SingleFlight()
+
+Gauge("supabase_reads_total", "Supabase GETs issued upstream", lambda: upstream_reads.calls)
+Gauge("supabase_reads_coalesced_total", "Supabase GETs served by joining an identical in-flight request",
+      lambda: upstream_reads.coalesced)
+
+async def supabase_get(table: str, params: dict = None):
+    """Make GET request to Supabase table"""
+    async def fetch():
+        response = await supabase_request("GET", f"/{table}", params=params)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.text)
+        return response.content
+    key = (table, tuple(sorted((params or {}).items())))
+    # Callers share the immutable body and each parses its own rows, so one caller
+    # editing its result in place can never leak into another request's
+    return json.loads(await upstream_reads.do(key, fetch))
+
+async def supabase_post(table: str, data: dict):
+    """Make POST request to Supabase table"""
+    response = await supabase_request("POST", f"/{table}", json=data)
+    if response.status_code not in [200, 201]:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    
+    # Supabase might return empty response for successful inserts
+    if response.text.strip():
+        return response.json()
+    else:
+        return {"success": True}
+
+async def supabase_patch(table: str, filters: dict, data: dict):
+    """Make PATCH request to Supabase table"""
+    response = await supabase_request(
+        "PATCH",
+        f"/{table}",
+        params=eq_filters(filters),
+        json=data,
+        # Add Prefer header for returning data
+        headers={"Prefer": "return=representation"}
+    )
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    
+    # Supabase might return empty response for successful updates
+    if response.text.strip():
+        try:
+            return response.json()
+        except ValueError:
+            return {"success": True, "message": "Update successful"}
+    else:
+        return {"success": True, "message": "Update successful"}
+
+async def supabase_delete(table: str, filters: dict):
+    """Make DELETE request to Supabase table"""
+    response = await supabase_request(
+        "DELETE",
+        f"/{table}",
+        params=eq_filters(filters),
+        # Add Prefer header for returning data
+        headers={"Prefer": "return=representation"}
+    )
+    
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    
+    # Supabase might return empty response for successful deletes
+    if response.text.strip():
+        try:
+            return response.json()
+        except ValueError:
+            return {"success": True, "message": "Delete successful"}
+    else:
+        return {"success": True, "message": "Delete successful"}
+
+async def supabase_upsert(table: str, rows, on_conflict: str = 'id', returning: bool = False):
+    """Insert rows, updating those that clash on the `on_conflict` unique column(s),
+    in one INSERT ... ON CONFLICT DO UPDATE; returns the written rows when `returning`"""
+    response = await supabase_request(
+        "POST",
+        f"/{table}",
+        params={'on_conflict': on_conflict},
+        json=rows,
+        headers={"Prefer": f"resolution=merge-duplicates,return={'representation' if returning else 'minimal'}"}
+    )
+    if response.status_code not in [200, 201, 204]:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    if returning:
+        return response.json()
+
+async def supabase_delete_in(table: str, column: str, values: List[str], user_id: str):
+    """Delete the user's rows whose `column` is in `values`; returns the deleted ids"""
+    response = await supabase_request(
+        "DELETE",
+        f"/{table}",
+        params={column: in_filter(values), 'user_id': f'eq.{user_id}', 'select': 'id'},
+        headers={"Prefer": "return=representation"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    return [row['id'] for row in response.json()] if response.text.strip() else []
+
+async def supabase_patch_where(table: str, params: dict, data: dict):
+    """PATCH the rows matching PostgREST filter `params`; returns their ids"""
+    response = await supabase_request(
+        "PATCH",
+        f"/{table}",
+        params={**params, 'select': 'id'},
+        json=data,
+        headers={"Prefer": "return=representation"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    return [row['id'] for row in response.json()] if response.text.strip() else []
+
+async def supabase_rpc(function: str, params: dict = None):
+    """Call a Postgres function through PostgREST's /rpc endpoint"""
+    response = await supabase_request("POST", f"/rpc/{function}", json=params or {})
+    if response.status_code not in [200, 204]:
+        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+    
+    if response.text.strip():
+        return response.json()
+    return None
+
+# Statuses of jobs not yet over (jobs.UNFINISHED_STATUSES), as a PostgREST filter
+UNFINISHED_JOBS_FILTER = "in.(queued,running)"
+
+def job_json(job: dict):
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in job.items()}
+
+async def supabase_mutation(function: str, params: dict):
+    """Call one of the atomic mutation functions from create_schema.sql; returns the
+    affected categories with their refreshed spending"""
+    result = await supabase_rpc(function, params)
+    if result.get('error'):
+        raise HTTPException(status_code=404, detail=result['error'])
+    return result['categories']
+
+class RestStorage(Storage):
+    """Storage backed by Supabase's PostgREST API over HTTP"""
+
+    name = "rest"
+
+    def __init__(self):
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            raise Exception("Supabase credentials not configured")
+
+    async def startup(self):
+        global http_client
+        http_client = create_http_client()
+
+    async def shutdown(self):
+        global http_client
+        if http_client is not None:
+            await http_client.aclose()
+            http_client = None
+
+    # Categories
+    async def list_category_spending(self, user_id: str):
+        # Spending totals are aggregated by the category_spending_summary view,
+        # so the whole list costs a single round trip regardless of category count
+        return await supabase_get('category_spending_summary', {
+            'select': '*',
+            'user_id': f'eq.{user_id}',
+            'order': 'created_at.asc'
+        })
+
+    async def list_category_changes(self, user_id: str, since: datetime):
+        # changed_at covers both edits to the category and changes to its totals
+        return await supabase_get('category_spending_summary', {
+            'select': '*',
+            'user_id': f'eq.{user_id}',
+            'changed_at': f'gte.{since.isoformat()}',
+            'order': 'created_at.asc'
+        })
+
+    async def create_category(self, user_id: str, category: dict):
+        return await supabase_post('budget_categories', {**category, 'user_id': user_id})
+
+    async def update_category(self, user_id: str, category_id: str, changes: dict):
+        categories = await supabase_mutation('update_category', {
+            'owner_id': user_id, 'target_id': category_id, 'changes': changes
+        })
+        return categories[0]
+
+    async def delete_category(self, user_id: str, category_id: str):
+        # Its transactions go with it through ON DELETE CASCADE
+        await supabase_mutation('delete_category', {'owner_id': user_id, 'target_id': category_id})
+
+    async def insert_categories(self, user_id: str, categories: List[dict]):
+        return await supabase_post('budget_categories', [{**c, 'user_id': user_id} for c in categories])
+
+    async def update_categories(self, user_id: str, updates: List[Tuple[str, dict]]):
+        return await self._update_many('update_categories', user_id, updates)
+
+    async def delete_categories(self, user_id: str, category_ids: List[str]):
+        # One DELETE; their transactions go with them through ON DELETE CASCADE
+        category_ids = uuid_ids(category_ids)
+        if not category_ids:
+            return []
+        return await supabase_delete_in('budget_categories', 'id', category_ids, user_id)
+
+    async def owned_category_ids(self, user_id: str, category_ids: List[str]):
+        category_ids = uuid_ids(category_ids)
+        if not category_ids:
+            return []
+        rows = await supabase_get('budget_categories', {
+            'select': 'id',
+            'id': in_filter(category_ids),
+            'user_id': f'eq.{user_id}'
+        })
+        return [row['id'] for row in rows]
+
+    # Transactions
+    async def list_transactions(self, user_id: str, columns: List[str], limit: int,
+                                category_id: Optional[str] = None,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                after: Optional[Tuple[str, str]] = None):
+        params = {
+            'select': ','.join(columns),
+            'user_id': f'eq.{user_id}',
+            'order': 'date.desc,id.desc',
+            'limit': str(limit)
+        }
+        if category_id:
+            params['category_id'] = f'eq.{category_id}'
+        date_filters = []
+        if start_date:
+            date_filters.append(f'date.gte."{start_date.isoformat()}"')
+        if end_date:
+            date_filters.append(f'date.lte."{end_date.isoformat()}"')
+        if date_filters:
+            params['and'] = f"({','.join(date_filters)})"
+        if after:
+            date, transaction_id = after
+            params['or'] = f'(date.lt."{date}",and(date.eq."{date}",id.lt.{transaction_id}))'
+        return await supabase_get('transactions', params)
+
+    async def create_transaction(self, user_id: str, transaction: dict):
+        return await supabase_mutation('create_transaction', {'owner_id': user_id, 'row_data': transaction})
+
+    async def insert_transactions(self, user_id: str, transactions: List[dict]):
+        # PostgREST turns a JSON array body into a single multi-row INSERT
+        return await supabase_post('transactions', [{**t, 'user_id': user_id} for t in transactions])
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict):
+        return await supabase_mutation('update_transaction', {
+            'owner_id': user_id, 'target_id': transaction_id, 'changes': changes
+        })
+
+    async def delete_transaction(self, user_id: str, transaction_id: str):
+        return await supabase_mutation('delete_transaction', {'owner_id': user_id, 'target_id': transaction_id})
+
+    async def update_transactions(self, user_id: str, updates: List[Tuple[str, dict]]):
+        return await self._update_many('update_transactions', user_id, updates)
+
+    async def delete_transactions(self, user_id: str, transaction_ids: List[str]):
+        transaction_ids = uuid_ids(transaction_ids)
+        if not transaction_ids:
+            return []
+        return await supabase_delete_in('transactions', 'id', transaction_ids, user_id)
+
+    async def _update_many(self, function: str, user_id: str, updates: List[Tuple[str, dict]]):
+        # PostgREST has no multi-row PATCH with per-row values, so the rows are updated
+        # server-side in one statement; see update_transactions() in create_schema.sql
+        valid = set(uuid_ids([row_id for row_id, _ in updates]))
+        rows = [{'id': row_id, **changes} for row_id, changes in updates if row_id in valid]
+        if not rows:
+            return []
+        return await supabase_rpc(function, {'owner_id': user_id, 'updates': rows}) or []
+
+    async def search_transactions(self, user_id: str, query: str, limit: int, offset: int = 0,
+                                  category_id: Optional[str] = None,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None,
+                                  min_amount: Optional[float] = None,
+                                  max_amount: Optional[float] = None):
+        # Ranked over the trigram and full-text indexes by the search_transactions() database function
+        return await supabase_rpc('search_transactions', {
+            'owner_id': user_id,
+            'query': query,
+            'filter_category_id': category_id,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'min_amount': min_amount,
+            'max_amount': max_amount,
+            'result_limit': limit,
+            'result_offset': offset
+        }) or []
+
+    async def database_now(self):
+        return await supabase_rpc('database_now')
+
+    async def rebuild_category_totals(self):
+        return await supabase_rpc('rebuild_category_totals')
+
+    async def rebuild_daily_totals(self):
+        return await supabase_rpc('rebuild_daily_totals')
+
+    # Delta sync
+    async def list_transaction_changes(self, user_id: str, columns: List[str], since: datetime, limit: int):
+        return await supabase_get('transactions', {
+            'select': ','.join(columns),
+            'user_id': f'eq.{user_id}',
+            'updated_at': f'gte.{since.isoformat()}',
+            'order': 'updated_at.asc,id.asc',
+            'limit': str(limit)
+        })
+
+    async def list_deleted_ids(self, user_id: str, table: str, since: datetime):
+        rows = await supabase_get('deleted_rows', {
+            'select': 'id',
+            'user_id': f'eq.{user_id}',
+            'table_name': f'eq.{table}',
+            'deleted_at': f'gte.{since.isoformat()}'
+        })
+        return [row['id'] for row in rows]
+
+    async def prune_deleted_rows(self, before: datetime):
+        response = await supabase_request(
+            "DELETE",
+            "/deleted_rows",
+            params={'deleted_at': f'lt.{before.isoformat()}'},
+            headers={"Prefer": "return=minimal"}
+        )
+        if response.status_code not in [200, 204]:
+            raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+
+    # Dashboard
+    async def dashboard_summary(self, user_id: str):
+        # Totals and counts are computed in the database by the dashboard_summary view,
+        # which has one row per user with categories
+        summary = await supabase_get('dashboard_summary', {'select': '*', 'user_id': f'eq.{user_id}'})
+        return summary[0] if summary else {}
+
+    # Analytics
+    async def spending_series(self, user_id: str, interval: str, start_date=None, end_date=None,
+                              category_id=None, by_category=False):
+        # Grouped by date_trunc over the daily rollups in the spending_series() database function
+        return await supabase_rpc('spending_series', {
+            'owner_id': user_id,
+            'bucket_interval': interval,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'filter_category_id': category_id,
+            'by_category': by_category
+        }) or []
+
+    # Profile and settings
+    async def get_profile(self, user_id: str):
+        data = await supabase_get('user_profiles', {'user_id': f'eq.{user_id}', 'select': '*'})
+        return data[0] if data else None
+
+    async def save_profile(self, user_id: str, profile: dict):
+        return await self._save_user_row('user_profiles', user_id, profile)
+
+    async def get_settings(self, user_id: str):
+        data = await supabase_get('user_settings', {'user_id': f'eq.{user_id}', 'select': '*'})
+        return data[0] if data else None
+
+    async def save_settings(self, user_id: str, settings: dict):
+        return await self._save_user_row('user_settings', user_id, settings)
+
+    async def _save_user_row(self, table: str, user_id: str, data: dict):
+        # One upsert on the unique user_id, returning the stored row. created_at is left
+        # out so an existing row keeps it; a new row takes the column default.
+        rows = await supabase_upsert(table, {
+            'user_id': user_id,
+            **data,
+            'updated_at': datetime.utcnow().isoformat()
+        }, on_conflict='user_id', returning=True)
+        return rows[0]
+
+    # Budget alerts
+    async def active_alert_levels(self, user_id: str):
+        rows = await supabase_get('budget_alerts', {
+            'select': 'category_id,threshold',
+            'user_id': f'eq.{user_id}',
+            'resolved_at': 'is.null'
+        })
+        levels = {}
+        for row in rows:
+            levels[row['category_id']] = max(levels.get(row['category_id'], 0), row['threshold'])
+        return levels
+
+    async def record_budget_alerts(self, user_id: str, alerts: List[dict]):
+        # The insert must skip already-active alerts, which needs the partial unique
+        # index; see record_budget_alerts() in create_schema.sql
+        return await supabase_rpc('record_budget_alerts', {'owner_id': user_id, 'alerts': alerts}) or []
+
+    async def resolve_budget_alerts(self, user_id: str, category_id: str, level: float):
+        await supabase_patch_where('budget_alerts', {
+            'category_id': f'eq.{category_id}',
+            'user_id': f'eq.{user_id}',
+            'threshold': f'gt.{level}',
+            'resolved_at': 'is.null'
+        }, {'resolved_at': datetime.utcnow().isoformat()})
+
+    async def list_budget_alerts(self, user_id: str, limit: int, unread_only: bool = False):
+        params = {
+            'select': '*',
+            'user_id': f'eq.{user_id}',
+            'order': 'created_at.desc,threshold.desc',
+            'limit': str(limit)
+        }
+        if unread_only:
+            params['read_at'] = 'is.null'
+        return await supabase_get('budget_alerts', params)
+
+    async def mark_budget_alerts_read(self, user_id: str, alert_ids: Optional[List[str]] = None):
+        params = {'user_id': f'eq.{user_id}', 'read_at': 'is.null'}
+        if alert_ids is not None:
+            if not alert_ids:
+                return []
+            params['id'] = in_filter(alert_ids)
+        return await supabase_patch_where('budget_alerts', params, {'read_at': datetime.utcnow().isoformat()})
+
+    # Background jobs
+    async def create_job(self, job: dict):
+        record = job_json(job)
+        await supabase_post('jobs', record)
+        # Inserts come back empty; fill in the column defaults instead of reading the row back
+        return {'progress': None, 'processed': 0, 'result': None, 'error': None, 'cancel_requested': False,
+                'started_at': None, 'finished_at': None, **record}
+
+    async def update_job(self, job_id: str, changes: dict):
+        rows = await self._patch_jobs({'id': f'eq.{job_id}'}, job_json(changes))
+        return rows[0] if rows else None
+
+    async def get_job(self, user_id: str, job_id: str):
+        rows = await supabase_get('jobs', {'select': '*', 'id': f'eq.{job_id}', 'user_id': f'eq.{user_id}'})
+        return rows[0] if rows else None
+
+    async def list_jobs(self, user_id: str, limit: int, status: Optional[str] = None):
+        params = {
+            'select': '*',
+            'user_id': f'eq.{user_id}',
+            'order': 'created_at.desc,id.desc',
+            'limit': str(limit)
+        }
+        if status:
+            params['status'] = f'eq.{status}'
+        return await supabase_get('jobs', params)
+
+    async def request_job_cancel(self, user_id: str, job_id: str):
+        rows = await self._patch_jobs({
+            'id': f'eq.{job_id}',
+            'user_id': f'eq.{user_id}',
+            'status': UNFINISHED_JOBS_FILTER
+        }, {'cancel_requested': True})
+        return rows[0] if rows else None
+
+    async def fail_stale_jobs(self, before: datetime, error: str):
+        now = datetime.now().isoformat()
+        return await supabase_patch_where('jobs', {
+            'status': 'eq.running',
+            'updated_at': f'lt.{before.isoformat()}'
+        }, {'status': 'failed', 'error': error, 'finished_at': now, 'updated_at': now})
+
+    async def prune_jobs(self, before: datetime):
+        response = await supabase_request(
+            "DELETE",
+            "/jobs",
+            params={'status': f'not.{UNFINISHED_JOBS_FILTER}', 'finished_at': f'lt.{before.isoformat()}', 'select': 'id'},
+            headers={"Prefer": "return=representation"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+        return [row['id'] for row in response.json()] if response.text.strip() else []
+
+    async def _patch_jobs(self, params: dict, data: dict):
+        response = await supabase_request(
+            "PATCH",
+            "/jobs",
+            params={**params, 'select': '*'},
+            json=data,
+            headers={"Prefer": "return=representation"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
+        return response.json() if response.text.strip() else []
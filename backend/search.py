@@ -0,0 +1,155 @@
+import math
+import os
+import re
+from collections import defaultdict
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Description search for backends without a text index in the database (SQLite).
+# An inverted index maps each word to the transactions containing it; a second
+# index from trigrams to words finds the vocabulary a misspelled or partial query
+# word could mean, the way pg_trgm does on Postgres.
+
+# Lowest trigram similarity for a fuzzy word match (pg_trgm's default threshold)
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get("SEARCH_SIMILARITY_THRESHOLD", "0.3"))
+# Weight of a vocabulary word that the query word is a prefix of ("groc" -> "groceries")
+PREFIX_MATCH_WEIGHT = 0.9
+# Each query word stands for at most this many indexed words, the best matches
+SEARCH_MAX_EXPANSIONS = int(os.environ.get("SEARCH_MAX_EXPANSIONS", "8"))
+# Words past this many in a query are ignored
+SEARCH_MAX_QUERY_WORDS = int(os.environ.get("SEARCH_MAX_QUERY_WORDS", "6"))
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    return [word.lower() for word in _WORD.findall(text or "")]
+
+def trigrams(word: str) -> Set[str]:
+    # Padded like pg_trgm: two spaces before the word, one after
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class InvertedIndex:
+    """Word -> document postings over one user's transaction descriptions.
+
+    Documents are numbered in the order they were indexed, so postings are
+    sets of ints and set algebra does the matching. search() needs every query
+    word to match (exactly, as a prefix, or by trigram similarity) and scores by
+    the matches' weight and rarity (idf); equal scores list later-indexed rows first.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[int]] = defaultdict(set)
+        self._numbers: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        # document number -> words, so a re-indexed or removed row can leave its postings
+        self._words: Dict[int, Set[str]] = {}
+        self._words_by_trigram: Dict[str, Set[str]] = defaultdict(set)
+        self._trigram_counts: Dict[str, int] = {}
+        self._next_number = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, doc_id: str, text: str):
+        """Index (or re-index) one transaction's description"""
+        self.remove(doc_id)
+        number = self._next_number
+        self._next_number += 1
+        words = set(tokenize(text))
+        self._numbers[doc_id] = number
+        self._ids[number] = doc_id
+        self._words[number] = words
+        for word in words:
+            if word not in self._postings:
+                grams = trigrams(word)
+                self._trigram_counts[word] = len(grams)
+                for gram in grams:
+                    self._words_by_trigram[gram].add(word)
+            self._postings[word].add(number)
+
+    def remove(self, doc_id: str):
+        number = self._numbers.pop(doc_id, None)
+        if number is None:
+            return
+        del self._ids[number]
+        for word in self._words.pop(number):
+            numbers = self._postings[word]
+            numbers.discard(number)
+            if not numbers:
+                del self._postings[word]
+                del self._trigram_counts[word]
+                for gram in trigrams(word):
+                    self._words_by_trigram[gram].discard(word)
+                    if not self._words_by_trigram[gram]:
+                        del self._words_by_trigram[gram]
+
+    def expand(self, word: str) -> Dict[str, float]:
+        """Indexed words `word` may stand for, with match weights in (0, 1]"""
+        grams = trigrams(word)
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._words_by_trigram.get(gram, ()):
+                shared[candidate] += 1
+
+        matches = {}
+        for candidate, count in shared.items():
+            if candidate == word:
+                matches[candidate] = 1.0
+            elif candidate.startswith(word):
+                matches[candidate] = PREFIX_MATCH_WEIGHT
+            else:
+                similarity = count / (len(grams) + self._trigram_counts[candidate] - count)
+                if similarity >= SEARCH_SIMILARITY_THRESHOLD:
+                    matches[candidate] = similarity
+        return matches
+
+    def _word_tiers(self, word: str, total: int) -> List[Tuple[float, Set[int]]]:
+        """Disjoint (score, documents) groups matching one query word, best first"""
+        scored = []
+        for match, weight in self.expand(word).items():
+            numbers = self._postings[match]
+            scored.append((weight * math.log(1 + total / len(numbers)), match))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        tiers = []
+        seen = set()
+        for score, match in scored[:SEARCH_MAX_EXPANSIONS]:
+            # A document matching several expansions counts its best one
+            numbers = self._postings[match] - seen if seen else self._postings[match]
+            if numbers:
+                seen |= numbers
+                tiers.append((score, numbers))
+        return tiers
+
+    def search(self, query: str) -> Iterator[Tuple[str, float]]:
+        """(id, score) of every row matching all words of `query`, best first.
+
+        Lazy: only the part of the ranking that is read gets ordered.
+        """
+        words = list(dict.fromkeys(tokenize(query)))[:SEARCH_MAX_QUERY_WORDS]
+        if not words:
+            return
+
+        total = len(self._ids)
+        tiers = None
+        for word in words:
+            word_tiers = self._word_tiers(word, total)
+            if tiers is None:
+                tiers = word_tiers
+            else:
+                tiers = [
+                    (score + word_score, numbers & word_numbers)
+                    for score, numbers in tiers
+                    for word_score, word_numbers in word_tiers
+                    if not numbers.isdisjoint(word_numbers)
+                ]
+            if not tiers:
+                return
+
+        tiers.sort(key=lambda tier: -tier[0])
+        for score, numbers in tiers:
+            for number in sorted(numbers, reverse=True):
+                doc_id = self._ids.get(number)
+                # Rows removed since the search started are skipped
+                if doc_id is not None:
+                    yield doc_id, score
@@ -1,18 +1,43 @@
-from fastapi import FastAPI, HTTPException, Depends, Body
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, Request, Response, File, UploadFile
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from datetime import datetime
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, PlainTextResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta
 import os
 import json
+import hashlib
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 import uuid
-import requests
+import base64
+import csv
+import io
+import shutil
 from dotenv import load_dotenv
+from cache import TTLCache, SingleFlight
+from compression import CompressionMiddleware
+from storage import create_storage, with_spending, to_datetime, TOMBSTONE_RETENTION_DAYS
+from auth import current_user_id, admin_user_id, metrics_reader, SUPABASE_JWT_SECRET, DEFAULT_USER_ID
+from metrics import TimingMiddleware, Gauge, render_metrics
+from events import EventBroker, RESYNC_EVENT
+from analytics import SERIES_INTERVALS, SERIES_MAX_BUCKETS, default_start, bucket_count, bucket_range, fill_series
+from alerts import AlertEngine
+from jobs import JobRunner, JobContext, JobRejected, SUCCEEDED, FAILED, CANCELLED
+from importers import detect_format, iter_csv_rows, iter_ofx_rows, OFX_FORMAT, SUPPORTED_FORMATS
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
 
 load_dotenv()
 
-app = FastAPI(title="Budget Bubbles API", version="1.0.0")
+app = FastAPI(
+    title="Budget Bubbles API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
+)
 
 # CORS middleware
 app.add_middleware(
@@ -21,22 +46,163 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Sync-Watermark", "ETag"],
 )
 
-# Supabase configuration
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
+# gzip/brotli for bodies over COMPRESSION_MIN_SIZE, negotiated per request
+app.add_middleware(CompressionMiddleware)
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception("Supabase credentials not configured")
+# Per-route latency histograms, served with the upstream metrics at /api/metrics
+app.add_middleware(TimingMiddleware)
 
-# Headers for Supabase requests
-def get_headers():
-    return {
-        'apikey': SUPABASE_KEY,
-        'Authorization': f'Bearer {SUPABASE_KEY}',
-        'Content-Type': 'application/json'
-    }
+# In-process read cache for the hot endpoints; mutations invalidate the keys they touch.
+# Entries are per user, keyed "<name>:<user_id>" (see user_cache_key)
+CACHE_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "256"))
+
+CATEGORIES_CACHE_KEY = "categories"
+DASHBOARD_CACHE_KEY = "dashboard"
+PROFILE_CACHE_KEY = "profile"
+SETTINGS_CACHE_KEY = "settings"
+
+# Every transaction or category write changes spending totals on both views
+SPENDING_CACHE_KEYS = (CATEGORIES_CACHE_KEY, DASHBOARD_CACHE_KEY)
+# Time series are cached per query, under keys sharing this prefix and the user id
+ANALYTICS_CACHE_PREFIX = "analytics:"
+
+read_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+
+def user_cache_key(name: str, user_id: str):
+    return f"{name}:{user_id}"
+
+def invalidate_spending(user_id: str):
+    read_cache.invalidate(*(user_cache_key(key, user_id) for key in SPENDING_CACHE_KEYS))
+    read_cache.invalidate_prefix(f"{ANALYTICS_CACHE_PREFIX}{user_id}:")
+    cache_loads.forget()
+
+# Conditional GET: JSON reads carry an ETag hashed from the body, and a request
+# whose If-None-Match still matches gets an empty 304 instead of the payload
+def render_json(content):
+    # Rows come from storage already JSON-ready, so they are encoded directly rather
+    # than revalidated through response_model; jsonable_encoder only handles stragglers
+    if orjson is not None:
+        body = orjson.dumps(content, default=jsonable_encoder)
+    else:
+        body = json.dumps(content, default=jsonable_encoder, separators=(",", ":")).encode("utf-8")
+    return body, f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: compression does not change what the tag identifies
+    return etag.removeprefix("W/") in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+def conditional_json(request: Request, body: bytes, etag: str, headers: Optional[dict] = None):
+    # no-cache lets browsers keep the body but revalidate it on every load
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **(headers or {})}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+async def cached_json(request: Request, cache_key: str, load):
+    """Serve load()'s result through the read cache.
+
+    The cache holds the rendered body and its ETag, so hits skip both the
+    storage call and serialization. Concurrent misses share one load.
+    """
+    async def load_entry():
+        generation = read_cache.generation
+        entry = render_json(await load())
+        # Not stored if a write invalidated the cache while this load ran
+        read_cache.set(cache_key, entry, generation=generation)
+        return entry
+    
+    entry = read_cache.get(cache_key)
+    if entry is None:
+        entry = await cache_loads.do(cache_key, load_entry)
+    return conditional_json(request, *entry)
+
+# Delta sync: GET ...?since=<watermark> returns rows changed at or after the
+# watermark plus ids deleted since, and the watermark to send next time.
+# The next watermark overlaps slightly so writes committing during the read are
+# not missed; clients apply rows by id, so repeats are harmless.
+DELTA_OVERLAP_SECONDS = float(os.environ.get("DELTA_OVERLAP_SECONDS", "1"))
+
+# Watermarks are read from storage.clock(), the clock the database stamps changes
+# with, so they stay comparable however the API server's clock or timezone differ.
+async def check_watermark(since: datetime):
+    now = await storage.clock()
+    if since.tzinfo is not None:
+        # An instant rather than a watermark we issued: move it from this machine's
+        # local time onto the database clock (the offset errs a little early, never late)
+        since = to_datetime(since) + (now - datetime.now())
+    else:
+        since = to_datetime(since)
+    if since < now - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise HTTPException(status_code=410, detail="Watermark is older than the deletion history; reload without since")
+    return since
+
+def next_watermark(started_at: datetime):
+    return (started_at - timedelta(seconds=DELTA_OVERLAP_SECONDS)).isoformat()
+
+# Change events pushed to the writing user's GET /api/events subscribers after every write
+broker = EventBroker()
+
+Gauge("event_subscribers", "Clients connected to the change event stream", lambda: len(broker))
+Gauge("events_published_total", "Change events published since startup", lambda: broker.published)
+Gauge("event_subscribers_dropped_total", "Event subscribers dropped for falling behind", lambda: broker.dropped)
+
+async def publish_change(user_id: str, event_type: str, started_at: datetime, transactions=(),
+                         deleted_transactions=(), deleted_categories=(), resync=(), categories=None):
+    """Publish a write's changed rows and the categories whose spending moved.
+
+    Single-row writes pass the categories their storage call returned. Otherwise
+    they come from the same change timestamps as ?since= syncs, so a transaction
+    moved between categories updates both. Skipped when the user has no
+    subscribers; a failure here never fails the write itself.
+    """
+    if not broker.has_subscribers(user_id):
+        return
+    try:
+        if categories is None:
+            categories = await storage.list_category_changes(
+                user_id, started_at - timedelta(seconds=DELTA_OVERLAP_SECONDS)
+            )
+        broker.publish(user_id, {
+            "type": event_type,
+            "transactions": list(transactions),
+            "deleted_transactions": list(deleted_transactions),
+            "categories": [category_with_spending(category) for category in categories],
+            "deleted_categories": list(deleted_categories),
+            "resync": list(resync)
+        })
+    except Exception as e:
+        print(f"⚠️ Could not publish {event_type} event: {str(e)}")
+        broker.publish(user_id, RESYNC_EVENT)
+
+async def bulk_changed_categories(user_id: str, started_at: datetime):
+    """Categories whose spending or row a bulk write changed, for its event and alerts;
+    None when they cannot be read, so the event falls back to a resync"""
+    try:
+        categories = await storage.list_category_changes(user_id, started_at - timedelta(seconds=DELTA_OVERLAP_SECONDS))
+        return [category_with_spending(category) for category in categories]
+    except Exception as e:
+        print(f"⚠️ Could not read changed categories: {str(e)}")
+        return None
+
+Gauge("read_cache_hits", "Read cache hits since startup", lambda: read_cache.hits)
+Gauge("read_cache_misses", "Read cache misses since startup", lambda: read_cache.misses)
+Gauge("read_cache_entries", "Entries currently held in the read cache", lambda: len(read_cache))
+
+# Concurrent misses on the same cache key share one storage load
+cache_loads = SingleFlight()
+
+Gauge("read_cache_loads_total", "Storage loads started for read cache misses", lambda: cache_loads.calls)
+Gauge("read_cache_loads_coalesced_total", "Read cache misses that joined an in-flight load",
+      lambda: cache_loads.coalesced)
 
 # Pydantic models
 class BudgetCategory(BaseModel):
@@ -66,89 +232,46 @@ class CategoryWithSpending(BaseModel):
     created_at: datetime
     updated_at: datetime
 
-# Helper functions for Supabase HTTP requests
-def supabase_get(table: str, params: dict = None):
-    """Make GET request to Supabase table"""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    if params:
-        url += "?" + "&".join([f"{k}={v}" for k, v in params.items()])
-    
-    response = requests.get(url, headers=get_headers())
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=response.text)
-    return response.json()
-
-def supabase_post(table: str, data: dict):
-    """Make POST request to Supabase table"""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    response = requests.post(url, headers=get_headers(), json=data)
-    if response.status_code not in [200, 201]:
-        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
-    
-    # Supabase might return empty response for successful inserts
-    if response.text.strip():
-        return response.json()
-    else:
-        return {"success": True}
+# Storage backend (Supabase REST by default; see storage.py)
+storage = create_storage()
 
-def supabase_patch(table: str, filters: dict, data: dict):
-    """Make PATCH request to Supabase table"""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    filter_params = "&".join([f"{k}=eq.{v}" for k, v in filters.items()])
-    url += f"?{filter_params}"
-    
-    # Add Prefer header for returning data
-    headers = get_headers()
-    headers["Prefer"] = "return=representation"
-    
-    print(f"PATCH request to URL: {url}")
-    print(f"PATCH request headers: {headers}")
-    print(f"PATCH request data: {data}")
-    
-    response = requests.patch(url, headers=headers, json=data)
-    print(f"PATCH response status: {response.status_code}")
-    print(f"PATCH response text: {response.text}")
-    
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
-    
-    # Supabase might return empty response for successful updates
-    if response.text.strip():
-        try:
-            return response.json()
-        except:
-            return {"success": True, "message": "Update successful"}
-    else:
-        return {"success": True, "message": "Update successful"}
+# Budget threshold alerts, evaluated on the spending each write returns (see alerts.py)
+alert_engine = AlertEngine(storage)
 
-def supabase_delete(table: str, filters: dict):
-    """Make DELETE request to Supabase table"""
-    url = f"{SUPABASE_URL}/rest/v1/{table}"
-    filter_params = "&".join([f"{k}=eq.{v}" for k, v in filters.items()])
-    url += f"?{filter_params}"
-    
-    # Add Prefer header for returning data
-    headers = get_headers()
-    headers["Prefer"] = "return=representation"
-    
-    print(f"DELETE request to URL: {url}")
-    print(f"DELETE request headers: {headers}")
-    
-    response = requests.delete(url, headers=headers)
-    print(f"DELETE response status: {response.status_code}")
-    print(f"DELETE response text: {response.text}")
-    
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail=f"Supabase error: {response.text}")
-    
-    # Supabase might return empty response for successful deletes
-    if response.text.strip():
-        try:
-            return response.json()
-        except:
-            return {"success": True, "message": "Delete successful"}
-    else:
-        return {"success": True, "message": "Delete successful"}
+Gauge("budget_alerts_raised_total", "Budget threshold alerts raised since startup", lambda: alert_engine.raised)
+
+def notification_response(alert: dict):
+    return {
+        "id": alert['id'],
+        "category_id": alert['category_id'],
+        "category_name": alert['category_name'],
+        "threshold": alert['threshold'],
+        "percentage_used": alert['percentage_used'],
+        "total_spent": alert['total_spent'],
+        "budget_amount": alert['budget_amount'],
+        "created_at": alert['created_at'],
+        "read": alert.get('read_at') is not None,
+        "active": alert.get('resolved_at') is None
+    }
+
+async def raise_budget_alerts(user_id: str, categories: List[dict]):
+    """Check the thresholds of categories a write changed; returns the alerts to show.
+
+    Crossings are always recorded so the engine's state stays right, but they
+    are only pushed and returned while the user has notifications on. A
+    failure here never fails the write itself.
+    """
+    try:
+        alerts = await alert_engine.evaluate(user_id, categories)
+        if not alerts or not (await load_settings(user_id))['notifications']:
+            return []
+        alerts = [notification_response(alert) for alert in alerts]
+        if broker.has_subscribers(user_id):
+            broker.publish(user_id, {"type": "budget.alert", "alerts": alerts})
+        return alerts
+    except Exception as e:
+        print(f"⚠️ Could not evaluate budget alerts: {str(e)}")
+        return []
 
 # Health check endpoint
 @app.get("/")
@@ -161,319 +284,1135 @@ async def api_health_check():
     return {"status": "healthy", "service": "Budget Bubbles API"}
 
 # Budget Categories endpoints
+def category_with_spending(category: dict):
+    return {
+        "id": category['id'],
+        "name": category['name'],
+        "budget_amount": category['budget_amount'],
+        "color": category['color'],
+        "total_spent": category['total_spent'],
+        "remaining_budget": category['remaining_budget'],
+        "percentage_used": category['percentage_used'],
+        "created_at": category['created_at'],
+        "updated_at": category['updated_at']
+    }
+
+async def load_categories(user_id: str):
+    # Spending totals are aggregated by the storage backend in a single query
+    categories = await storage.list_category_spending(user_id)
+    return [category_with_spending(category) for category in categories]
+
 @app.get("/api/categories", response_model=List[CategoryWithSpending])
-async def get_categories():
+async def get_categories(request: Request, since: Optional[datetime] = None,
+                         user_id: str = Depends(current_user_id)):
+    """All categories with spending, or with ?since= only those changed after the watermark"""
     try:
-        # Get categories
-        categories = supabase_get('budget_categories', {'select': '*', 'order': 'created_at.asc'})
+        if since is None:
+            return await cached_json(request, user_cache_key(CATEGORIES_CACHE_KEY, user_id),
+                                     lambda: load_categories(user_id))
         
-        result = []
-        for category in categories:
-            # Calculate total spent for this category
-            transactions = supabase_get('transactions', {
-                'select': 'amount',
-                'category_id': f'eq.{category["id"]}'
-            })
-            
-            total_spent = sum(transaction['amount'] for transaction in transactions)
-            budget_amount = category['budget_amount']
-            remaining_budget = budget_amount - total_spent
-            percentage_used = (total_spent / budget_amount * 100) if budget_amount > 0 else 0
-            
-            result.append({
-                "id": category['id'],
-                "name": category['name'],
-                "budget_amount": budget_amount,
-                "color": category['color'],
-                "total_spent": total_spent,
-                "remaining_budget": remaining_budget,
-                "percentage_used": percentage_used,
-                "created_at": category['created_at'],
-                "updated_at": category['updated_at']
-            })
-        
-        return result
+        since = await check_watermark(since)
+        started_at = await storage.clock()
+        changed = await storage.list_category_changes(user_id, since)
+        deleted = await storage.list_deleted_ids(user_id, 'budget_categories', since)
+        return conditional_json(request, *render_json({
+            "changed": [category_with_spending(category) for category in changed],
+            "deleted": deleted,
+            "watermark": next_watermark(started_at)
+        }))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def new_category_row(category: BudgetCategory):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": category.name,
+        "budget_amount": category.budget_amount,
+        "color": category.color,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+
+def category_changes(category: BudgetCategory):
+    return {
+        "name": category.name,
+        "budget_amount": category.budget_amount,
+        "color": category.color,
+        "updated_at": datetime.now().isoformat()
+    }
+
+# Single-row writes answer with the affected categories and their refreshed spending
+# (from the same atomic storage call), so clients can update without refetching
 @app.post("/api/categories", response_model=dict)
-async def create_category(category: BudgetCategory):
+async def create_category(category: BudgetCategory, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        category_data = {
-            "id": str(uuid.uuid4()),
-            "name": category.name,
-            "budget_amount": category.budget_amount,
-            "color": category.color,
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat()
-        }
+        category_data = new_category_row(category)
         
-        result = supabase_post('budget_categories', category_data)
-        return {"id": category_data['id'], "message": "Category created successfully"}
+        await storage.create_category(user_id, category_data)
+        invalidate_spending(user_id)
+        # A new category has nothing spent yet
+        categories = [category_with_spending(with_spending({**category_data, "total_spent": 0}))]
+        await publish_change(user_id, "category.created", started_at, categories=categories)
+        return {"id": category_data['id'], "message": "Category created successfully", "categories": categories}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/categories/{category_id}", response_model=dict)
-async def update_category(category_id: str, category: BudgetCategory):
+async def update_category(category_id: str, category: BudgetCategory, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        category_data = {
-            "name": category.name,
-            "budget_amount": category.budget_amount,
-            "color": category.color,
-            "updated_at": datetime.now().isoformat()
-        }
+        category_data = category_changes(category)
         
-        result = supabase_patch('budget_categories', {'id': category_id}, category_data)
+        categories = [category_with_spending(await storage.update_category(user_id, category_id, category_data))]
+        invalidate_spending(user_id)
+        await publish_change(user_id, "category.updated", started_at, categories=categories)
+        # A smaller budget can push spending over a threshold too
+        alerts = await raise_budget_alerts(user_id, categories)
         
-        return {"message": "Category updated successfully"}
+        return {"message": "Category updated successfully", "categories": categories, "alerts": alerts}
+    except HTTPException:
+        raise
     except Exception as e:
-        if "Category not found" in str(e):
-            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/categories/{category_id}")
-async def delete_category(category_id: str):
+async def delete_category(category_id: str, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        # Delete all transactions for this category first
-        supabase_delete('transactions', {'category_id': category_id})
-        
-        # Delete the category
-        result = supabase_delete('budget_categories', {'id': category_id})
+        # Delete the category together with its transactions, in one statement
+        await storage.delete_category(user_id, category_id)
+        invalidate_spending(user_id)
+        alert_engine.forget(user_id, [category_id])
+        await publish_change(user_id, "category.deleted", started_at, deleted_categories=[category_id],
+                             categories=[])
         
         return {"message": "Category deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Transaction paging helpers
+TRANSACTION_FIELDS = ["id", "category_id", "amount", "description", "date", "created_at", "updated_at"]
+TRANSACTIONS_PAGE_SIZE = int(os.environ.get("TRANSACTIONS_PAGE_SIZE", "100"))
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get("TRANSACTIONS_MAX_PAGE_SIZE", "1000"))
+
+def encode_cursor(transaction: dict):
+    """Opaque keyset cursor pointing just past the given (date, id) row"""
+    raw = json.dumps([transaction['date'], transaction['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        date, transaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(date), str(transaction_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_fields(fields: Optional[str]):
+    if not fields:
+        return TRANSACTION_FIELDS
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in TRANSACTION_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+def transaction_filters(category_id: Optional[str] = None,
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None):
+    """Category/date-range options shared by list and export"""
+    return {'category_id': category_id, 'start_date': start_date, 'end_date': end_date}
+
+async def fetch_transactions_page(user_id: str, filters: dict, fields: List[str], limit: int,
+                                  cursor: Optional[str] = None):
+    """Fetch one page of the user's transactions ordered by (date, id) descending; returns (rows, next_cursor).
+
+    The keyset predicate walks idx_transactions_user_date_id (or the category variant
+    when filtering by category), so every page costs the same no matter how deep it is.
+    """
+    # The cursor is built from date and id, so always select them
+    columns = list(dict.fromkeys(fields + ['date', 'id']))
+    after = decode_cursor(cursor) if cursor else None
+
+    rows = await storage.list_transactions(user_id, columns, limit + 1, after=after, **filters)
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    rows = rows[:limit]
+    if len(columns) != len(fields):
+        rows = [{field: row[field] for field in fields} for row in rows]
+    return rows, next_cursor
+
 # Transactions endpoints
-@app.get("/api/transactions", response_model=List[Transaction])
-async def get_transactions(category_id: Optional[str] = None):
+async def fetch_transaction_changes(user_id: str, fields: List[str], since: datetime, limit: int):
+    """Rows written since the watermark, oldest first, plus deleted ids.
+
+    When more than `limit` rows changed, has_more is set and the watermark is
+    the last row's updated_at, so the client keeps syncing from there.
+    """
+    since = await check_watermark(since)
+    started_at = await storage.clock()
+    columns = list(dict.fromkeys(fields + ['updated_at', 'id']))
+    rows = await storage.list_transaction_changes(user_id, columns, since, limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    watermark = rows[-1]['updated_at'] if has_more else next_watermark(started_at)
+    deleted = await storage.list_deleted_ids(user_id, 'transactions', since)
+    if len(columns) != len(fields):
+        rows = [{field: row[field] for field in fields} for row in rows]
+    return {"changed": rows, "deleted": deleted, "watermark": watermark, "has_more": has_more}
+
+@app.get("/api/transactions")
+async def get_transactions(request: Request,
+                           category_id: Optional[str] = None,
+                           start_date: Optional[datetime] = None,
+                           end_date: Optional[datetime] = None,
+                           limit: int = Query(TRANSACTIONS_PAGE_SIZE, ge=1, le=TRANSACTIONS_MAX_PAGE_SIZE),
+                           cursor: Optional[str] = None,
+                           fields: Optional[str] = None,
+                           since: Optional[datetime] = None,
+                           user_id: str = Depends(current_user_id)):
+    """A page of transactions, newest first, or with ?since= the changes after a watermark"""
     try:
-        params = {'select': '*', 'order': 'date.desc'}
-        if category_id:
-            params['category_id'] = f'eq.{category_id}'
+        if since is not None:
+            changes = await fetch_transaction_changes(user_id, parse_fields(fields), since, limit)
+            return conditional_json(request, *render_json(changes))
         
-        transactions = supabase_get('transactions', params)
+        started_at = await storage.clock()
+        transactions, next_cursor = await fetch_transactions_page(
+            user_id,
+            transaction_filters(category_id, start_date, end_date),
+            parse_fields(fields),
+            limit,
+            cursor
+        )
         
-        result = []
-        for transaction in transactions:
-            result.append({
-                "id": transaction['id'],
-                "category_id": transaction['category_id'],
-                "amount": transaction['amount'],
-                "description": transaction['description'],
-                "date": transaction['date'],
-                "created_at": transaction['created_at']
-            })
-        
-        return result
+        # The next page is requested with ?cursor=<X-Next-Cursor>; no header means last page.
+        # A first page also says where a later ?since= sync of this listing should start.
+        headers = {}
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        if not cursor:
+            headers['X-Sync-Watermark'] = next_watermark(started_at)
+        return conditional_json(request, *render_json(transactions), headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def new_transaction_row(transaction: Transaction, created_at: Optional[str] = None):
+    created_at = created_at or datetime.now().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "category_id": transaction.category_id,
+        "amount": transaction.amount,
+        "description": transaction.description,
+        "date": transaction.date.isoformat(),
+        "created_at": created_at,
+        "updated_at": created_at
+    }
+
+def transaction_changes(transaction: Transaction):
+    return {
+        "category_id": transaction.category_id,
+        "amount": transaction.amount,
+        "description": transaction.description,
+        "date": transaction.date.isoformat(),
+        "updated_at": datetime.now().isoformat()
+    }
+
+async def unknown_categories(user_id: str, category_ids: List[str]):
+    """The category ids that do not name one of the user's categories.
+
+    Transactions may only be filed under their owner's categories; one
+    indexed lookup checks every id a write refers to.
+    """
+    wanted = set(category_ids)
+    if not wanted:
+        return set()
+    return wanted - set(await storage.owned_category_ids(user_id, list(wanted)))
+
 @app.post("/api/transactions", response_model=dict)
-async def create_transaction(transaction: Transaction):
+async def create_transaction(transaction: Transaction, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        transaction_data = {
-            "id": str(uuid.uuid4()),
-            "category_id": transaction.category_id,
-            "amount": transaction.amount,
-            "description": transaction.description,
-            "date": transaction.date.isoformat(),
-            "created_at": datetime.now().isoformat()
-        }
+        transaction_data = new_transaction_row(transaction)
         
-        result = supabase_post('transactions', transaction_data)
-        return {"id": transaction_data['id'], "message": "Transaction created successfully"}
+        # Checks the category is the user's, inserts, and reads its new spending atomically
+        categories = await storage.create_transaction(user_id, transaction_data)
+        categories = [category_with_spending(category) for category in categories]
+        invalidate_spending(user_id)
+        await publish_change(user_id, "transaction.created", started_at, transactions=[transaction_data],
+                             categories=categories)
+        alerts = await raise_budget_alerts(user_id, categories)
+        return {"id": transaction_data['id'], "message": "Transaction created successfully",
+                "categories": categories, "alerts": alerts}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Streaming export: pages through the ledger by keyset so memory stays constant
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "1000"))
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+async def iter_transaction_pages(user_id: str, filters: dict, fields: List[str], page_size: int = EXPORT_PAGE_SIZE):
+    cursor = None
+    while True:
+        rows, cursor = await fetch_transactions_page(user_id, filters, fields, page_size, cursor)
+        if rows:
+            yield rows
+        if not cursor:
+            break
+
+async def export_ndjson(pages):
+    async for rows in pages:
+        if orjson is not None:
+            yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
+        else:
+            yield "".join(json.dumps(row) + "\n" for row in rows)
+
+async def export_csv(pages, fields: List[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    async for rows in pages:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/api/transactions/export")
+async def export_transactions(format: str = "ndjson",
+                              category_id: Optional[str] = None,
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              fields: Optional[str] = None,
+                              user_id: str = Depends(current_user_id)):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    
+    selected = parse_fields(fields)
+    pages = iter_transaction_pages(user_id, transaction_filters(category_id, start_date, end_date), selected)
+    body = export_csv(pages, selected) if format == "csv" else export_ndjson(pages)
+    
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'}
+    )
+
+# Description search. Results are ranked rather than ordered by (date, id), so pages
+# are positions in the ranking and only the first SEARCH_MAX_RESULTS are reachable.
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "50"))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get("SEARCH_MAX_PAGE_SIZE", "200"))
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "1000"))
+
+def encode_search_cursor(offset: int):
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode()).decode()
+
+def decode_search_cursor(cursor: str):
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["offset"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not 0 <= offset < SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+@app.get("/api/transactions/search")
+async def search_transactions(request: Request,
+                              q: str = Query(..., min_length=1, max_length=200),
+                              category_id: Optional[str] = None,
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              min_amount: Optional[float] = None,
+                              max_amount: Optional[float] = None,
+                              limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+                              cursor: Optional[str] = None,
+                              fields: Optional[str] = None,
+                              user_id: str = Depends(current_user_id)):
+    """Transactions whose description matches `q`, best match first, each with its `rank`"""
+    try:
+        selected = parse_fields(fields) + ['rank']
+        offset = decode_search_cursor(cursor) if cursor else 0
+        limit = min(limit, SEARCH_MAX_RESULTS - offset)
+
+        rows = await storage.search_transactions(
+            user_id, q.strip(), limit + 1, offset,
+            category_id=category_id,
+            start_date=start_date,
+            end_date=end_date,
+            min_amount=min_amount,
+            max_amount=max_amount
+        )
+
+        # Same paging contract as the listing: ?cursor=<X-Next-Cursor>, no header on the last page
+        headers = {}
+        if len(rows) > limit and offset + limit < SEARCH_MAX_RESULTS:
+            headers['X-Next-Cursor'] = encode_search_cursor(offset + limit)
+        results = [{field: row[field] for field in selected} for row in rows[:limit]]
+        return conditional_json(request, *render_json(results), headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Bulk import: rows are streamed from the upload and written in array inserts
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_ERRORS = int(os.environ.get("IMPORT_MAX_ERRORS", "500"))
+
+def format_validation_error(error: ValidationError):
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors()
+    )
+
+def import_format(file: UploadFile, format: Optional[str]):
+    file_format = (format or detect_format(file.filename, file.content_type)).lower()
+    if file_format not in SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {file_format}")
+    return file_format
+
+async def run_import(user_id: str, binary_file, file_format: str, category_id: Optional[str] = None,
+                     on_batch=None):
+    """Import a CSV (category_id, amount, description, date) or OFX bank export.
+
+    `category_id` is used for rows that do not name one (every OFX row).
+    Only the current batch is kept in memory; per-row errors are reported
+    up to IMPORT_MAX_ERRORS, after which they are only counted. `on_batch`
+    is awaited with the report so far after each batch is written.
+    """
+    report = {"imported": 0, "failed": 0, "skipped": 0, "errors": [], "errors_truncated": False, "alerts": []}
+    
+    def record_error(row_number, message):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append({"row": row_number, "error": message})
+        else:
+            report["errors_truncated"] = True
+    
+    batch = []
+    batch_rows = []
+    
+    async def flush():
+        if not batch:
+            return
+        rows_to_insert = batch
+        row_numbers = batch_rows
+        try:
+            unknown = await unknown_categories(user_id, [row["category_id"] for row in batch])
+            if unknown:
+                rows_to_insert, row_numbers = [], []
+                for row, row_number in zip(batch, batch_rows):
+                    if row["category_id"] in unknown:
+                        record_error(row_number, "category_id: Category not found")
+                    else:
+                        rows_to_insert.append(row)
+                        row_numbers.append(row_number)
+            if rows_to_insert:
+                await storage.insert_transactions(user_id, rows_to_insert)
+                report["imported"] += len(rows_to_insert)
+        except HTTPException as e:
+            # A rejected array insert writes nothing, so every row in it failed
+            for row_number in row_numbers:
+                record_error(row_number, f"Batch insert failed: {e.detail}")
+        batch.clear()
+        batch_rows.clear()
+        if on_batch is not None:
+            await on_batch(report)
+    
+    rows = iter_ofx_rows(binary_file) if file_format == OFX_FORMAT else iter_csv_rows(binary_file)
+    started_at = await storage.clock()
+    created_at = started_at.isoformat()
+    
+    def parse_batch():
+        """Read and validate rows until the batch is full; False once the file is exhausted.
+        
+        Runs in the threadpool, so reading and validating a large file never blocks
+        the event loop; only the inserts in flush() run on it.
+        """
+        for row_number, fields in rows:
+            if not fields["category_id"]:
+                fields["category_id"] = category_id
+            try:
+                transaction = Transaction(**fields)
+            except ValidationError as e:
+                record_error(row_number, format_validation_error(e))
+                continue
+            
+            # OFX credits (deposits, refunds) are not spending
+            if file_format == OFX_FORMAT and transaction.amount < 0:
+                report["skipped"] += 1
+                continue
+            
+            batch.append(new_transaction_row(transaction, created_at))
+            batch_rows.append(row_number)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                return True
+        return False
+    
+    try:
+        while await run_in_threadpool(parse_batch):
+            await flush()
+        await flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse import file: {str(e)}")
+    finally:
+        if report["imported"]:
+            invalidate_spending(user_id)
+            categories = await bulk_changed_categories(user_id, started_at)
+            # Too many rows to push; subscribers pull them with a ?since= sync instead
+            await publish_change(user_id, "transactions.imported", started_at, resync=["transactions"],
+                                 categories=categories)
+            report["alerts"] = await raise_budget_alerts(user_id, categories or [])
+    
+    return report
+
+@app.post("/api/transactions/import")
+async def import_transactions(file: UploadFile = File(...),
+                              category_id: Optional[str] = None,
+                              format: Optional[str] = None,
+                              user_id: str = Depends(current_user_id)):
+    """Import a file within the request; see POST /api/jobs/imports for large files"""
+    return await run_import(user_id, file.file, import_format(file, format), category_id)
+
+# Batch writes: one request per operation type instead of one per row
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+
+class BatchRequest(BaseModel):
+    create: List[dict] = []
+    update: List[dict] = []
+    delete: List[str] = []
+
+async def run_batch(batch: BatchRequest, user_id: str, kind: str, model, new_row, changes_of,
+                    insert, update, delete):
+    """Validate every item, then issue at most one storage call per operation type.
+
+    Items are reported individually by their index in the request: validation
+    errors and unknown ids fail only that item, while a rejected storage call
+    fails every item it carried, since nothing from it was written. The storage
+    calls take the user id first and only touch that user's rows.
+    """
+    if len(batch.create) + len(batch.update) + len(batch.delete) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    
+    started_at = await storage.clock()
+    results = {"created": [], "updated": [], "deleted": []}
+    written = []
+    deleted_ids = []
+    
+    def fail(section, index, item_id, message):
+        results[section].append({"index": index, "id": item_id, "status": "error", "error": message})
+    
+    rows = []
+    for index, item in enumerate(batch.create):
+        try:
+            rows.append((index, new_row(model(**item))))
+        except ValidationError as e:
+            fail("created", index, None, format_validation_error(e))
+    
+    updates = []
+    for index, item in enumerate(batch.update):
+        item_id = item.get("id")
+        if not item_id:
+            fail("updated", index, None, "id: Field required")
+            continue
+        try:
+            updates.append((index, item_id, changes_of(model(**item))))
+        except ValidationError as e:
+            fail("updated", index, item_id, format_validation_error(e))
+    
+    if kind == "transactions":
+        unknown = await unknown_categories(
+            user_id,
+            [row["category_id"] for _, row in rows] + [changes["category_id"] for _, _, changes in updates]
+        )
+        for index, row in rows:
+            if row["category_id"] in unknown:
+                fail("created", index, None, "category_id: Category not found")
+        for index, item_id, changes in updates:
+            if changes["category_id"] in unknown:
+                fail("updated", index, item_id, "category_id: Category not found")
+        rows = [(index, row) for index, row in rows if row["category_id"] not in unknown]
+        updates = [item for item in updates if item[2]["category_id"] not in unknown]
+    
+    wrote = False
+    try:
+        if rows:
+            try:
+                await insert(user_id, [row for _, row in rows])
+                wrote = True
+                written += [row for _, row in rows]
+                results["created"] += [{"index": i, "id": row["id"], "status": "created"} for i, row in rows]
+            except HTTPException as e:
+                for index, row in rows:
+                    fail("created", index, row["id"], f"Batch insert failed: {e.detail}")
+        
+        if updates:
+            try:
+                updated = set(await update(user_id, [(item_id, changes) for _, item_id, changes in updates]))
+                wrote = wrote or bool(updated)
+                written += [{"id": item_id, **changes} for _, item_id, changes in updates if item_id in updated]
+                results["updated"] += [
+                    {"index": i, "id": item_id, "status": "updated" if item_id in updated else "not_found"}
+                    for i, item_id, _ in updates
+                ]
+            except HTTPException as e:
+                for index, item_id, _ in updates:
+                    fail("updated", index, item_id, f"Batch update failed: {e.detail}")
+        
+        if batch.delete:
+            try:
+                deleted = set(await delete(user_id, batch.delete))
+                wrote = wrote or bool(deleted)
+                deleted_ids = [item_id for item_id in batch.delete if item_id in deleted]
+                results["deleted"] += [
+                    {"index": i, "id": item_id, "status": "deleted" if item_id in deleted else "not_found"}
+                    for i, item_id in enumerate(batch.delete)
+                ]
+            except HTTPException as e:
+                for index, item_id in enumerate(batch.delete):
+                    fail("deleted", index, item_id, f"Batch delete failed: {e.detail}")
+    finally:
+        if wrote:
+            invalidate_spending(user_id)
+    
+    results["alerts"] = []
+    if wrote:
+        categories = await bulk_changed_categories(user_id, started_at)
+        if kind == "transactions":
+            await publish_change(user_id, "transactions.batch", started_at, transactions=written,
+                                 deleted_transactions=deleted_ids, categories=categories)
+        else:
+            alert_engine.forget(user_id, deleted_ids)
+            await publish_change(user_id, "categories.batch", started_at, deleted_categories=deleted_ids,
+                                 categories=categories)
+        results["alerts"] = await raise_budget_alerts(user_id, categories or [])
+    
+    for section in ("created", "updated", "deleted"):
+        results[section].sort(key=lambda result: result["index"])
+    return results
+
+@app.post("/api/transactions/batch")
+async def batch_transactions(batch: BatchRequest, user_id: str = Depends(current_user_id)):
+    """Create, update and delete many transactions; results are reported per item"""
+    return await run_batch(batch, user_id, "transactions", Transaction, new_transaction_row, transaction_changes,
+                           storage.insert_transactions, storage.update_transactions,
+                           storage.delete_transactions)
+
+@app.post("/api/categories/batch")
+async def batch_categories(batch: BatchRequest, user_id: str = Depends(current_user_id)):
+    """Create, update and delete many categories; deleting one also deletes its transactions"""
+    return await run_batch(batch, user_id, "categories", BudgetCategory, new_category_row, category_changes,
+                           storage.insert_categories, storage.update_categories,
+                           storage.delete_categories)
+
 @app.put("/api/transactions/{transaction_id}", response_model=dict)
-async def update_transaction(transaction_id: str, transaction: Transaction):
+async def update_transaction(transaction_id: str, transaction: Transaction, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        transaction_data = {
-            "category_id": transaction.category_id,
-            "amount": transaction.amount,
-            "description": transaction.description,
-            "date": transaction.date.isoformat()
-        }
+        transaction_data = transaction_changes(transaction)
         
-        result = supabase_patch('transactions', {'id': transaction_id}, transaction_data)
+        # Both the old and the new category when the transaction moved
+        categories = await storage.update_transaction(user_id, transaction_id, transaction_data)
+        categories = [category_with_spending(category) for category in categories]
+        invalidate_spending(user_id)
+        # Only the changed fields; subscribers merge them into the row by id
+        await publish_change(user_id, "transaction.updated", started_at,
+                             transactions=[{"id": transaction_id, **transaction_data}], categories=categories)
+        alerts = await raise_budget_alerts(user_id, categories)
         
-        return {"message": "Transaction updated successfully"}
+        return {"message": "Transaction updated successfully", "categories": categories, "alerts": alerts}
+    except HTTPException:
+        raise
     except Exception as e:
-        if "Transaction not found" in str(e):
-            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: str):
+async def delete_transaction(transaction_id: str, user_id: str = Depends(current_user_id)):
+    started_at = await storage.clock()
     try:
-        result = supabase_delete('transactions', {'id': transaction_id})
+        categories = await storage.delete_transaction(user_id, transaction_id)
+        categories = [category_with_spending(category) for category in categories]
+        invalidate_spending(user_id)
+        await publish_change(user_id, "transaction.deleted", started_at, deleted_transactions=[transaction_id],
+                             categories=categories)
+        # Resolves alerts the spending dropped back below
+        alerts = await raise_budget_alerts(user_id, categories)
         
-        return {"message": "Transaction deleted successfully"}
+        return {"message": "Transaction deleted successfully", "categories": categories, "alerts": alerts}
+    except HTTPException:
+        raise
     except Exception as e:
-        if "Transaction not found" in str(e):
-            raise e
         raise HTTPException(status_code=500, detail=str(e))
 
 # Dashboard summary endpoint
+async def load_dashboard(user_id: str):
+    # Totals and counts are computed by the storage backend, never from raw rows
+    summary = await storage.dashboard_summary(user_id)
+    
+    total_budget = summary.get('total_budget', 0)
+    total_spent = summary.get('total_spent', 0)
+    remaining_budget = total_budget - total_spent
+    categories_count = summary.get('categories_count', 0)
+    transactions_count = summary.get('transactions_count', 0)
+    
+    return {
+        "total_budget": total_budget,
+        "total_spent": total_spent,
+        "remaining_budget": remaining_budget,
+        "categories_count": categories_count,
+        "transactions_count": transactions_count,
+        "percentage_used": (total_spent / total_budget * 100) if total_budget > 0 else 0
+    }
+
 @app.get("/api/dashboard")
-async def get_dashboard():
+async def get_dashboard(request: Request, user_id: str = Depends(current_user_id)):
     try:
-        # Get all categories
-        categories = supabase_get('budget_categories', {'select': '*'})
-        
-        total_budget = sum(cat['budget_amount'] for cat in categories)
-        
-        # Get all transactions
-        transactions = supabase_get('transactions', {'select': '*'})
+        return await cached_json(request, user_cache_key(DASHBOARD_CACHE_KEY, user_id),
+                                 lambda: load_dashboard(user_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Analytics endpoints
+@app.get("/api/analytics/spending")
+async def get_spending_series(request: Request,
+                              interval: str = "month",
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              category_id: Optional[str] = None,
+                              by_category: bool = False,
+                              user_id: str = Depends(current_user_id)):
+    """Spending per day/week/month bucket, grouped in the database.
+
+    Without start_date the series covers the last few buckets up to now
+    (see analytics.DEFAULT_BUCKETS). Every bucket in the range is present,
+    zero-filled, so charts can plot the points directly.
+    Ranges of more than SERIES_MAX_BUCKETS buckets, or ending before they
+    start, are refused with 400.
+    """
+    if interval not in SERIES_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(SERIES_INTERVALS)}")
+    if start_date and end_date and to_datetime(end_date) < to_datetime(start_date):
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    # Checked before anything is loaded or cached: a far-off start_date would otherwise
+    # build and zero-fill one bucket per day since then
+    if bucket_count(start_date or default_start(interval), end_date or datetime.now(), interval) > SERIES_MAX_BUCKETS:
+        raise HTTPException(status_code=400,
+                            detail=f"The range spans more than {SERIES_MAX_BUCKETS} {interval} buckets; narrow it or use a longer interval")
+    
+    cache_key = f"{ANALYTICS_CACHE_PREFIX}{user_id}:spending:{interval}:{start_date}:{end_date}:{category_id}:{by_category}"
+    
+    async def load():
+        start = start_date or default_start(interval)
+        rows = await storage.spending_series(user_id, interval, start, end_date, category_id, by_category)
+        buckets = bucket_range(start, end_date or datetime.now(), interval)
         
-        total_spent = sum(transaction['amount'] for transaction in transactions)
-        remaining_budget = total_budget - total_spent
-        categories_count = len(categories)
-        transactions_count = len(transactions)
+        totals = rows
+        per_category = {}
+        if by_category:
+            totals = {}
+            for row in rows:
+                per_category.setdefault(row["category_id"], []).append(row)
+                total = totals.setdefault(row["bucket"], {"bucket": row["bucket"], "total_spent": 0, "transactions_count": 0})
+                total["total_spent"] += row["total_spent"]
+                total["transactions_count"] += row["transactions_count"]
+            totals = list(totals.values())
         
-        return {
-            "total_budget": total_budget,
-            "total_spent": total_spent,
-            "remaining_budget": remaining_budget,
-            "categories_count": categories_count,
-            "transactions_count": transactions_count,
-            "percentage_used": (total_spent / total_budget * 100) if total_budget > 0 else 0
+        result = {
+            "interval": interval,
+            "start_date": start.isoformat(),
+            "end_date": end_date.isoformat() if end_date else None,
+            "series": fill_series(totals, buckets)
         }
+        if by_category:
+            result["categories"] = [
+                {"category_id": cat_id, "series": fill_series(cat_rows, buckets)}
+                for cat_id, cat_rows in per_category.items()
+            ]
+        return result
+    
+    try:
+        return await cached_json(request, cache_key, load)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Replace in-memory profile/settings with Supabase integration
-TEST_USER_ID = '00000000-0000-0000-0000-000000000001'  # Replace with real user_id from auth in production
+# Profile and settings are stored per user through the storage backend.
+# Saves are a single upsert that returns the stored row, so the response and the
+# cache entry are built from it without reading the row back.
+def profile_response(data: Optional[dict]):
+    data = data or {}
+    return {
+        'name': data.get('name') or '',
+        'email': data.get('email') or '',
+    }
+
+def settings_response(data: Optional[dict]):
+    data = data or {}
+    return {
+        'dark_mode': data.get('dark_mode', False),
+        'notifications': data.get('notifications', True),
+        'currency': data.get('currency', 'USD'),
+        'language': data.get('language', 'en'),
+        'timezone': data.get('timezone', 'America/New_York'),
+    }
+
+def store_user_row(cache_key: str, value: dict):
+    # Invalidating first bumps the cache generation, so a read that started before
+    # the save cannot overwrite the fresh value with what it loaded
+    read_cache.invalidate(cache_key)
+    read_cache.set(cache_key, value)
+    return value
 
 @app.get('/api/profile')
-def get_profile():
-    url = f"{SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{TEST_USER_ID}&select=*"
-    resp = requests.get(url, headers=get_headers())
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
-    data = resp.json()
-    if data:
-        return {
-            'name': data[0].get('name', ''),
-            'email': data[0].get('email', ''),
-        }
-    else:
-        return {'name': '', 'email': ''}
+async def get_profile(user_id: str = Depends(current_user_id)):
+    cache_key = user_cache_key(PROFILE_CACHE_KEY, user_id)
+    cached = read_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    profile = profile_response(await storage.get_profile(user_id))
+    read_cache.set(cache_key, profile, generation=generation)
+    return profile
 
 @app.put('/api/profile')
-def update_profile(data: dict = Body(...)):
-    # Check if profile exists
-    url = f"{SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{TEST_USER_ID}"
-    resp = requests.get(url, headers=get_headers())
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
-    existing = resp.json()
-    if existing:
-        # Update
-        patch_url = f"{SUPABASE_URL}/rest/v1/user_profiles?user_id=eq.{TEST_USER_ID}"
-        patch_headers = get_headers(); patch_headers['Prefer'] = 'return=representation'
-        patch_resp = requests.patch(patch_url, headers=patch_headers, json={
-            'name': data.get('name', ''),
-            'email': data.get('email', ''),
-            'updated_at': datetime.utcnow().isoformat()
-        })
-        if patch_resp.status_code not in [200, 204]:
-            raise HTTPException(status_code=patch_resp.status_code, detail=patch_resp.text)
-    else:
-        # Insert
-        post_url = f"{SUPABASE_URL}/rest/v1/user_profiles"
-        post_headers = get_headers(); post_headers['Prefer'] = 'return=representation'
-        post_resp = requests.post(post_url, headers=post_headers, json={
-            'user_id': TEST_USER_ID,
-            'name': data.get('name', ''),
-            'email': data.get('email', ''),
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
-        })
-        if post_resp.status_code not in [200, 201]:
-            raise HTTPException(status_code=post_resp.status_code, detail=post_resp.text)
-    # Return latest
-    return get_profile()
+async def update_profile(data: dict = Body(...), user_id: str = Depends(current_user_id)):
+    saved = await storage.save_profile(user_id, {
+        'name': data.get('name', ''),
+        'email': data.get('email', '')
+    })
+    return store_user_row(user_cache_key(PROFILE_CACHE_KEY, user_id), profile_response(saved))
+
+async def load_settings(user_id: str):
+    cache_key = user_cache_key(SETTINGS_CACHE_KEY, user_id)
+    cached = read_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = read_cache.generation
+    settings = settings_response(await storage.get_settings(user_id))
+    read_cache.set(cache_key, settings, generation=generation)
+    return settings
 
 @app.get('/api/settings')
-def get_settings():
-    url = f"{SUPABASE_URL}/rest/v1/user_settings?user_id=eq.{TEST_USER_ID}&select=*"
-    resp = requests.get(url, headers=get_headers())
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
-    data = resp.json()
-    if data:
-        return {
-            'dark_mode': data[0].get('dark_mode', False),
-            'notifications': data[0].get('notifications', True),
-            'currency': data[0].get('currency', 'USD'),
-            'language': data[0].get('language', 'en'),
-            'timezone': data[0].get('timezone', 'America/New_York'),
-        }
-    else:
-        return {
-            'dark_mode': False,
-            'notifications': True,
-            'currency': 'USD',
-            'language': 'en',
-            'timezone': 'America/New_York',
-        }
+async def get_settings(user_id: str = Depends(current_user_id)):
+    return await load_settings(user_id)
 
 @app.put('/api/settings')
-def update_settings(data: dict = Body(...)):
-    # Check if settings exist
-    url = f"{SUPABASE_URL}/rest/v1/user_settings?user_id=eq.{TEST_USER_ID}"
-    resp = requests.get(url, headers=get_headers())
-    if resp.status_code != 200:
-        raise HTTPException(status_code=resp.status_code, detail=resp.text)
-    existing = resp.json()
-    if existing:
-        # Update
-        patch_url = f"{SUPABASE_URL}/rest/v1/user_settings?user_id=eq.{TEST_USER_ID}"
-        patch_headers = get_headers(); patch_headers['Prefer'] = 'return=representation'
-        patch_resp = requests.patch(patch_url, headers=patch_headers, json={
-            'dark_mode': data.get('dark_mode', False),
-            'notifications': data.get('notifications', True),
-            'currency': data.get('currency', 'USD'),
-            'language': data.get('language', 'en'),
-            'timezone': data.get('timezone', 'America/New_York'),
-            'updated_at': datetime.utcnow().isoformat()
-        })
-        if patch_resp.status_code not in [200, 204]:
-            raise HTTPException(status_code=patch_resp.status_code, detail=patch_resp.text)
-    else:
-        # Insert
-        post_url = f"{SUPABASE_URL}/rest/v1/user_settings"
-        post_headers = get_headers(); post_headers['Prefer'] = 'return=representation'
-        post_resp = requests.post(post_url, headers=post_headers, json={
-            'user_id': TEST_USER_ID,
-            'dark_mode': data.get('dark_mode', False),
-            'notifications': data.get('notifications', True),
-            'currency': data.get('currency', 'USD'),
-            'language': data.get('language', 'en'),
-            'timezone': data.get('timezone', 'America/New_York'),
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
+async def update_settings(data: dict = Body(...), user_id: str = Depends(current_user_id)):
+    saved = await storage.save_settings(user_id, {
+        'dark_mode': data.get('dark_mode', False),
+        'notifications': data.get('notifications', True),
+        'currency': data.get('currency', 'USD'),
+        'language': data.get('language', 'en'),
+        'timezone': data.get('timezone', 'America/New_York')
+    })
+    return store_user_row(user_cache_key(SETTINGS_CACHE_KEY, user_id), settings_response(saved))
+
+# Notifications: the budget alerts recorded by the alert engine
+NOTIFICATIONS_PAGE_SIZE = int(os.environ.get("NOTIFICATIONS_PAGE_SIZE", "50"))
+NOTIFICATIONS_MAX_PAGE_SIZE = int(os.environ.get("NOTIFICATIONS_MAX_PAGE_SIZE", "200"))
+
+@app.get("/api/notifications")
+async def get_notifications(request: Request,
+                            unread_only: bool = False,
+                            limit: int = Query(NOTIFICATIONS_PAGE_SIZE, ge=1, le=NOTIFICATIONS_MAX_PAGE_SIZE),
+                            user_id: str = Depends(current_user_id)):
+    """The user's budget alerts, newest first; always empty while notifications are turned off"""
+    try:
+        alerts = []
+        if (await load_settings(user_id))['notifications']:
+            alerts = await storage.list_budget_alerts(user_id, limit, unread_only)
+        return conditional_json(request, *render_json([notification_response(alert) for alert in alerts]))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/notifications/read")
+async def mark_notifications_read(ids: Optional[List[str]] = Body(None, embed=True),
+                                  user_id: str = Depends(current_user_id)):
+    """Mark the given alerts read, or every unread one when no ids are sent"""
+    try:
+        return {"read": await storage.mark_budget_alerts_read(user_id, ids)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Background jobs: bulk work runs on the in-process runner (jobs.py) instead of inside
+# the request. Submitting returns the queued job (202); clients poll GET /api/jobs/{id}
+# or wait for its job.finished event, and download exports from /result.
+JOBS_PAGE_SIZE = int(os.environ.get("JOBS_PAGE_SIZE", "50"))
+JOBS_MAX_PAGE_SIZE = int(os.environ.get("JOBS_MAX_PAGE_SIZE", "200"))
+IMPORT_JOB = "import"
+EXPORT_JOB = "export"
+ROLLUP_JOB = "rollup_rebuild"
+
+def job_response(job: dict):
+    return {key: value for key, value in job.items() if key != 'user_id'}
+
+async def publish_job_finished(job: dict):
+    if broker.has_subscribers(job['user_id']):
+        broker.publish(job['user_id'], {"type": "job.finished", "job": job_response(job)})
+
+job_runner = JobRunner(storage, on_finish=publish_job_finished)
+
+Gauge("jobs_queued", "Background jobs waiting for a worker", lambda: job_runner.queued)
+Gauge("jobs_running", "Background jobs being run", lambda: job_runner.running)
+Gauge("jobs_succeeded_total", "Background jobs succeeded since startup", lambda: job_runner.finished[SUCCEEDED])
+Gauge("jobs_failed_total", "Background jobs failed since startup", lambda: job_runner.finished[FAILED])
+Gauge("jobs_cancelled_total", "Background jobs cancelled since startup", lambda: job_runner.finished[CANCELLED])
+
+async def import_job(job: JobContext, params: dict):
+    path = job.file_path("upload")
+    size = os.path.getsize(path) or 1
+    def processed(report):
+        return report["imported"] + report["failed"] + report["skipped"]
+
+    with open(path, "rb") as upload:
+        async def on_batch(report):
+            await job.progress(processed=processed(report), fraction=upload.tell() / size)
+        report = await run_import(job.user_id, upload, params["format"], params.get("category_id"), on_batch)
+    await job.progress(processed=processed(report))
+    return report
+
+async def export_job(job: JobContext, params: dict):
+    file_format = params["format"]
+    selected = parse_fields(params.get("fields"))
+    filters = transaction_filters(params.get("category_id"), to_datetime(params.get("start_date")),
+                                  to_datetime(params.get("end_date")))
+    written = 0
+
+    async def counted(pages):
+        nonlocal written
+        async for rows in pages:
+            yield rows
+            written += len(rows)
+            await job.progress(processed=written)
+
+    pages = counted(iter_transaction_pages(job.user_id, filters, selected))
+    body = export_csv(pages, selected) if file_format == "csv" else export_ndjson(pages)
+    path = job.file_path(file_format)
+    with open(path, "wb") as output:
+        async for chunk in body:
+            output.write(chunk.encode() if isinstance(chunk, str) else chunk)
+    return {"rows": written, "bytes": os.path.getsize(path)}
+
+async def rollup_job(job: JobContext, params: dict):
+    """What reconcile_totals.py does, for every user"""
+    steps = [
+        ("category_totals", storage.rebuild_category_totals),
+        ("daily_totals", storage.rebuild_daily_totals),
+        ("tombstones", lambda: storage.prune_deleted_rows(datetime.now() - timedelta(days=TOMBSTONE_RETENTION_DAYS)))
+    ]
+    for done, (_, step) in enumerate(steps, start=1):
+        await step()
+        await job.progress(processed=done, fraction=done / len(steps))
+    # Any user's cached spending may have moved
+    read_cache.clear()
+    return {"rebuilt": [name for name, _ in steps]}
+
+job_runner.register(IMPORT_JOB, import_job)
+job_runner.register(EXPORT_JOB, export_job)
+job_runner.register(ROLLUP_JOB, rollup_job)
+
+async def submit_job(user_id: str, kind: str, params: dict, **options):
+    try:
+        return job_response(await job_runner.submit(user_id, kind, params, **options))
+    except JobRejected as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+def remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+@app.post("/api/jobs/imports", status_code=202)
+async def submit_import_job(file: UploadFile = File(...),
+                            category_id: Optional[str] = None,
+                            format: Optional[str] = None,
+                            user_id: str = Depends(current_user_id)):
+    """Queue an import; the finished job's result is the report POST /api/transactions/import returns"""
+    file_format = import_format(file, format)
+    job_id = str(uuid.uuid4())
+    path = job_runner.file_path(job_id, "upload")
+    try:
+        # The upload is discarded when this request ends, so the job reads its own copy
+        with open(path, "wb") as spool:
+            await run_in_threadpool(shutil.copyfileobj, file.file, spool)
+        return await submit_job(user_id, IMPORT_JOB, {
+            "format": file_format,
+            "category_id": category_id,
+            "filename": file.filename
+        }, cleanup=lambda: remove_file(path), job_id=job_id)
+    except HTTPException:
+        remove_file(path)
+        raise
+    except Exception as e:
+        remove_file(path)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/exports", status_code=202)
+async def submit_export_job(format: str = "ndjson",
+                            category_id: Optional[str] = None,
+                            start_date: Optional[datetime] = None,
+                            end_date: Optional[datetime] = None,
+                            fields: Optional[str] = None,
+                            user_id: str = Depends(current_user_id)):
+    """Queue an export with the options of GET /api/transactions/export; download it from /result"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    parse_fields(fields)
+    try:
+        return await submit_job(user_id, EXPORT_JOB, {
+            "format": format,
+            "category_id": category_id,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None,
+            "fields": fields
         })
-        if post_resp.status_code not in [200, 201]:
-            raise HTTPException(status_code=post_resp.status_code, detail=post_resp.text)
-    # Return latest
-    return get_settings()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/rollups", status_code=202)
+async def submit_rollup_job(user_id: str = Depends(admin_user_id)):
+    """Queue a rebuild of every user's category totals and daily rollups"""
+    try:
+        return await submit_job(user_id, ROLLUP_JOB, {})
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs")
+async def get_jobs(status: Optional[str] = None,
+                   limit: int = Query(JOBS_PAGE_SIZE, ge=1, le=JOBS_MAX_PAGE_SIZE),
+                   user_id: str = Depends(current_user_id)):
+    """The user's jobs, newest first"""
+    try:
+        return [job_response(job) for job in await storage.list_jobs(user_id, limit, status)]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def load_job(user_id: str, job_id: str):
+    job = await storage.get_job(user_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, user_id: str = Depends(current_user_id)):
+    """Status, progress (processed units, and the completed fraction when known), result or error"""
+    try:
+        return job_response(await load_job(user_id, job_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str, user_id: str = Depends(current_user_id)):
+    """Cancel a queued or running job; returns the job, unchanged when it had already finished.
+
+    A running import keeps the batches it had already written.
+    """
+    try:
+        job = await job_runner.cancel(user_id, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job_response(job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, user_id: str = Depends(current_user_id)):
+    """The file a finished export job wrote"""
+    try:
+        job = await load_job(user_id, job_id)
+        if job['kind'] != EXPORT_JOB:
+            raise HTTPException(status_code=404, detail="This job has no file; its result is in the job")
+        if job['status'] != SUCCEEDED:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+        file_format = job['params']['format']
+        path = job_runner.file_path(job_id, file_format)
+        if not os.path.exists(path):
+            raise HTTPException(status_code=404, detail="Export file not found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return FileResponse(path, media_type=EXPORT_FORMATS[file_format], filename=f"transactions.{file_format}")
+
+# Server-Sent Events: one stream of the user's change events for every open tab or device
+@app.get("/api/events")
+async def stream_events(request: Request, user_id: str = Depends(current_user_id)):
+    """Push category and transaction changes as they are written.
+
+    Each event carries the changed transactions (updates as partial rows to
+    merge by id), deleted ids, and the affected categories with their new
+    spending. Reconnecting clients send Last-Event-ID and get what they
+    missed, or a `resync` event when that is no longer available.
+    EventSource cannot set headers, so browsers pass ?access_token=.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    subscription = broker.subscribe(user_id, int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+    return StreamingResponse(
+        broker.stream(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Operational endpoints expose route latencies, error counts and cache/job internals
+@app.get('/api/cache/stats')
+async def get_cache_stats(reader: str = Depends(metrics_reader)):
+    return {**read_cache.stats(), "loads": cache_loads.stats()}
+
+@app.get('/api/metrics', response_class=PlainTextResponse)
+async def get_metrics(reader: str = Depends(metrics_reader)):
+    # Prometheus text exposition format
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.on_event("startup")
 async def startup_event():
     print("🚀 Budget Bubbles API starting up...")
-    print(f"📊 Connected to Supabase at: {SUPABASE_URL}")
+    await storage.startup()
+    print(f"📊 Using {storage.name} storage backend")
+    await job_runner.start()
+    if not SUPABASE_JWT_SECRET:
+        print(f"🔓 SUPABASE_JWT_SECRET not set; every request acts as user {DEFAULT_USER_ID}")
     # Test connection
     try:
         # Try to access the categories table
-        supabase_get('budget_categories', {'select': '*', 'limit': '1'})
+        await storage.dashboard_summary(DEFAULT_USER_ID)
         print("✅ Successfully connected to budget_categories table")
     except Exception as e:
         print(f"⚠️  Could not access budget_categories table: {str(e)}")
         print("💡 Please create the tables manually in Supabase SQL Editor")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await job_runner.stop()
+    await storage.shutdown()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,990 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from storage import Storage, with_spending, to_datetime
+from search import InvertedIndex
+
+try:
+    import asyncpg
+except ImportError:  # only needed for STORAGE_BACKEND=postgres
+    asyncpg = None
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# SQLite configuration
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(BACKEND_DIR, "budget_bubbles.db"))
+SQLITE_SCHEMA_PATH = os.path.join(BACKEND_DIR, "sqlite_schema.sql")
+SQLITE_STATEMENT_CACHE_SIZE = int(os.environ.get("SQLITE_STATEMENT_CACHE_SIZE", "128"))
+# Ranked search candidates are read back and filtered this many ids at a time
+SEARCH_FETCH_CHUNK = int(os.environ.get("SEARCH_FETCH_CHUNK", "500"))
+
+# Owner of the categories and transactions written before they were scoped per user
+LEGACY_USER_ID = "00000000-0000-0000-0000-000000000001"
+
+# Columns added after a table was first created: (table, column, type). The schema
+# script only creates missing tables, so older databases get these via ALTER TABLE.
+SQLITE_ADDED_COLUMNS = [
+    ("transactions", "updated_at", "TEXT"),
+    ("category_totals", "updated_at", "TEXT"),
+    # Rows from before per-user scoping belong to the former single test user
+    ("budget_categories", "user_id", f"TEXT NOT NULL DEFAULT '{LEGACY_USER_ID}'"),
+    ("transactions", "user_id", f"TEXT NOT NULL DEFAULT '{LEGACY_USER_ID}'"),
+    ("deleted_rows", "user_id", f"TEXT NOT NULL DEFAULT '{LEGACY_USER_ID}'")
+]
+
+# Postgres configuration
+DATABASE_URL = os.environ.get("DATABASE_URL")
+PG_POOL_MIN_SIZE = int(os.environ.get("PG_POOL_MIN_SIZE", "2"))
+PG_POOL_MAX_SIZE = int(os.environ.get("PG_POOL_MAX_SIZE", "10"))
+# Per-connection LRU of prepared statements; covers the dynamic transaction listing queries
+PG_STATEMENT_CACHE_SIZE = int(os.environ.get("PG_STATEMENT_CACHE_SIZE", "100"))
+PG_ACQUIRE_TIMEOUT = float(os.environ.get("PG_ACQUIRE_TIMEOUT", "5"))
+PG_COMMAND_TIMEOUT = float(os.environ.get("PG_COMMAND_TIMEOUT", "30"))
+
+# Columns stored as TIMESTAMP; values are passed to the driver as datetimes
+DATETIME_COLUMNS = {"date", "created_at", "updated_at", "started_at", "finished_at"}
+# Job columns holding JSON objects: jsonb on Postgres, text on SQLite
+JOB_JSON_COLUMNS = ("params", "result")
+# Statuses of jobs not yet over (jobs.UNFINISHED_STATUSES)
+UNFINISHED_JOBS_SQL = "status IN ('queued', 'running')"
+
+# Queries are written once with Postgres-style $n placeholders; SQLite runs them as ?n
+# Spending reads come from category_totals, which the schema's triggers keep current.
+# Every read is scoped to one user ($1) through the user_id indexes.
+CATEGORY_SPENDING_SQL = """
+SELECT c.id, c.name, c.budget_amount, c.color, c.created_at, c.updated_at,
+       COALESCE(ct.total_spent, 0) AS total_spent
+FROM budget_categories c
+LEFT JOIN category_totals ct ON ct.category_id = c.id
+WHERE c.user_id = $1
+ORDER BY c.created_at ASC
+"""
+
+# Transactions without a category are not counted, as in category_totals
+DASHBOARD_SUMMARY_SQL = """
+SELECT COALESCE(SUM(c.budget_amount), 0) AS total_budget,
+       COALESCE(SUM(ct.total_spent), 0) AS total_spent,
+       COUNT(*) AS categories_count,
+       COALESCE(SUM(ct.transactions_count), 0) AS transactions_count
+FROM budget_categories c
+LEFT JOIN category_totals ct ON ct.category_id = c.id
+WHERE c.user_id = $1
+"""
+
+REBUILD_CATEGORY_TOTALS_SQL = [
+    "DELETE FROM category_totals",
+    """
+    INSERT INTO category_totals (category_id, total_spent, transactions_count)
+    SELECT category_id, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY category_id
+    """
+]
+
+REBUILD_DAILY_TOTALS_SQL = [
+    "DELETE FROM daily_category_totals",
+    """
+    INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+    SELECT category_id, {day}, SUM(amount), COUNT(*)
+    FROM transactions
+    WHERE category_id IS NOT NULL
+    GROUP BY category_id, {day}
+    """
+]
+
+# Fixed hot-path queries, prepared once per connection by engines that support it
+HOT_STATEMENTS = {
+    "category_spending": CATEGORY_SPENDING_SQL,
+    "dashboard_summary": DASHBOARD_SUMMARY_SQL
+}
+
+INSERT_CATEGORY_SQL = """
+INSERT INTO budget_categories (id, name, budget_amount, color, created_at, updated_at, user_id)
+VALUES ($1, $2, $3, $4, $5, $6, $7)
+"""
+
+INSERT_TRANSACTION_SQL = """
+INSERT INTO transactions (id, category_id, amount, description, date, created_at, updated_at, user_id)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+"""
+
+# Skips the alert when an active one already exists for the category and threshold,
+# or when the category is not the user's
+INSERT_BUDGET_ALERT_SQL = """
+INSERT INTO budget_alerts (id, user_id, category_id, category_name, threshold, percentage_used,
+                           total_spent, budget_amount, created_at)
+SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9
+WHERE EXISTS (SELECT 1 FROM budget_categories WHERE id = $3 AND user_id = $2)
+ON CONFLICT (category_id, threshold) WHERE resolved_at IS NULL DO NOTHING
+RETURNING *
+"""
+
+# Spending for a few of the user's categories, returned by single-row writes;
+# {ids} is filled with placeholders from $2 on
+CATEGORIES_SPENDING_SQL = """
+SELECT c.id, c.name, c.budget_amount, c.color, c.created_at, c.updated_at,
+       COALESCE(ct.total_spent, 0) AS total_spent
+FROM budget_categories c
+LEFT JOIN category_totals ct ON ct.category_id = c.id
+WHERE c.user_id = $1 AND c.id IN ({ids})
+ORDER BY c.created_at ASC
+"""
+
+# The user's categories whose row or totals changed since $2, for delta sync
+CATEGORY_CHANGES_SQL = """
+SELECT c.id, c.name, c.budget_amount, c.color, c.created_at, c.updated_at,
+       COALESCE(ct.total_spent, 0) AS total_spent
+FROM budget_categories c
+LEFT JOIN category_totals ct ON ct.category_id = c.id
+WHERE c.user_id = $1 AND (c.updated_at >= $2 OR ct.updated_at >= $2)
+ORDER BY c.created_at ASC
+"""
+
+def to_json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+def to_json_row(record):
+    return {key: to_json_value(value) for key, value in dict(record).items()}
+
+def db_value(column: str, value):
+    return to_datetime(value) if column in DATETIME_COLUMNS else value
+
+def placeholders(first: int, count: int):
+    return ", ".join(f"${i}" for i in range(first, first + count))
+
+def category_args(user_id: str, category: dict):
+    return (
+        category['id'],
+        category['name'],
+        category['budget_amount'],
+        category['color'],
+        to_datetime(category['created_at']),
+        to_datetime(category['updated_at']),
+        user_id
+    )
+
+def update_statement(table: str, user_id: str, row_id: str, changes: dict):
+    columns = list(changes)
+    assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=1))
+    sql = f"UPDATE {table} SET {assignments} WHERE id = ${len(columns) + 1} AND user_id = ${len(columns) + 2}"
+    return sql, [db_value(column, changes[column]) for column in columns] + [row_id, user_id]
+
+def settings_row(settings: Optional[dict]):
+    if settings:
+        # SQLite hands booleans back as 0/1
+        for key in ('dark_mode', 'notifications'):
+            if settings.get(key) is not None:
+                settings[key] = bool(settings[key])
+    return settings
+
+def job_value(column: str, value):
+    if column in JOB_JSON_COLUMNS:
+        return json.dumps(value) if value is not None else None
+    return db_value(column, value)
+
+def job_row(job: Optional[dict]):
+    if job:
+        for column in JOB_JSON_COLUMNS:
+            if isinstance(job[column], str):
+                job[column] = json.loads(job[column])
+        job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+def transaction_args(user_id: str, transaction: dict):
+    return (
+        transaction['id'],
+        transaction['category_id'],
+        transaction['amount'],
+        transaction['description'],
+        to_datetime(transaction['date']),
+        to_datetime(transaction['created_at']),
+        to_datetime(transaction.get('updated_at') or transaction['created_at']),
+        user_id
+    )
+
+class SQLStorage(Storage):
+    """Queries shared by the direct-SQL engines.
+
+    Subclasses provide `connection()` and `transaction()` async context managers
+    yielding an object with fetch/fetchrow/execute/executemany, plus
+    fetch_hot/fetchrow_hot for the named statements in HOT_STATEMENTS.
+    """
+
+    def connection(self):
+        raise NotImplementedError
+
+    def transaction(self):
+        raise NotImplementedError
+
+    async def database_now(self):
+        async with self.connection() as conn:
+            return (await conn.fetchrow("SELECT LOCALTIMESTAMP AS now"))['now']
+
+    # Categories
+    async def list_category_spending(self, user_id: str):
+        async with self.connection() as conn:
+            rows = await conn.fetch_hot("category_spending", user_id)
+        return [with_spending(row) for row in rows]
+
+    async def list_category_changes(self, user_id: str, since: datetime):
+        async with self.connection() as conn:
+            rows = await conn.fetch(CATEGORY_CHANGES_SQL, user_id, to_datetime(since))
+        return [with_spending(row) for row in rows]
+
+    async def create_category(self, user_id: str, category: dict):
+        await self._insert('budget_categories', {**category, 'user_id': user_id})
+
+    async def update_category(self, user_id: str, category_id: str, changes: dict):
+        async with self.transaction() as conn:
+            sql, args = update_statement('budget_categories', user_id, category_id, changes)
+            if not await conn.execute(sql, *args):
+                raise HTTPException(status_code=404, detail="Category not found")
+            return (await self._category_spending(conn, user_id, [category_id]))[0]
+
+    async def delete_category(self, user_id: str, category_id: str):
+        async with self.connection() as conn:
+            if not await self._delete_category(conn, user_id, category_id):
+                raise HTTPException(status_code=404, detail="Category not found")
+
+    async def insert_categories(self, user_id: str, categories: List[dict]):
+        async with self.transaction() as conn:
+            await conn.executemany(INSERT_CATEGORY_SQL, [category_args(user_id, c) for c in categories])
+
+    async def update_categories(self, user_id: str, updates: List[Tuple[str, dict]]):
+        return await self._update_many('budget_categories', user_id, updates)
+
+    async def delete_categories(self, user_id: str, category_ids: List[str]):
+        deleted = []
+        async with self.transaction() as conn:
+            for category_id in category_ids:
+                if await self._delete_category(conn, user_id, category_id):
+                    deleted.append(category_id)
+        return deleted
+
+    async def _delete_category(self, conn, user_id: str, category_id: str):
+        # The category's transactions, totals and rollups go with it through ON DELETE CASCADE
+        return await conn.execute("DELETE FROM budget_categories WHERE id = $1 AND user_id = $2", category_id, user_id)
+
+    async def owned_category_ids(self, user_id: str, category_ids: List[str]):
+        if not category_ids:
+            return []
+        async with self.connection() as conn:
+            return await self._owned_category_ids(conn, user_id, category_ids)
+
+    async def _owned_category_ids(self, conn, user_id: str, category_ids: List[str]):
+        rows = await conn.fetch(
+            f"SELECT id FROM budget_categories WHERE user_id = $1 AND id IN ({placeholders(2, len(category_ids))})",
+            user_id, *category_ids
+        )
+        return [row['id'] for row in rows]
+
+    async def _check_category(self, conn, user_id: str, category_id: str):
+        if not await self._owned_category_ids(conn, user_id, [category_id]):
+            raise HTTPException(status_code=404, detail="Category not found")
+
+    async def _category_spending(self, conn, user_id: str, category_ids: List[Optional[str]]):
+        category_ids = list(dict.fromkeys(c for c in category_ids if c))
+        if not category_ids:
+            return []
+        rows = await conn.fetch(
+            CATEGORIES_SPENDING_SQL.format(ids=placeholders(2, len(category_ids))),
+            user_id, *category_ids
+        )
+        return [with_spending(row) for row in rows]
+
+    # Transactions
+    async def list_transactions(self, user_id: str, columns: List[str], limit: int,
+                                category_id: Optional[str] = None,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                after: Optional[Tuple[str, str]] = None):
+        conditions = []
+        args = []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        # Leading user_id keeps every variant on the (user_id, [category_id,] date, id) indexes
+        conditions.append(f"user_id = {arg(user_id)}")
+        if category_id:
+            conditions.append(f"category_id = {arg(category_id)}")
+        if start_date:
+            conditions.append(f"date >= {arg(to_datetime(start_date))}")
+        if end_date:
+            conditions.append(f"date <= {arg(to_datetime(end_date))}")
+        if after:
+            after_date, after_id = after
+            conditions.append(f"(date, id) < ({arg(to_datetime(after_date))}, {arg(after_id)})")
+
+        # Column names come from the endpoint's whitelist, never from raw input.
+        # The SQL text only varies with the selected columns and filters, so each variant
+        # is prepared once per connection and reused from the statement cache.
+        sql = f"SELECT {', '.join(columns)} FROM transactions WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY date DESC, id DESC LIMIT {arg(limit)}"
+
+        async with self.connection() as conn:
+            return await conn.fetch(sql, *args)
+
+    # Single-row writes check ownership, write and read back the affected spending
+    # in one local transaction
+    async def create_transaction(self, user_id: str, transaction: dict):
+        async with self.transaction() as conn:
+            await self._check_category(conn, user_id, transaction['category_id'])
+            await conn.execute(INSERT_TRANSACTION_SQL, *transaction_args(user_id, transaction))
+            return await self._category_spending(conn, user_id, [transaction['category_id']])
+
+    async def insert_transactions(self, user_id: str, transactions: List[dict]):
+        async with self.transaction() as conn:
+            await conn.executemany(INSERT_TRANSACTION_SQL, [transaction_args(user_id, t) for t in transactions])
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict):
+        async with self.transaction() as conn:
+            current = await conn.fetchrow(
+                "SELECT category_id FROM transactions WHERE id = $1 AND user_id = $2", transaction_id, user_id
+            )
+            if current is None:
+                raise HTTPException(status_code=404, detail="Transaction not found")
+            new_category_id = changes.get('category_id')
+            if new_category_id and new_category_id != current['category_id']:
+                await self._check_category(conn, user_id, new_category_id)
+            sql, args = update_statement('transactions', user_id, transaction_id, changes)
+            await conn.execute(sql, *args)
+            return await self._category_spending(conn, user_id, [current['category_id'], new_category_id])
+
+    async def delete_transaction(self, user_id: str, transaction_id: str):
+        async with self.transaction() as conn:
+            deleted = await conn.fetchrow(
+                "DELETE FROM transactions WHERE id = $1 AND user_id = $2 RETURNING category_id",
+                transaction_id, user_id
+            )
+            if deleted is None:
+                raise HTTPException(status_code=404, detail="Transaction not found")
+            return await self._category_spending(conn, user_id, [deleted['category_id']])
+
+    async def update_transactions(self, user_id: str, updates: List[Tuple[str, dict]]):
+        return await self._update_many('transactions', user_id, updates)
+
+    async def delete_transactions(self, user_id: str, transaction_ids: List[str]):
+        deleted = []
+        async with self.transaction() as conn:
+            for transaction_id in transaction_ids:
+                if await conn.execute("DELETE FROM transactions WHERE id = $1 AND user_id = $2",
+                                      transaction_id, user_id):
+                    deleted.append(transaction_id)
+        return deleted
+
+    async def rebuild_category_totals(self):
+        async with self.transaction() as conn:
+            await self._lock_transactions_table(conn)
+            for sql in REBUILD_CATEGORY_TOTALS_SQL:
+                await conn.execute(sql)
+
+    async def rebuild_daily_totals(self):
+        async with self.transaction() as conn:
+            await self._lock_transactions_table(conn)
+            for sql in REBUILD_DAILY_TOTALS_SQL:
+                await conn.execute(sql.format(day=self.DAY_SQL))
+
+    # Delta sync
+    async def list_transaction_changes(self, user_id: str, columns: List[str], since: datetime, limit: int):
+        sql = (f"SELECT {', '.join(columns)} FROM transactions WHERE user_id = $1 AND updated_at >= $2 "
+               "ORDER BY updated_at ASC, id ASC LIMIT $3")
+        async with self.connection() as conn:
+            return await conn.fetch(sql, user_id, to_datetime(since), limit)
+
+    async def list_deleted_ids(self, user_id: str, table: str, since: datetime):
+        async with self.connection() as conn:
+            rows = await conn.fetch(
+                "SELECT id FROM deleted_rows WHERE user_id = $1 AND table_name = $2 AND deleted_at >= $3",
+                user_id, table, to_datetime(since)
+            )
+        return [row['id'] for row in rows]
+
+    async def prune_deleted_rows(self, before: datetime):
+        async with self.connection() as conn:
+            await conn.execute("DELETE FROM deleted_rows WHERE deleted_at < $1", to_datetime(before))
+
+    # Dashboard
+    async def dashboard_summary(self, user_id: str):
+        async with self.connection() as conn:
+            return await conn.fetchrow_hot("dashboard_summary", user_id) or {}
+
+    # Analytics
+    # Expression truncating transactions.date to its rollup day, and per interval
+    # the expression truncating daily_category_totals.day to the bucket start date
+    DAY_SQL = None
+    BUCKET_SQL = {}
+
+    async def spending_series(self, user_id: str, interval: str, start_date=None, end_date=None,
+                              category_id=None, by_category=False):
+        conditions = []
+        args = []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        # The rollups carry no user_id; they are reached through the user's categories
+        conditions.append(f"category_id IN (SELECT id FROM budget_categories WHERE user_id = {arg(user_id)})")
+        if category_id:
+            conditions.append(f"category_id = {arg(category_id)}")
+        if start_date:
+            conditions.append(f"day >= {arg(to_datetime(start_date).date())}")
+        if end_date:
+            conditions.append(f"day <= {arg(to_datetime(end_date).date())}")
+
+        # Reads the daily rollups: cost grows with days x categories, not transactions
+        group = ["bucket", "category_id"] if by_category else ["bucket"]
+        sql = f"""
+        SELECT {self.BUCKET_SQL[interval]} AS bucket{', category_id' if by_category else ''},
+               SUM(total_spent) AS total_spent,
+               CAST(SUM(transactions_count) AS BIGINT) AS transactions_count
+        FROM daily_category_totals
+        WHERE """ + " AND ".join(conditions)
+        sql += f" GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}"
+
+        async with self.connection() as conn:
+            return await conn.fetch(sql, *args)
+
+    # Profile and settings
+    async def get_profile(self, user_id: str):
+        async with self.connection() as conn:
+            return await conn.fetchrow("SELECT * FROM user_profiles WHERE user_id = $1", user_id)
+
+    async def save_profile(self, user_id: str, profile: dict):
+        return await self._upsert_user_row('user_profiles', user_id, profile)
+
+    async def get_settings(self, user_id: str):
+        async with self.connection() as conn:
+            settings = await conn.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", user_id)
+        return settings_row(settings)
+
+    async def save_settings(self, user_id: str, settings: dict):
+        return settings_row(await self._upsert_user_row('user_settings', user_id, settings))
+
+    # Budget alerts
+    async def active_alert_levels(self, user_id: str):
+        async with self.connection() as conn:
+            rows = await conn.fetch(
+                "SELECT category_id, MAX(threshold) AS level FROM budget_alerts "
+                "WHERE user_id = $1 AND resolved_at IS NULL GROUP BY category_id",
+                user_id
+            )
+        return {row['category_id']: row['level'] for row in rows}
+
+    async def record_budget_alerts(self, user_id: str, alerts: List[dict]):
+        recorded = []
+        async with self.transaction() as conn:
+            for alert in alerts:
+                # DO NOTHING when another write already recorded this crossing
+                row = await conn.fetchrow(
+                    INSERT_BUDGET_ALERT_SQL,
+                    alert['id'], user_id, alert['category_id'], alert['category_name'], alert['threshold'],
+                    alert['percentage_used'], alert['total_spent'], alert['budget_amount'],
+                    to_datetime(alert['created_at'])
+                )
+                if row is not None:
+                    recorded.append(row)
+        return recorded
+
+    async def resolve_budget_alerts(self, user_id: str, category_id: str, level: float):
+        async with self.connection() as conn:
+            await conn.execute(
+                "UPDATE budget_alerts SET resolved_at = $1 "
+                "WHERE category_id = $2 AND user_id = $3 AND threshold > $4 AND resolved_at IS NULL",
+                datetime.now(), category_id, user_id, level
+            )
+
+    async def list_budget_alerts(self, user_id: str, limit: int, unread_only: bool = False):
+        sql = "SELECT * FROM budget_alerts WHERE user_id = $1"
+        if unread_only:
+            sql += " AND read_at IS NULL"
+        sql += " ORDER BY created_at DESC, threshold DESC LIMIT $2"
+        async with self.connection() as conn:
+            return await conn.fetch(sql, user_id, limit)
+
+    async def mark_budget_alerts_read(self, user_id: str, alert_ids: Optional[List[str]] = None):
+        sql = "UPDATE budget_alerts SET read_at = $1 WHERE user_id = $2 AND read_at IS NULL"
+        args = [datetime.now(), user_id]
+        if alert_ids is not None:
+            if not alert_ids:
+                return []
+            sql += f" AND id IN ({placeholders(3, len(alert_ids))})"
+            args += alert_ids
+        async with self.connection() as conn:
+            rows = await conn.fetch(sql + " RETURNING id", *args)
+        return [row['id'] for row in rows]
+
+    # Background jobs
+    async def create_job(self, job: dict):
+        columns = list(job)
+        sql = f"INSERT INTO jobs ({', '.join(columns)}) VALUES ({placeholders(1, len(columns))}) RETURNING *"
+        async with self.connection() as conn:
+            return job_row(await conn.fetchrow(sql, *[job_value(column, job[column]) for column in columns]))
+
+    async def update_job(self, job_id: str, changes: dict):
+        columns = list(changes)
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=1))
+        sql = f"UPDATE jobs SET {assignments} WHERE id = ${len(columns) + 1} RETURNING *"
+        async with self.connection() as conn:
+            return job_row(await conn.fetchrow(sql, *[job_value(column, changes[column]) for column in columns], job_id))
+
+    async def get_job(self, user_id: str, job_id: str):
+        async with self.connection() as conn:
+            return job_row(await conn.fetchrow("SELECT * FROM jobs WHERE id = $1 AND user_id = $2", job_id, user_id))
+
+    async def list_jobs(self, user_id: str, limit: int, status: Optional[str] = None):
+        sql = "SELECT * FROM jobs WHERE user_id = $1"
+        args = [user_id]
+        if status:
+            sql += " AND status = $2"
+            args.append(status)
+        sql += f" ORDER BY created_at DESC, id DESC LIMIT ${len(args) + 1}"
+        async with self.connection() as conn:
+            return [job_row(row) for row in await conn.fetch(sql, *args, limit)]
+
+    async def request_job_cancel(self, user_id: str, job_id: str):
+        async with self.connection() as conn:
+            return job_row(await conn.fetchrow(
+                f"UPDATE jobs SET cancel_requested = TRUE "
+                f"WHERE id = $1 AND user_id = $2 AND {UNFINISHED_JOBS_SQL} RETURNING *",
+                job_id, user_id
+            ))
+
+    async def fail_stale_jobs(self, before: datetime, error: str):
+        async with self.connection() as conn:
+            rows = await conn.fetch(
+                f"UPDATE jobs SET status = 'failed', error = $1, finished_at = $2, updated_at = $2 "
+                f"WHERE status = 'running' AND updated_at < $3 RETURNING id",
+                error, datetime.now(), before
+            )
+        return [row['id'] for row in rows]
+
+    async def prune_jobs(self, before: datetime):
+        async with self.connection() as conn:
+            rows = await conn.fetch(
+                f"DELETE FROM jobs WHERE NOT {UNFINISHED_JOBS_SQL} AND finished_at < $1 RETURNING id", before
+            )
+        return [row['id'] for row in rows]
+
+    # Helpers; table and column names are always supplied by server code
+    async def _lock_transactions_table(self, conn):
+        """Block concurrent transaction writes for the rest of the current transaction"""
+        pass
+
+    async def _insert(self, table: str, row: dict):
+        columns = list(row)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders(1, len(columns))})"
+        async with self.connection() as conn:
+            await conn.execute(sql, *[db_value(column, row[column]) for column in columns])
+
+    async def _update_many(self, table: str, user_id: str, updates: List[Tuple[str, dict]]):
+        # One local transaction; statements are cheap without a network hop per row
+        updated = []
+        async with self.transaction() as conn:
+            for row_id, changes in updates:
+                sql, args = update_statement(table, user_id, row_id, changes)
+                if await conn.execute(sql, *args):
+                    updated.append(row_id)
+        return updated
+
+    async def _upsert_user_row(self, table: str, user_id: str, data: dict):
+        now = datetime.utcnow()
+        row = {'user_id': user_id, **data, 'created_at': now, 'updated_at': now}
+        columns = list(row)
+        updates = ", ".join(
+            f"{column} = excluded.{column}" for column in columns
+            if column not in ('user_id', 'created_at')
+        )
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders(1, len(columns))}) "
+            f"ON CONFLICT (user_id) DO UPDATE SET {updates} RETURNING *"
+        )
+        async with self.connection() as conn:
+            return await conn.fetchrow(sql, *[row[column] for column in columns])
+
+# SQLite
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+
+def sqlite_sql(sql: str):
+    return _PLACEHOLDER.sub(r"?\1", sql)
+
+def sqlite_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+class SQLiteConnection:
+    """Runs statements on the storage's single connection thread"""
+
+    def __init__(self, conn: sqlite3.Connection, executor: ThreadPoolExecutor):
+        self._conn = conn
+        self._executor = executor
+
+    async def _run(self, fn):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+        except sqlite3.IntegrityError as e:
+            raise HTTPException(status_code=409, detail=f"SQLite error: {str(e)}")
+        except sqlite3.Error as e:
+            raise HTTPException(status_code=500, detail=f"SQLite error: {str(e)}")
+
+    async def fetch(self, sql: str, *args):
+        def run():
+            cursor = self._conn.execute(sqlite_sql(sql), [sqlite_value(a) for a in args])
+            return [to_json_row(row) for row in cursor.fetchall()]
+        return await self._run(run)
+
+    async def fetchrow(self, sql: str, *args):
+        rows = await self.fetch(sql, *args)
+        return rows[0] if rows else None
+
+    async def fetch_hot(self, name: str, *args):
+        # sqlite3 keeps its own per-connection cache of compiled statements
+        return await self.fetch(HOT_STATEMENTS[name], *args)
+
+    async def fetchrow_hot(self, name: str, *args):
+        return await self.fetchrow(HOT_STATEMENTS[name], *args)
+
+    async def execute(self, sql: str, *args):
+        def run():
+            return self._conn.execute(sqlite_sql(sql), [sqlite_value(a) for a in args]).rowcount
+        return await self._run(run)
+
+    async def executemany(self, sql: str, rows):
+        def run():
+            self._conn.executemany(sqlite_sql(sql), [[sqlite_value(a) for a in row] for row in rows])
+        return await self._run(run)
+
+class SQLiteStorage(SQLStorage):
+    """Local single-file backend; every statement runs on one dedicated thread"""
+
+    name = "sqlite"
+
+    # Timestamps and days are ISO text; weeks start on Monday to match Postgres date_trunc
+    DAY_SQL = "date(date)"
+    BUCKET_SQL = {
+        "day": "day",
+        "week": "date(day, '-6 days', 'weekday 1')",
+        "month": "date(day, 'start of month')"
+    }
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or SQLITE_PATH
+        self._conn = None
+        self._executor = None
+        self._lock = None
+        # user_id -> InvertedIndex over that user's descriptions, built on first search
+        self._search_indexes = {}
+
+    async def startup(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._lock = asyncio.Lock()
+
+        def connect():
+            # Autocommit mode; transaction() issues BEGIN/COMMIT explicitly
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=SQLITE_STATEMENT_CACHE_SIZE)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            for table, column, column_type in SQLITE_ADDED_COLUMNS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if existing and column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            with open(SQLITE_SCHEMA_PATH) as f:
+                conn.executescript(f.read())
+            return conn
+
+        self._conn = await asyncio.get_running_loop().run_in_executor(self._executor, connect)
+
+    async def shutdown(self):
+        if self._conn is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def clock(self):
+        # The schema's triggers stamp with this machine's local time
+        return datetime.now()
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._lock:
+            yield SQLiteConnection(self._conn, self._executor)
+
+    @asynccontextmanager
+    async def transaction(self):
+        async with self._lock:
+            conn = SQLiteConnection(self._conn, self._executor)
+            await conn.execute("BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                await conn.execute("ROLLBACK")
+                raise
+            await conn.execute("COMMIT")
+
+    # Description search. SQLite has no trigram index, so each user's descriptions go
+    # into an in-memory InvertedIndex, loaded on their first search and kept current by
+    # the transaction writes below. Ranked ids are read back in chunks with the filters
+    # applied in SQL; ids of rows removed behind the index's back (a category delete
+    # cascades) simply find nothing.
+    async def search_transactions(self, user_id: str, query: str, limit: int, offset: int = 0,
+                                  category_id: Optional[str] = None,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None,
+                                  min_amount: Optional[float] = None,
+                                  max_amount: Optional[float] = None):
+        index = await self._search_index(user_id)
+        ranked = index.search(query)
+
+        conditions = []
+        args = []
+
+        def arg(value):
+            args.append(value)
+            return f"${len(args)}"
+
+        conditions.append(f"user_id = {arg(user_id)}")
+        if category_id:
+            conditions.append(f"category_id = {arg(category_id)}")
+        if start_date:
+            conditions.append(f"date >= {arg(to_datetime(start_date))}")
+        if end_date:
+            conditions.append(f"date <= {arg(to_datetime(end_date))}")
+        if min_amount is not None:
+            conditions.append(f"amount >= {arg(min_amount)}")
+        if max_amount is not None:
+            conditions.append(f"amount <= {arg(max_amount)}")
+        sql = "SELECT * FROM transactions WHERE " + " AND ".join(conditions)
+
+        wanted = offset + limit
+        results = []
+        async with self.connection() as conn:
+            while len(results) < wanted:
+                chunk = list(islice(ranked, SEARCH_FETCH_CHUNK))
+                if not chunk:
+                    break
+                rows = await conn.fetch(
+                    f"{sql} AND id IN ({placeholders(len(args) + 1, len(chunk))})",
+                    *args, *[doc_id for doc_id, _ in chunk]
+                )
+                by_id = {row['id']: row for row in rows}
+                results.extend({**by_id[doc_id], 'rank': score} for doc_id, score in chunk if doc_id in by_id)
+        return results[offset:wanted]
+
+    async def _search_index(self, user_id: str):
+        index = self._search_indexes.get(user_id)
+        if index is not None:
+            return index
+
+        def build():
+            index = InvertedIndex()
+            for row in self._conn.execute("SELECT id, description FROM transactions WHERE user_id = ?", (user_id,)):
+                index.add(row["id"], row["description"])
+            return index
+
+        # Built on the connection thread under the lock, so no write lands mid-build
+        async with self._lock:
+            if user_id not in self._search_indexes:
+                self._search_indexes[user_id] = await asyncio.get_running_loop().run_in_executor(self._executor, build)
+        return self._search_indexes[user_id]
+
+    async def create_transaction(self, user_id: str, transaction: dict):
+        categories = await super().create_transaction(user_id, transaction)
+        self._reindex(user_id, [(transaction['id'], transaction)])
+        return categories
+
+    async def insert_transactions(self, user_id: str, transactions: List[dict]):
+        await super().insert_transactions(user_id, transactions)
+        self._reindex(user_id, [(t['id'], t) for t in transactions])
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict):
+        categories = await super().update_transaction(user_id, transaction_id, changes)
+        self._reindex(user_id, [(transaction_id, changes)])
+        return categories
+
+    async def update_transactions(self, user_id: str, updates: List[Tuple[str, dict]]):
+        updated = await super().update_transactions(user_id, updates)
+        updated_ids = set(updated)
+        self._reindex(user_id, [(row_id, changes) for row_id, changes in updates if row_id in updated_ids])
+        return updated
+
+    async def delete_transaction(self, user_id: str, transaction_id: str):
+        categories = await super().delete_transaction(user_id, transaction_id)
+        self._unindex(user_id, [transaction_id])
+        return categories
+
+    async def delete_transactions(self, user_id: str, transaction_ids: List[str]):
+        deleted = await super().delete_transactions(user_id, transaction_ids)
+        self._unindex(user_id, deleted)
+        return deleted
+
+    def _reindex(self, user_id: str, rows: List[Tuple[str, dict]]):
+        index = self._search_indexes.get(user_id)
+        if index is not None:
+            for row_id, row in rows:
+                if 'description' in row:
+                    index.add(row_id, row['description'])
+
+    def _unindex(self, user_id: str, row_ids: List[str]):
+        index = self._search_indexes.get(user_id)
+        if index is not None:
+            for row_id in row_ids:
+                index.remove(row_id)
+
+# Postgres
+def postgres_value(value):
+    # asyncpg's numeric codec expects Decimal
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return value
+
+if asyncpg is not None:
+    class PreparedConnection(asyncpg.Connection):
+        """asyncpg connection carrying the HOT_STATEMENTS prepared when the pool opened it"""
+        hot_statements = None
+
+async def prepare_hot_statements(conn):
+    conn.hot_statements = {name: await conn.prepare(sql) for name, sql in HOT_STATEMENTS.items()}
+
+class PostgresConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def _run(self, coro):
+        try:
+            return await coro
+        except asyncpg.IntegrityConstraintViolationError as e:
+            raise HTTPException(status_code=409, detail=f"Postgres error: {str(e)}")
+        except asyncpg.PostgresError as e:
+            raise HTTPException(status_code=500, detail=f"Postgres error: {str(e)}")
+
+    async def fetch(self, sql: str, *args):
+        rows = await self._run(self._conn.fetch(sql, *[postgres_value(a) for a in args]))
+        return [to_json_row(row) for row in rows]
+
+    async def fetchrow(self, sql: str, *args):
+        row = await self._run(self._conn.fetchrow(sql, *[postgres_value(a) for a in args]))
+        return to_json_row(row) if row is not None else None
+
+    async def fetch_hot(self, name: str, *args):
+        statement = self._conn.hot_statements[name]
+        rows = await self._run(statement.fetch(*[postgres_value(a) for a in args]))
+        return [to_json_row(row) for row in rows]
+
+    async def fetchrow_hot(self, name: str, *args):
+        statement = self._conn.hot_statements[name]
+        row = await self._run(statement.fetchrow(*[postgres_value(a) for a in args]))
+        return to_json_row(row) if row is not None else None
+
+    async def execute(self, sql: str, *args):
+        """Returns the affected row count, like the SQLite connection"""
+        status = await self._run(self._conn.execute(sql, *[postgres_value(a) for a in args]))
+        count = status.rsplit(" ", 1)[-1]
+        return int(count) if count.isdigit() else 0
+
+    async def executemany(self, sql: str, rows):
+        return await self._run(self._conn.executemany(sql, [[postgres_value(a) for a in row] for row in rows]))
+
+class PostgresStorage(SQLStorage):
+    """Talks to Postgres directly over an asyncpg pool, bypassing PostgREST"""
+
+    name = "postgres"
+
+    DAY_SQL = "date::date"
+    BUCKET_SQL = {
+        "day": "day",
+        "week": "date_trunc('week', day)::date",
+        "month": "date_trunc('month', day)::date"
+    }
+
+    def __init__(self, dsn: Optional[str] = None):
+        if asyncpg is None:
+            raise Exception("asyncpg is required for the postgres storage backend")
+        self.dsn = dsn or DATABASE_URL
+        if not self.dsn:
+            raise Exception("DATABASE_URL not configured")
+        self._pool = None
+
+    async def startup(self):
+        self._pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=PG_POOL_MIN_SIZE,
+            max_size=PG_POOL_MAX_SIZE,
+            statement_cache_size=PG_STATEMENT_CACHE_SIZE,
+            command_timeout=PG_COMMAND_TIMEOUT,
+            connection_class=PreparedConnection,
+            init=prepare_hot_statements
+        )
+
+    async def shutdown(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _lock_transactions_table(self, conn):
+        await conn.execute("LOCK TABLE transactions IN SHARE MODE")
+
+    async def search_transactions(self, user_id: str, query: str, limit: int, offset: int = 0,
+                                  category_id: Optional[str] = None,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None,
+                                  min_amount: Optional[float] = None,
+                                  max_amount: Optional[float] = None):
+        # The search_transactions() function from create_schema.sql, shared with the REST backend
+        async with self.connection() as conn:
+            return await conn.fetch(
+                "SELECT * FROM search_transactions($1, $2, $3, $4, $5, $6, $7, $8, $9)",
+                user_id, query, category_id,
+                to_datetime(start_date), to_datetime(end_date),
+                min_amount, max_amount, limit, offset
+            )
+
+    async def _acquire(self):
+        try:
+            return await self._pool.acquire(timeout=PG_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Timed out waiting for a database connection")
+
+    @asynccontextmanager
+    async def connection(self):
+        conn = await self._acquire()
+        try:
+            yield PostgresConnection(conn)
+        finally:
+            await self._pool.release(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        conn = await self._acquire()
+        try:
+            async with conn.transaction():
+                yield PostgresConnection(conn)
+        finally:
+            await self._pool.release(conn)
@@ -0,0 +1,249 @@
+-- SQLite schema for the local storage backend (STORAGE_BACKEND=sqlite).
+-- Mirrors create_schema.sql; timestamps are stored as ISO-8601 text.
+
+CREATE TABLE IF NOT EXISTS budget_categories (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    budget_amount REAL NOT NULL,
+    color TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    category_id TEXT REFERENCES budget_categories(id) ON DELETE CASCADE,
+    amount REAL NOT NULL,
+    description TEXT,
+    date TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_category_id ON transactions(category_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date);
+CREATE INDEX IF NOT EXISTS idx_categories_name ON budget_categories(name);
+
+-- Per-user indexes: every API read filters on user_id first (see create_schema.sql)
+DROP INDEX IF EXISTS idx_transactions_date_id;
+DROP INDEX IF EXISTS idx_transactions_category_date_id;
+CREATE INDEX IF NOT EXISTS idx_categories_user_created ON budget_categories(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id ON transactions(user_id, date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_category_date_id ON transactions(user_id, category_id, date DESC, id DESC);
+
+-- Maintained per-category spending totals (see create_schema.sql)
+CREATE TABLE IF NOT EXISTS category_totals (
+    category_id TEXT PRIMARY KEY REFERENCES budget_categories(id) ON DELETE CASCADE,
+    total_spent REAL NOT NULL DEFAULT 0,
+    transactions_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS transactions_category_totals_insert
+AFTER INSERT ON transactions
+WHEN NEW.category_id IS NOT NULL
+BEGIN
+    INSERT INTO category_totals (category_id, total_spent, transactions_count)
+    VALUES (NEW.category_id, NEW.amount, 1)
+    ON CONFLICT (category_id) DO UPDATE
+    SET total_spent = total_spent + excluded.total_spent,
+        transactions_count = transactions_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_category_totals_delete
+AFTER DELETE ON transactions
+BEGIN
+    UPDATE category_totals
+    SET total_spent = total_spent - OLD.amount,
+        transactions_count = transactions_count - 1
+    WHERE category_id = OLD.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_category_totals_update
+AFTER UPDATE OF category_id, amount ON transactions
+BEGIN
+    UPDATE category_totals
+    SET total_spent = total_spent - OLD.amount,
+        transactions_count = transactions_count - 1
+    WHERE category_id = OLD.category_id;
+    INSERT INTO category_totals (category_id, total_spent, transactions_count)
+    SELECT NEW.category_id, NEW.amount, 1
+    WHERE NEW.category_id IS NOT NULL
+    ON CONFLICT (category_id) DO UPDATE
+    SET total_spent = total_spent + excluded.total_spent,
+        transactions_count = transactions_count + 1;
+END;
+
+-- Seed the totals for databases created before category_totals existed
+INSERT INTO category_totals (category_id, total_spent, transactions_count)
+SELECT category_id, SUM(amount), COUNT(*)
+FROM transactions
+WHERE category_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM category_totals)
+GROUP BY category_id;
+
+-- Daily per-category rollups for history queries (see create_schema.sql);
+-- day is the ISO date of the transaction, empty days have no row
+CREATE TABLE IF NOT EXISTS daily_category_totals (
+    category_id TEXT NOT NULL REFERENCES budget_categories(id) ON DELETE CASCADE,
+    day TEXT NOT NULL,
+    total_spent REAL NOT NULL DEFAULT 0,
+    transactions_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_daily_category_totals_day ON daily_category_totals(day);
+
+CREATE TRIGGER IF NOT EXISTS transactions_daily_totals_insert
+AFTER INSERT ON transactions
+WHEN NEW.category_id IS NOT NULL
+BEGIN
+    INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+    VALUES (NEW.category_id, date(NEW.date), NEW.amount, 1)
+    ON CONFLICT (category_id, day) DO UPDATE
+    SET total_spent = total_spent + excluded.total_spent,
+        transactions_count = transactions_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_daily_totals_delete
+AFTER DELETE ON transactions
+BEGIN
+    UPDATE daily_category_totals
+    SET total_spent = total_spent - OLD.amount,
+        transactions_count = transactions_count - 1
+    WHERE category_id = OLD.category_id AND day = date(OLD.date);
+    DELETE FROM daily_category_totals
+    WHERE category_id = OLD.category_id AND day = date(OLD.date) AND transactions_count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_daily_totals_update
+AFTER UPDATE OF category_id, amount, date ON transactions
+BEGIN
+    UPDATE daily_category_totals
+    SET total_spent = total_spent - OLD.amount,
+        transactions_count = transactions_count - 1
+    WHERE category_id = OLD.category_id AND day = date(OLD.date);
+    DELETE FROM daily_category_totals
+    WHERE category_id = OLD.category_id AND day = date(OLD.date) AND transactions_count <= 0;
+    INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+    SELECT NEW.category_id, date(NEW.date), NEW.amount, 1
+    WHERE NEW.category_id IS NOT NULL
+    ON CONFLICT (category_id, day) DO UPDATE
+    SET total_spent = total_spent + excluded.total_spent,
+        transactions_count = transactions_count + 1;
+END;
+
+-- Seed the rollups for databases created before daily_category_totals existed
+INSERT INTO daily_category_totals (category_id, day, total_spent, transactions_count)
+SELECT category_id, date(date), SUM(amount), COUNT(*)
+FROM transactions
+WHERE category_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM daily_category_totals)
+GROUP BY category_id, date(date);
+
+-- Delta sync (GET ...?since=): change timestamps and tombstones for deleted rows.
+-- Timestamps use the same local ISO-8601 text as the API writes.
+DROP INDEX IF EXISTS idx_transactions_updated_at;
+CREATE INDEX IF NOT EXISTS idx_transactions_user_updated_at ON transactions(user_id, updated_at, id);
+
+CREATE TRIGGER IF NOT EXISTS category_totals_touch_insert
+AFTER INSERT ON category_totals
+BEGIN
+    UPDATE category_totals SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+    WHERE category_id = NEW.category_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS category_totals_touch_update
+AFTER UPDATE OF total_spent, transactions_count ON category_totals
+BEGIN
+    UPDATE category_totals SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime')
+    WHERE category_id = NEW.category_id;
+END;
+
+CREATE TABLE IF NOT EXISTS deleted_rows (
+    table_name TEXT NOT NULL,
+    id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    deleted_at TEXT NOT NULL,
+    PRIMARY KEY (table_name, id)
+);
+
+DROP INDEX IF EXISTS idx_deleted_rows_deleted_at;
+CREATE INDEX IF NOT EXISTS idx_deleted_rows_user_deleted_at ON deleted_rows(user_id, table_name, deleted_at);
+
+-- Dropped first so databases from before per-user tombstones pick up the new bodies
+DROP TRIGGER IF EXISTS transactions_record_deleted;
+CREATE TRIGGER transactions_record_deleted
+AFTER DELETE ON transactions
+BEGIN
+    INSERT OR REPLACE INTO deleted_rows (table_name, id, user_id, deleted_at)
+    VALUES ('transactions', OLD.id, OLD.user_id, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'));
+END;
+
+DROP TRIGGER IF EXISTS budget_categories_record_deleted;
+CREATE TRIGGER budget_categories_record_deleted
+AFTER DELETE ON budget_categories
+BEGIN
+    INSERT OR REPLACE INTO deleted_rows (table_name, id, user_id, deleted_at)
+    VALUES ('budget_categories', OLD.id, OLD.user_id, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'));
+END;
+
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS user_settings (
+    user_id TEXT PRIMARY KEY,
+    dark_mode INTEGER DEFAULT 0,
+    notifications INTEGER DEFAULT 1,
+    currency TEXT DEFAULT 'USD',
+    language TEXT DEFAULT 'en',
+    timezone TEXT DEFAULT 'America/New_York',
+    created_at TEXT,
+    updated_at TEXT
+);
+
+-- Budget threshold alerts (see create_schema.sql)
+CREATE TABLE IF NOT EXISTS budget_alerts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    category_id TEXT NOT NULL REFERENCES budget_categories(id) ON DELETE CASCADE,
+    category_name TEXT,
+    threshold REAL NOT NULL,
+    percentage_used REAL NOT NULL,
+    total_spent REAL NOT NULL,
+    budget_amount REAL NOT NULL,
+    created_at TEXT,
+    read_at TEXT,
+    resolved_at TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_budget_alerts_active ON budget_alerts(category_id, threshold) WHERE resolved_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_budget_alerts_user_created ON budget_alerts(user_id, created_at DESC);
+
+-- Background job records (see create_schema.sql)
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT,
+    progress REAL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_user_created ON jobs(user_id, created_at DESC);
+-- The stale-job sweep; only running jobs heartbeat
+DROP INDEX IF EXISTS idx_jobs_unfinished;
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs(updated_at) WHERE status = 'running';
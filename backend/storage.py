@@ -0,0 +1,290 @@
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# How long tombstones for deleted rows are kept; delta syncs older than this must reload
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("TOMBSTONE_RETENTION_DAYS", "30"))
+# How often clock() re-measures the database clock's offset from this process's
+CLOCK_SYNC_INTERVAL_SECONDS = float(os.environ.get("CLOCK_SYNC_INTERVAL_SECONDS", "60"))
+
+def with_spending(category: dict):
+    """Fill in remaining_budget/percentage_used from budget_amount and total_spent"""
+    budget_amount = category['budget_amount']
+    total_spent = category['total_spent']
+    category['remaining_budget'] = budget_amount - total_spent
+    category['percentage_used'] = (total_spent / budget_amount * 100) if budget_amount > 0 else 0
+    return category
+
+def to_datetime(value):
+    """Parse an ISO timestamp into a naive datetime, matching the TIMESTAMP columns.
+
+    Values carrying a UTC offset are converted to this machine's local time
+    before it is dropped, so they still name the same instant.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone()
+    return value.replace(tzinfo=None)
+
+class Storage:
+    """Data access used by the API endpoints.
+
+    Rows go in and come out as plain JSON-ready dicts (ISO timestamp strings,
+    float amounts, string ids) whatever engine sits underneath, so the
+    endpoints never need to know which backend is active.
+
+    Categories and transactions belong to a user: every method reading or
+    writing them takes the user_id first and only ever touches that user's
+    rows. Inserted rows are stamped with it; ids of other users' rows behave
+    as if they did not exist.
+    """
+
+    name = "base"
+    _clock_offset = None
+    _clock_synced_at = 0.0
+
+    async def startup(self):
+        pass
+
+    async def database_now(self) -> datetime:
+        """The database's current time, as its TIMESTAMP columns store it"""
+        raise NotImplementedError
+
+    async def clock(self) -> datetime:
+        """Now, on the clock the database stamps change timestamps and tombstones with.
+
+        Delta-sync watermarks must come from this clock, whatever the timezone
+        or drift of the API server's. The offset is re-measured every
+        CLOCK_SYNC_INTERVAL_SECONDS against the time the reply arrived, so the
+        estimate may lag the database by the round trip but never runs ahead.
+        """
+        if self._clock_offset is None or time.monotonic() - self._clock_synced_at >= CLOCK_SYNC_INTERVAL_SECONDS:
+            database_now = to_datetime(await self.database_now())
+            self._clock_offset = database_now - datetime.now()
+            self._clock_synced_at = time.monotonic()
+        return datetime.now() + self._clock_offset
+
+    async def shutdown(self):
+        pass
+
+    # Categories
+    async def list_category_spending(self, user_id: str) -> List[dict]:
+        """All categories, oldest first, with total_spent/remaining_budget/percentage_used"""
+        raise NotImplementedError
+
+    async def create_category(self, user_id: str, category: dict):
+        raise NotImplementedError
+
+    async def update_category(self, user_id: str, category_id: str, changes: dict) -> dict:
+        """Update a category and return it with its spending, atomically; 404 when missing"""
+        raise NotImplementedError
+
+    async def delete_category(self, user_id: str, category_id: str):
+        """Delete a category together with its transactions in one statement; 404 when missing"""
+        raise NotImplementedError
+
+    async def insert_categories(self, user_id: str, categories: List[dict]):
+        """Insert many categories in one round trip; all or nothing"""
+        raise NotImplementedError
+
+    async def update_categories(self, user_id: str, updates: List[Tuple[str, dict]]) -> List[str]:
+        """Apply (id, changes) pairs; returns the ids that existed and were updated"""
+        raise NotImplementedError
+
+    async def delete_categories(self, user_id: str, category_ids: List[str]) -> List[str]:
+        """Delete categories and their transactions; returns the ids that were deleted"""
+        raise NotImplementedError
+
+    async def list_category_changes(self, user_id: str, since: datetime) -> List[dict]:
+        """Categories edited, or whose spending changed, at or after `since`; same shape as list_category_spending"""
+        raise NotImplementedError
+
+    # Transactions
+    async def list_transactions(self, user_id: str, columns: List[str], limit: int,
+                                category_id: Optional[str] = None,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                after: Optional[Tuple[str, str]] = None) -> List[dict]:
+        """Up to `limit` transactions ordered by (date, id) descending.
+
+        `after` is the (date, id) of the last row already seen; only rows that
+        sort strictly after it are returned.
+        """
+        raise NotImplementedError
+
+    # create/update/delete_transaction are atomic: the category ownership check, the
+    # write and the read of the refreshed spending happen in one database transaction
+    # (one round trip on the REST backend). Each returns the affected categories in the
+    # shape of list_category_spending, and raises 404 for a missing row or category.
+    async def create_transaction(self, user_id: str, transaction: dict) -> List[dict]:
+        raise NotImplementedError
+
+    async def insert_transactions(self, user_id: str, transactions: List[dict]):
+        """Insert many transactions in as few round trips as the engine allows"""
+        raise NotImplementedError
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict) -> List[dict]:
+        """Returns both categories when the transaction moved between them"""
+        raise NotImplementedError
+
+    async def delete_transaction(self, user_id: str, transaction_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def update_transactions(self, user_id: str, updates: List[Tuple[str, dict]]) -> List[str]:
+        """Apply (id, changes) pairs; returns the ids that existed and were updated"""
+        raise NotImplementedError
+
+    async def delete_transactions(self, user_id: str, transaction_ids: List[str]) -> List[str]:
+        """Returns the ids that were deleted"""
+        raise NotImplementedError
+
+    async def owned_category_ids(self, user_id: str, category_ids: List[str]) -> List[str]:
+        """The subset of `category_ids` that exist and belong to the user"""
+        raise NotImplementedError
+
+    async def search_transactions(self, user_id: str, query: str, limit: int, offset: int = 0,
+                                  category_id: Optional[str] = None,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None,
+                                  min_amount: Optional[float] = None,
+                                  max_amount: Optional[float] = None) -> List[dict]:
+        """Transactions whose description matches `query`, best match first.
+
+        Words match whole, as prefixes, or despite small typos. Rows carry a
+        `rank`, comparable only within one backend's results.
+        """
+        raise NotImplementedError
+
+    # Maintenance; these work across all users
+    async def rebuild_category_totals(self):
+        """Recompute the maintained category_totals aggregate from the transactions table"""
+        raise NotImplementedError
+
+    async def rebuild_daily_totals(self):
+        """Recompute the daily per-category rollups from transactions; idempotent"""
+        raise NotImplementedError
+
+    # Delta sync
+    async def list_transaction_changes(self, user_id: str, columns: List[str], since: datetime, limit: int) -> List[dict]:
+        """Transactions written at or after `since`, ordered by (updated_at, id)"""
+        raise NotImplementedError
+
+    async def list_deleted_ids(self, user_id: str, table: str, since: datetime) -> List[str]:
+        """Ids of `table` rows deleted at or after `since`, from the tombstone table"""
+        raise NotImplementedError
+
+    async def prune_deleted_rows(self, before: datetime):
+        """Drop every user's tombstones older than `before`"""
+        raise NotImplementedError
+
+    # Dashboard
+    async def dashboard_summary(self, user_id: str) -> dict:
+        """total_budget, total_spent, categories_count and transactions_count"""
+        raise NotImplementedError
+
+    # Analytics
+    async def spending_series(self, user_id: str, interval: str,
+                              start_date: Optional[datetime] = None,
+                              end_date: Optional[datetime] = None,
+                              category_id: Optional[str] = None,
+                              by_category: bool = False) -> List[dict]:
+        """Spending grouped into day/week/month buckets, oldest first.
+
+        Read from the daily rollups, so start_date/end_date select whole days.
+        Rows hold bucket (ISO date of the bucket start; weeks start on Monday),
+        total_spent and transactions_count, plus category_id when by_category.
+        Empty buckets are omitted.
+        """
+        raise NotImplementedError
+
+    # Profile and settings
+    async def get_profile(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_profile(self, user_id: str, profile: dict) -> dict:
+        """Create or update the user's profile in one upsert; returns the stored row"""
+        raise NotImplementedError
+
+    async def get_settings(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_settings(self, user_id: str, settings: dict) -> dict:
+        """Create or update the user's settings in one upsert; returns the stored row"""
+        raise NotImplementedError
+
+    # Budget alerts. An alert is active until spending falls back below its threshold;
+    # a category has at most one active alert per threshold.
+    async def active_alert_levels(self, user_id: str) -> Dict[str, float]:
+        """category_id -> highest threshold with an active alert"""
+        raise NotImplementedError
+
+    async def record_budget_alerts(self, user_id: str, alerts: List[dict]) -> List[dict]:
+        """Store new alerts, skipping any whose category already has that threshold
+        active (or is not the user's); returns the stored rows"""
+        raise NotImplementedError
+
+    async def resolve_budget_alerts(self, user_id: str, category_id: str, level: float):
+        """Close the category's active alerts for thresholds above `level`"""
+        raise NotImplementedError
+
+    async def list_budget_alerts(self, user_id: str, limit: int, unread_only: bool = False) -> List[dict]:
+        """The user's alerts, newest first"""
+        raise NotImplementedError
+
+    async def mark_budget_alerts_read(self, user_id: str, alert_ids: Optional[List[str]] = None) -> List[str]:
+        """Mark the given unread alerts (all of them when `alert_ids` is None) read; returns their ids"""
+        raise NotImplementedError
+
+    # Background jobs (see jobs.py). Records carry id, user_id, kind, status, params,
+    # progress, processed, result, error, cancel_requested and their timestamps;
+    # params and result are JSON objects.
+    async def create_job(self, job: dict) -> dict:
+        raise NotImplementedError
+
+    async def update_job(self, job_id: str, changes: dict) -> Optional[dict]:
+        """Apply `changes` to any user's job; returns the updated record, None when missing"""
+        raise NotImplementedError
+
+    async def get_job(self, user_id: str, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def list_jobs(self, user_id: str, limit: int, status: Optional[str] = None) -> List[dict]:
+        """The user's jobs, newest first"""
+        raise NotImplementedError
+
+    async def request_job_cancel(self, user_id: str, job_id: str) -> Optional[dict]:
+        """Flag a queued or running job for cancellation; returns its record, or None
+        when the user has no such unfinished job"""
+        raise NotImplementedError
+
+    async def fail_stale_jobs(self, before: datetime, error: str) -> List[str]:
+        """Fail every user's running jobs not updated since `before`; returns their ids.
+
+        Queued jobs are left alone: they are never touched while they wait, so
+        their age says nothing about whether the process holding them is alive.
+        """
+        raise NotImplementedError
+
+    async def prune_jobs(self, before: datetime) -> List[str]:
+        """Delete every user's jobs that finished before `before`; returns their ids"""
+        raise NotImplementedError
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    """Build the backend named by STORAGE_BACKEND: "rest" (Supabase PostgREST, the default),
+    "sqlite" (local file, no network) or "postgres" (direct asyncpg connection)"""
+    backend = (backend or os.environ.get("STORAGE_BACKEND", "rest")).lower()
+    # Imported lazily so each backend's driver is only needed when it is selected
+    if backend == "rest":
+        from rest_storage import RestStorage
+        return RestStorage()
+    if backend == "sqlite":
+        from sql_storage import SQLiteStorage
+        return SQLiteStorage()
+    if backend == "postgres":
+        from sql_storage import PostgresStorage
+        return PostgresStorage()
+    raise Exception(f"Unknown storage backend: {backend}")
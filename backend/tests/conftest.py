@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+import pytest
+
+# The backend is a flat set of modules run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# server.py builds its storage when imported; give it a throwaway SQLite file
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="budget_bubbles_tests_"), "server.db")
+# Requests act as DEFAULT_USER_ID, whatever a local .env says
+os.environ["SUPABASE_JWT_SECRET"] = ""
+
+USER_ID = "00000000-0000-0000-0000-0000000000aa"
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def storage(tmp_path):
+    """A fresh SQLite database per test"""
+    from sql_storage import SQLiteStorage
+
+    storage = SQLiteStorage(str(tmp_path / "test.db"))
+    await storage.startup()
+    try:
+        yield storage
+    finally:
+        await storage.shutdown()
+
+@pytest.fixture
+async def server_storage(tmp_path, monkeypatch):
+    """server.py's own storage on a fresh SQLite file, with its in-process state reset"""
+    import server
+    from alerts import AlertEngine
+    from events import EventBroker
+
+    monkeypatch.setattr(server.storage, "path", str(tmp_path / "server.db"))
+    monkeypatch.setattr(server.storage, "_search_indexes", {})
+    monkeypatch.setattr(server, "alert_engine", AlertEngine(server.storage))
+    monkeypatch.setattr(server, "broker", EventBroker())
+    server.read_cache.clear()
+    server.cache_loads.forget()
+    await server.storage.startup()
+    try:
+        yield server.storage
+    finally:
+        await server.storage.shutdown()
+
+@pytest.fixture
+async def client(server_storage):
+    """HTTP client for server.py's app, served in process"""
+    import server
+
+    async with httpx.AsyncClient(app=server.app, base_url="http://test") as client:
+        yield client
+
+JWT_SECRET = "test-secret"
+
+def b64url(data: bytes):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def make_token(claims=None, header=None, secret=JWT_SECRET, sub=USER_ID):
+    """An HS256 access token like Supabase issues; `claims` replaces the default ones"""
+    header = {"alg": "HS256", "typ": "JWT"} if header is None else header
+    claims = {"sub": sub, "aud": "authenticated", "exp": time.time() + 3600} if claims is None else claims
+    signing_input = ".".join(b64url(json.dumps(part).encode()) for part in (header, claims))
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64url(signature)}"
+
+def category_row(category_id: str, budget_amount: float = 100.0, name: str = "Groceries"):
+    return {
+        "id": category_id,
+        "name": name,
+        "budget_amount": budget_amount,
+        "color": "#4CAF50",
+        "created_at": "2026-01-01T00:00:00",
+        "updated_at": "2026-01-01T00:00:00"
+    }
@@ -0,0 +1,79 @@
+import pytest
+
+from alerts import AlertEngine, alert_level
+from conftest import USER_ID, category_row
+from storage import with_spending
+
+pytestmark = pytest.mark.anyio
+
+CATEGORY_ID = "11111111-1111-1111-1111-111111111111"
+THRESHOLDS = [80.0, 100.0, 120.0]
+
+def spending(total_spent: float, budget_amount: float = 100.0):
+    """A category as a write returns it, with its refreshed spending"""
+    return with_spending({**category_row(CATEGORY_ID, budget_amount), "total_spent": total_spent})
+
+@pytest.fixture
+async def engine(storage):
+    await storage.create_category(USER_ID, category_row(CATEGORY_ID))
+    return AlertEngine(storage, THRESHOLDS)
+
+async def active_thresholds(storage):
+    levels = await storage.active_alert_levels(USER_ID)
+    return levels.get(CATEGORY_ID, 0)
+
+def test_alert_level_is_the_highest_threshold_reached():
+    assert alert_level(79.9, THRESHOLDS) == 0
+    assert alert_level(80, THRESHOLDS) == 80
+    assert alert_level(119.99, THRESHOLDS) == 100
+    assert alert_level(250, THRESHOLDS) == 120
+
+async def test_each_threshold_alerts_once_while_spending_stays_above_it(engine, storage):
+    raised = await engine.evaluate(USER_ID, [spending(85)])
+    assert [alert["threshold"] for alert in raised] == [80]
+    assert await engine.evaluate(USER_ID, [spending(90)]) == []
+
+    raised = await engine.evaluate(USER_ID, [spending(105)])
+    assert [alert["threshold"] for alert in raised] == [100]
+    raised = await engine.evaluate(USER_ID, [spending(125)])
+    assert [alert["threshold"] for alert in raised] == [120]
+    assert await engine.evaluate(USER_ID, [spending(130)]) == []
+
+    alerts = await storage.list_budget_alerts(USER_ID, limit=10)
+    assert sorted(alert["threshold"] for alert in alerts) == [80, 100, 120]
+    assert engine.raised == 3
+
+async def test_jumping_past_several_thresholds_records_each_and_returns_the_highest(engine, storage):
+    raised = await engine.evaluate(USER_ID, [spending(130)])
+    assert [alert["threshold"] for alert in raised] == [120]
+
+    alerts = await storage.list_budget_alerts(USER_ID, limit=10)
+    assert sorted(alert["threshold"] for alert in alerts) == [80, 100, 120]
+
+async def test_another_process_does_not_repeat_recorded_alerts(engine, storage):
+    await engine.evaluate(USER_ID, [spending(105)])
+
+    # A second engine starts from the active alerts in storage, not from zero
+    other = AlertEngine(storage, THRESHOLDS)
+    assert await other.evaluate(USER_ID, [spending(110)]) == []
+    # Even without that state, storage refuses a second active alert per threshold
+    latest = (await storage.list_budget_alerts(USER_ID, limit=1))[0]
+    duplicate = {**latest, "id": "33333333-3333-3333-3333-333333333333"}
+    assert await storage.record_budget_alerts(USER_ID, [duplicate]) == []
+    assert len(await storage.list_budget_alerts(USER_ID, limit=10)) == 2
+
+async def test_falling_below_a_threshold_resolves_it_so_it_can_alert_again(engine, storage):
+    await engine.evaluate(USER_ID, [spending(105)])
+    assert await active_thresholds(storage) == 100
+
+    assert await engine.evaluate(USER_ID, [spending(90)]) == []
+    assert await active_thresholds(storage) == 80
+
+    raised = await engine.evaluate(USER_ID, [spending(101)])
+    assert [alert["threshold"] for alert in raised] == [100]
+    alerts = await storage.list_budget_alerts(USER_ID, limit=10)
+    assert sorted(alert["threshold"] for alert in alerts) == [80, 100, 100]
+
+async def test_other_users_categories_never_alert(engine, storage):
+    assert await engine.evaluate("someone-else", [spending(150)]) == []
+    assert await storage.list_budget_alerts("someone-else", limit=10) == []
@@ -0,0 +1,63 @@
+import pytest
+
+import analytics
+import server
+from conftest import category_row
+
+pytestmark = pytest.mark.anyio
+
+CATEGORY_ID = "11111111-1111-1111-1111-111111111111"
+
+async def add_transaction(client, amount: float, date: str):
+    response = await client.post("/api/transactions", json={
+        "category_id": CATEGORY_ID, "amount": amount, "description": "Lunch", "date": date
+    })
+    assert response.status_code == 200, response.text
+
+@pytest.fixture
+async def category(server_storage):
+    await server_storage.create_category(server.DEFAULT_USER_ID, category_row(CATEGORY_ID))
+
+async def test_series_is_zero_filled_per_bucket(client, category):
+    await add_transaction(client, 12.5, "2026-01-05T12:00:00")
+    await add_transaction(client, 7.5, "2026-01-20T12:00:00")
+    await add_transaction(client, 30, "2026-03-02T12:00:00")
+
+    response = await client.get("/api/analytics/spending", params={
+        "interval": "month", "start_date": "2026-01-01T00:00:00", "end_date": "2026-03-31T00:00:00"
+    })
+    assert response.status_code == 200
+    assert response.json()["series"] == [
+        {"bucket": "2026-01-01", "total_spent": 20.0, "transactions_count": 2},
+        {"bucket": "2026-02-01", "total_spent": 0, "transactions_count": 0},
+        {"bucket": "2026-03-01", "total_spent": 30.0, "transactions_count": 1},
+    ]
+
+@pytest.mark.parametrize("params", [
+    {"interval": "day", "start_date": "0001-01-01T00:00:00"},
+    {"interval": "day", "start_date": "2020-01-01T00:00:00", "end_date": "2026-01-01T00:00:00"},
+    {"interval": "week", "start_date": "1900-01-01T00:00:00", "end_date": "2026-01-01T00:00:00"},
+])
+async def test_ranges_past_the_bucket_limit_are_refused(client, params):
+    response = await client.get("/api/analytics/spending", params=params)
+    assert response.status_code == 400
+    assert f"more than {analytics.SERIES_MAX_BUCKETS}" in response.json()["detail"]
+    # Nothing was loaded or cached for it
+    assert len(server.read_cache) == 0
+
+async def test_range_at_the_limit_is_served(client, monkeypatch):
+    monkeypatch.setattr(server, "SERIES_MAX_BUCKETS", 3)
+    params = {"interval": "month", "start_date": "2026-01-15T00:00:00", "end_date": "2026-03-01T00:00:00"}
+    response = await client.get("/api/analytics/spending", params=params)
+    assert response.status_code == 200
+    assert len(response.json()["series"]) == 3
+
+    params["end_date"] = "2026-04-01T00:00:00"
+    assert (await client.get("/api/analytics/spending", params=params)).status_code == 400
+
+async def test_end_before_start_is_refused(client):
+    response = await client.get("/api/analytics/spending", params={
+        "interval": "month", "start_date": "2026-03-01T00:00:00", "end_date": "2026-01-01T00:00:00"
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "end_date must not be before start_date"
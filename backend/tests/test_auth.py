@@ -0,0 +1,115 @@
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import auth
+from auth import decode_token, current_user_id
+from conftest import JWT_SECRET as SECRET, USER_ID as USER, b64url, make_token
+
+pytestmark = pytest.mark.anyio
+
+def segment(value):
+    return b64url(json.dumps(value).encode())
+
+def rejected(token: str):
+    with pytest.raises(HTTPException) as error:
+        decode_token(token, SECRET)
+    assert error.value.status_code == 401
+    assert error.value.headers == {"WWW-Authenticate": "Bearer"}
+    return error.value.detail
+
+def test_valid_token_returns_its_claims():
+    claims = decode_token(make_token(), SECRET)
+    assert claims["sub"] == USER
+
+def test_audience_may_be_a_list():
+    token = make_token({"sub": USER, "aud": ["other", "authenticated"]})
+    assert decode_token(token, SECRET)["sub"] == USER
+
+def test_signature_must_match():
+    assert rejected(make_token(secret="another-secret")) == "Invalid token signature"
+    # Claims swapped in after signing
+    header, _, signature = make_token().split(".")
+    forged = f"{header}.{segment({'sub': 'attacker', 'aud': 'authenticated'})}.{signature}"
+    assert rejected(forged) == "Invalid token signature"
+
+def test_only_hs256_is_accepted():
+    assert rejected(make_token(header={"alg": "none"})) == "Unsupported token algorithm"
+
+def test_expired_and_not_yet_valid_tokens_are_rejected():
+    past = time.time() - auth.JWT_LEEWAY_SECONDS - 10
+    future = time.time() + auth.JWT_LEEWAY_SECONDS + 10
+    assert rejected(make_token({"sub": USER, "aud": "authenticated", "exp": past})) == "Access token expired"
+    assert rejected(make_token({"sub": USER, "aud": "authenticated", "nbf": future})) == "Access token not yet valid"
+    # Within the allowed clock skew
+    recent = time.time() - auth.JWT_LEEWAY_SECONDS / 2
+    assert decode_token(make_token({"sub": USER, "aud": "authenticated", "exp": recent}), SECRET)
+
+def test_wrong_or_missing_audience_is_rejected():
+    assert rejected(make_token({"sub": USER, "aud": "anon-service"})) == "Access token is not for this audience"
+    assert rejected(make_token({"sub": USER})) == "Access token is not for this audience"
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not-a-jwt",
+    "only.two",
+    "a.b.c.d",
+    "!!!.@@@.###",
+    f"{b64url(b'not json')}.{segment({})}.{b64url(b'sig')}",
+    # Valid JSON, but not objects
+    f"{segment([])}.{segment({})}.{b64url(b'sig')}",
+    f"{segment({'alg': 'HS256'})}.{segment('claims')}.{b64url(b'sig')}",
+])
+def test_malformed_tokens_are_rejected(token):
+    assert rejected(token) == "Malformed access token"
+
+@pytest.mark.parametrize("claim", ["exp", "nbf"])
+@pytest.mark.parametrize("value", ["1700000000", None, True])
+def test_non_numeric_time_claims_are_rejected(claim, value):
+    token = make_token({"sub": USER, "aud": "authenticated", claim: value})
+    assert rejected(token) == "Malformed access token"
+
+def request_with(headers=None, query: str = ""):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/categories",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "query_string": query.encode()
+    })
+
+@pytest.fixture
+def jwt_secret(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", SECRET)
+
+async def test_current_user_id_reads_bearer_header_or_query_token(jwt_secret):
+    token = make_token()
+    assert await current_user_id(request_with({"Authorization": f"Bearer {token}"})) == USER
+    assert await current_user_id(request_with(query=f"access_token={token}")) == USER
+
+@pytest.mark.parametrize("headers", [
+    {},
+    {"Authorization": "Bearer"},
+    {"Authorization": "Bearer "},
+    {"Authorization": "Basic dXNlcjpwYXNz"},
+    {"Authorization": "Token abc"},
+])
+async def test_missing_or_malformed_authorization_header_is_rejected(jwt_secret, headers):
+    with pytest.raises(HTTPException) as error:
+        await current_user_id(request_with(headers))
+    assert error.value.status_code == 401
+    assert error.value.detail == "Missing access token"
+
+async def test_token_without_a_string_subject_is_rejected(jwt_secret):
+    for claims in ({"aud": "authenticated"}, {"sub": 42, "aud": "authenticated"}):
+        token = make_token(claims)
+        with pytest.raises(HTTPException) as error:
+            await current_user_id(request_with({"Authorization": f"Bearer {token}"}))
+        assert error.value.status_code == 401
+
+async def test_without_a_jwt_secret_everyone_is_the_default_user(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", None)
+    assert await current_user_id(request_with()) == auth.DEFAULT_USER_ID
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+import cache
+from cache import TTLCache, SingleFlight
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+def test_entries_expire_after_ttl(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("categories", [1, 2])
+
+    clock.now += 29
+    assert entries.get("categories") == [1, 2]
+    clock.now += 2
+    assert entries.get("categories") is None
+    assert len(entries) == 0
+    assert (entries.hits, entries.misses) == (1, 1)
+
+def test_least_recently_used_entry_is_evicted(clock):
+    entries = TTLCache(maxsize=2, ttl=30)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+
+    assert entries.get("b") is None
+    assert entries.get("a") == 1
+    assert entries.evictions == 1
+
+def test_load_started_before_an_invalidation_is_not_stored(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    generation = entries.generation
+    # A write lands while the load is running
+    entries.invalidate("dashboard")
+    entries.set("dashboard", "stale", generation=generation)
+    assert entries.get("dashboard") is None
+
+    entries.set("dashboard", "fresh", generation=entries.generation)
+    assert entries.get("dashboard") == "fresh"
+
+def test_invalidate_prefix_drops_only_matching_keys(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set("analytics:user-1:month", 1)
+    entries.set("analytics:user-1:week", 2)
+    entries.set("analytics:user-2:month", 3)
+
+    entries.invalidate_prefix("analytics:user-1:")
+    assert entries.get("analytics:user-1:month") is None
+    assert entries.get("analytics:user-1:week") is None
+    assert entries.get("analytics:user-2:month") == 3
+    assert entries.invalidations == 2
+
+@pytest.mark.anyio
+async def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return b"rows"
+
+    results = await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+    assert results == [b"rows"] * 5
+    assert calls == 1
+    assert (flight.calls, flight.coalesced) == (1, 4)
+    assert len(flight) == 0
+
+@pytest.mark.anyio
+async def test_single_flight_error_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight()
+    calls = 0
+
+    async def failing():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream down" for result in results)
+
+    async def succeeding():
+        return b"recovered"
+
+    # The failure is not cached: the next caller starts a fresh call
+    assert await flight.do("key", succeeding) == b"recovered"
+
+@pytest.mark.anyio
+async def test_cancelled_caller_does_not_cancel_the_call_for_others():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return b"rows"
+
+    first = asyncio.ensure_future(flight.do("key", load))
+    second = asyncio.ensure_future(flight.do("key", load))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == b"rows"
+    with pytest.raises(asyncio.CancelledError):
+        await first
@@ -0,0 +1,116 @@
+import asyncio
+import json
+
+import pytest
+from starlette.requests import Request
+
+import server
+from conftest import category_row
+from events import EventBroker, RESYNC_EVENT, format_sse
+
+pytestmark = pytest.mark.anyio
+
+CATEGORY_ID = "11111111-1111-1111-1111-111111111111"
+
+def queued(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return events
+
+async def test_events_reach_only_the_publishing_users_subscribers():
+    broker = EventBroker()
+    mine = broker.subscribe("user-1")
+    theirs = broker.subscribe("user-2")
+
+    event_id = broker.publish("user-1", {"type": "category.updated"})
+    assert queued(mine) == [(event_id, {"type": "category.updated"})]
+    assert queued(theirs) == []
+
+    broker.unsubscribe(mine)
+    assert not broker.has_subscribers("user-1")
+
+async def test_reconnect_replays_only_what_was_missed():
+    broker = EventBroker()
+    first = broker.publish("user-1", {"type": "a"})
+    broker.publish("user-2", {"type": "other user"})
+    second = broker.publish("user-1", {"type": "b"})
+    third = broker.publish("user-1", {"type": "c"})
+
+    assert queued(broker.subscribe("user-1", first)) == [(second, {"type": "b"}), (third, {"type": "c"})]
+    assert queued(broker.subscribe("user-1", third)) == []
+
+async def test_unreliable_replay_asks_for_a_resync():
+    broker = EventBroker(history_size=2)
+    for _ in range(4):
+        broker.publish("user-1", {"type": "change"})
+    # Older than the history kept
+    assert queued(broker.subscribe("user-1", 1)) == [(None, RESYNC_EVENT)]
+    # From before a restart: ids this broker never issued
+    assert queued(broker.subscribe("user-1", 99)) == [(None, RESYNC_EVENT)]
+
+async def test_a_client_a_full_queue_behind_is_dropped_with_a_resync():
+    broker = EventBroker(queue_size=2)
+    subscription = broker.subscribe("user-1")
+    for _ in range(3):
+        broker.publish("user-1", {"type": "change"})
+    assert subscription.overflowed
+    assert broker.dropped == 1
+
+    chunks = [chunk async for chunk in broker.stream(subscription)]
+    assert chunks[0].startswith("retry: ")
+    assert chunks[-1] == format_sse(RESYNC_EVENT)
+    assert len(chunks) == 4
+
+def parse_sse(chunk: str):
+    fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+    return int(fields["id"]), json.loads(fields["data"])
+
+@pytest.fixture
+async def category(server_storage):
+    await server_storage.create_category(server.DEFAULT_USER_ID, category_row(CATEGORY_ID))
+
+async def test_mutations_push_deltas_and_replay_after_last_event_id(client, category):
+    subscription = server.broker.subscribe(server.DEFAULT_USER_ID)
+
+    response = await client.post("/api/transactions", json={
+        "category_id": CATEGORY_ID, "amount": 12.5, "description": "Lunch", "date": "2026-01-15T12:00:00"
+    })
+    assert response.status_code == 200
+    transaction_id = response.json()["id"]
+    [(created_id, created)] = queued(subscription)
+    assert created["type"] == "transaction.created"
+    assert [row["id"] for row in created["transactions"]] == [transaction_id]
+    assert created["transactions"][0]["amount"] == 12.5
+    [spending] = created["categories"]
+    assert (spending["id"], spending["total_spent"], spending["remaining_budget"]) == (CATEGORY_ID, 12.5, 87.5)
+    assert created["deleted_transactions"] == [] and created["resync"] == []
+
+    response = await client.delete(f"/api/transactions/{transaction_id}")
+    assert response.status_code == 200
+    [(deleted_id, deleted)] = queued(subscription)
+    assert deleted["type"] == "transaction.deleted"
+    assert deleted["deleted_transactions"] == [transaction_id]
+    assert deleted["categories"][0]["total_spent"] == 0
+    server.broker.unsubscribe(subscription)
+
+    # A client that saw only the first event reconnects through GET /api/events
+    request = Request({
+        "type": "http", "method": "GET", "path": "/api/events", "query_string": b"",
+        "headers": [(b"last-event-id", str(created_id).encode())]
+    })
+    response = await server.stream_events(request, server.DEFAULT_USER_ID)
+    assert response.media_type == "text/event-stream"
+    stream = response.body_iterator
+    try:
+        assert (await stream.__anext__()).startswith("retry: ")
+        assert parse_sse(await asyncio.wait_for(stream.__anext__(), 1)) == (deleted_id, deleted)
+    finally:
+        await stream.aclose()
+    assert not server.broker.has_subscribers(server.DEFAULT_USER_ID)
+
+async def test_writes_without_subscribers_publish_nothing(client, category):
+    await client.post("/api/transactions", json={
+        "category_id": CATEGORY_ID, "amount": 5, "description": "Snack", "date": "2026-01-15T12:00:00"
+    })
+    assert server.broker.published == 0
@@ -0,0 +1,119 @@
+import io
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from conftest import category_row
+from importers import detect_format, iter_csv_rows, iter_ofx_rows, parse_ofx_date, CSV_FORMAT, OFX_FORMAT
+
+CATEGORY_ID = "11111111-1111-1111-1111-111111111111"
+
+OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260115120000.000[-5:EST]
+<TRNAMT>-42.50
+<NAME>CORNER GROCERY
+<MEMO>Card 1234
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20260116
+<TRNAMT>1000.00
+<NAME>PAYROLL
+</STMTTRN>
+<STMTTRN>
+<DTPOSTED>not-a-date
+<TRNAMT>abc
+<NAME>BROKEN
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+def test_detect_format():
+    assert detect_format("statement.QFX") == OFX_FORMAT
+    assert detect_format("upload", "application/x-ofx") == OFX_FORMAT
+    assert detect_format("transactions.csv", "text/csv") == CSV_FORMAT
+
+def test_csv_rows_carry_line_numbers_and_normalized_fields():
+    data = (
+        "\ufeffcategory_id,amount,description,date\n"
+        f" {CATEGORY_ID} ,12.50, Lunch ,2026-01-15\n"
+        ",,,\n"
+        ",7,Coffee,2026-01-16T08:30:00\n"
+    ).encode()
+    binary_file = io.BytesIO(data)
+
+    rows = list(iter_csv_rows(binary_file))
+    assert rows == [
+        (2, {"category_id": CATEGORY_ID, "amount": "12.50", "description": "Lunch", "date": "2026-01-15T00:00:00"}),
+        (4, {"category_id": None, "amount": "7", "description": "Coffee", "date": "2026-01-16T08:30:00"}),
+    ]
+    # The caller's file is left open
+    assert not binary_file.closed
+
+def test_undecodable_csv_raises():
+    with pytest.raises(UnicodeDecodeError):
+        list(iter_csv_rows(io.BytesIO(b"category_id,amount\n\xff\xfe,1\n")))
+
+def test_ofx_rows_flip_amounts_and_keep_unparseable_values_for_validation():
+    rows = list(iter_ofx_rows(io.BytesIO(OFX)))
+    assert rows == [
+        (1, {"category_id": None, "amount": 42.5, "description": "CORNER GROCERY - Card 1234",
+             "date": "2026-01-15T12:00:00"}),
+        (2, {"category_id": None, "amount": -1000.0, "description": "PAYROLL", "date": "2026-01-16T00:00:00"}),
+        (3, {"category_id": None, "amount": "abc", "description": "BROKEN", "date": "not-a-date"}),
+    ]
+
+def test_parse_ofx_date():
+    assert parse_ofx_date("202601151230").isoformat() == "2026-01-15T12:30:00"
+    with pytest.raises(ValueError):
+        parse_ofx_date("2026")
+
+@pytest.fixture
+async def category(server_storage):
+    await server_storage.create_category(server.DEFAULT_USER_ID, category_row(CATEGORY_ID))
+
+@pytest.mark.anyio
+async def test_run_import_reports_bad_rows_and_imports_the_rest(server_storage, category, monkeypatch):
+    monkeypatch.setattr(server, "IMPORT_BATCH_SIZE", 2)
+    data = (
+        "category_id,amount,description,date\n"
+        f"{CATEGORY_ID},10,Lunch,2026-01-15\n"
+        f"{CATEGORY_ID},not-a-number,Broken amount,2026-01-15\n"
+        "99999999-9999-9999-9999-999999999999,5,Unknown category,2026-01-15\n"
+        f"{CATEGORY_ID},20,Dinner,2026-01-16\n"
+        f"{CATEGORY_ID},30,Groceries,not-a-date\n"
+        f"{CATEGORY_ID},40,Rent,2026-01-17\n"
+    ).encode()
+    batches = []
+
+    async def on_batch(report):
+        batches.append(report["imported"])
+
+    report = await server.run_import(server.DEFAULT_USER_ID, io.BytesIO(data), CSV_FORMAT, on_batch=on_batch)
+
+    assert report["imported"] == 3
+    assert report["failed"] == 3
+    assert [error["row"] for error in report["errors"]] == [3, 4, 6]
+    assert report["errors"][1]["error"] == "category_id: Category not found"
+    assert batches == [1, 3]
+    rows = await server_storage.list_transactions(server.DEFAULT_USER_ID, ["description"], limit=10)
+    assert sorted(row["description"] for row in rows) == ["Dinner", "Lunch", "Rent"]
+
+@pytest.mark.anyio
+async def test_run_import_skips_ofx_credits_and_uses_the_given_category(server_storage, category):
+    report = await server.run_import(server.DEFAULT_USER_ID, io.BytesIO(OFX), OFX_FORMAT, category_id=CATEGORY_ID)
+
+    assert report["imported"] == 1
+    assert report["skipped"] == 1
+    assert [error["row"] for error in report["errors"]] == [3]
+
+@pytest.mark.anyio
+async def test_run_import_rejects_undecodable_files(server_storage, category):
+    with pytest.raises(HTTPException) as error:
+        await server.run_import(server.DEFAULT_USER_ID, io.BytesIO(b"\xff\xfe\x00\x01"), CSV_FORMAT)
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith("Could not parse import file")
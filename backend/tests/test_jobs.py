@@ -0,0 +1,148 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from conftest import USER_ID
+from jobs import JobRunner, JobRejected, QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def job_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_FILES_DIR", str(tmp_path / "jobs"))
+
+@pytest.fixture
+async def runner(storage):
+    finished = {}
+
+    async def on_finish(job):
+        finished[job['id']] = job
+
+    runner = JobRunner(storage, workers=1, on_finish=on_finish)
+    runner.finished_jobs = finished
+    yield runner
+    await runner.stop()
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+async def test_job_runs_from_queued_to_succeeded(runner, storage):
+    seen = []
+
+    async def count(context, params):
+        seen.append((await storage.get_job(USER_ID, context.id))['status'])
+        await context.progress(processed=params['rows'], fraction=1.0)
+        return {"rows": params['rows']}
+
+    runner.register("count", count)
+    job = await runner.submit(USER_ID, "count", {"rows": 3})
+    assert job['status'] == QUEUED
+
+    await runner.start()
+    await wait_for(lambda: job['id'] in runner.finished_jobs)
+
+    assert seen == [RUNNING]
+    job = await storage.get_job(USER_ID, job['id'])
+    assert job['status'] == SUCCEEDED
+    assert job['result'] == {"rows": 3}
+    assert job['processed'] == 3 and job['progress'] == 1.0
+    assert job['started_at'] and job['finished_at']
+    assert runner.finished[SUCCEEDED] == 1
+
+async def test_failing_job_records_its_error(runner, storage):
+    async def explode(context, params):
+        raise ValueError("bad input")
+
+    runner.register("explode", explode)
+    await runner.start()
+    job = await runner.submit(USER_ID, "explode")
+    await wait_for(lambda: job['id'] in runner.finished_jobs)
+
+    job = await storage.get_job(USER_ID, job['id'])
+    assert job['status'] == FAILED
+    assert job['error'] == "bad input"
+
+async def test_cancelling_queued_and_running_jobs(runner, storage):
+    started = asyncio.Event()
+
+    async def block(context, params):
+        started.set()
+        await asyncio.sleep(60)
+
+    runner.register("block", block)
+    await runner.start()
+    running = await runner.submit(USER_ID, "block")
+    await started.wait()
+    # The only worker is busy, so this one waits in the queue
+    queued = await runner.submit(USER_ID, "block")
+
+    job = await runner.cancel(USER_ID, queued['id'])
+    assert job['status'] == CANCELLED
+    await runner.cancel(USER_ID, running['id'])
+    await wait_for(lambda: running['id'] in runner.finished_jobs)
+
+    assert (await storage.get_job(USER_ID, running['id']))['status'] == CANCELLED
+    assert runner.queued == 0 and runner.running == 0
+    # Finished jobs are returned unchanged, other users' jobs not at all
+    assert (await runner.cancel(USER_ID, queued['id']))['status'] == CANCELLED
+    assert await runner.cancel("someone-else", running['id']) is None
+
+async def test_per_user_limit_rejects_submits(runner, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_PER_USER", 2)
+
+    async def noop(context, params):
+        return {}
+
+    runner.register("noop", noop)
+    await runner.submit(USER_ID, "noop")
+    await runner.submit(USER_ID, "noop")
+    with pytest.raises(JobRejected):
+        await runner.submit(USER_ID, "noop")
+    await runner.submit("someone-else", "noop")
+
+async def test_stop_fails_jobs_still_queued(runner, storage):
+    async def noop(context, params):
+        return {}
+
+    runner.register("noop", noop)
+    job = await runner.submit(USER_ID, "noop")
+    await runner.stop()
+
+    job = await storage.get_job(USER_ID, job['id'])
+    assert job['status'] == FAILED
+    assert job['error'].startswith("Interrupted")
+
+async def test_startup_fails_only_running_jobs_whose_heartbeat_stopped(storage):
+    long_ago = datetime.now() - timedelta(seconds=jobs.JOB_STALE_SECONDS * 2)
+    recently = datetime.now()
+    for job_id, status, updated_at in [
+        ("dead-running", RUNNING, long_ago),
+        ("live-running", RUNNING, recently),
+        # Queued jobs never heartbeat; another live process may still run them
+        ("waiting", QUEUED, long_ago),
+    ]:
+        await storage.create_job({'id': job_id, 'user_id': USER_ID, 'kind': "noop", 'status': status,
+                                  'params': {}, 'created_at': long_ago, 'updated_at': updated_at})
+
+    runner = JobRunner(storage, workers=0)
+    await runner.start()
+    await runner.stop()
+
+    statuses = {job['id']: job['status'] for job in await storage.list_jobs(USER_ID, limit=10)}
+    assert statuses == {"dead-running": FAILED, "live-running": RUNNING, "waiting": QUEUED}
+    assert (await storage.get_job(USER_ID, "dead-running"))['error'].startswith("Interrupted")
+
+async def test_finished_jobs_are_pruned_after_retention(storage):
+    old = datetime.now() - timedelta(days=jobs.JOB_RETENTION_DAYS + 1)
+    await storage.create_job({'id': "old", 'user_id': USER_ID, 'kind': "noop", 'status': SUCCEEDED,
+                              'params': {}, 'created_at': old, 'updated_at': old, 'finished_at': old})
+    await storage.create_job({'id': "old-unfinished", 'user_id': USER_ID, 'kind': "noop", 'status': QUEUED,
+                              'params': {}, 'created_at': old, 'updated_at': datetime.now()})
+
+    assert await storage.prune_jobs(datetime.now() - timedelta(days=jobs.JOB_RETENTION_DAYS)) == ["old"]
+    assert [job['id'] for job in await storage.list_jobs(USER_ID, limit=10)] == ["old-unfinished"]
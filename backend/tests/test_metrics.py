@@ -0,0 +1,36 @@
+import pytest
+
+import auth
+from conftest import JWT_SECRET, make_token
+
+pytestmark = pytest.mark.anyio
+
+ADMIN_ID = "00000000-0000-0000-0000-0000000000ad"
+OPERATIONAL_PATHS = ["/api/metrics", "/api/cache/stats"]
+
+@pytest.fixture
+def signed_in(monkeypatch):
+    monkeypatch.setattr(auth, "SUPABASE_JWT_SECRET", JWT_SECRET)
+    monkeypatch.setattr(auth, "ADMIN_USER_IDS", {ADMIN_ID})
+    monkeypatch.setattr(auth, "METRICS_TOKEN", "scrape-secret")
+
+def bearer(token: str):
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.mark.parametrize("path", OPERATIONAL_PATHS)
+async def test_operational_endpoints_need_a_token(client, signed_in, path):
+    assert (await client.get(path)).status_code == 401
+    assert (await client.get(path, headers=bearer("wrong-secret"))).status_code == 401
+
+@pytest.mark.parametrize("path", OPERATIONAL_PATHS)
+async def test_signed_in_users_who_are_not_admins_are_refused(client, signed_in, path):
+    assert (await client.get(path, headers=bearer(make_token()))).status_code == 403
+
+@pytest.mark.parametrize("path", OPERATIONAL_PATHS)
+async def test_admins_and_the_metrics_token_are_let_in(client, signed_in, path):
+    assert (await client.get(path, headers=bearer(make_token(sub=ADMIN_ID)))).status_code == 200
+    assert (await client.get(path, headers=bearer("scrape-secret"))).status_code == 200
+
+async def test_metrics_token_is_ignored_when_unset(client, signed_in, monkeypatch):
+    monkeypatch.setattr(auth, "METRICS_TOKEN", None)
+    assert (await client.get("/api/metrics", headers=bearer("scrape-secret"))).status_code == 401
@@ -0,0 +1,98 @@
+import pytest
+
+from conftest import USER_ID, category_row
+from search import InvertedIndex, trigrams
+
+def ranked_ids(index: InvertedIndex, query: str):
+    return [doc_id for doc_id, _ in index.search(query)]
+
+def build_index(rows):
+    index = InvertedIndex()
+    for doc_id, text in rows:
+        index.add(doc_id, text)
+    return index
+
+def test_trigrams_are_padded_like_pg_trgm():
+    assert trigrams("cat") == {"  c", " ca", "cat", "at "}
+
+def test_exact_match_outranks_prefix_match_outranks_typo():
+    index = build_index([
+        ("typo", "Grocrey run"),
+        ("prefix", "Grocerystore haul"),
+        ("exact", "Grocery shopping"),
+        ("other", "Electricity bill"),
+    ])
+    assert ranked_ids(index, "grocery") == ["exact", "prefix", "typo"]
+
+def test_prefix_query_finds_longer_words():
+    index = build_index([("1", "Groceries"), ("2", "Gas station")])
+    assert ranked_ids(index, "groc") == ["1"]
+
+def test_misspelled_query_still_matches():
+    index = build_index([("1", "Restaurant dinner"), ("2", "Rent")])
+    assert ranked_ids(index, "resturant") == ["1"]
+
+def test_every_query_word_must_match():
+    index = build_index([
+        ("both", "Coffee beans"),
+        ("coffee", "Coffee shop"),
+        ("beans", "Green beans"),
+    ])
+    assert ranked_ids(index, "coffee beans") == ["both"]
+
+def test_rare_words_score_higher_and_ties_list_newest_first():
+    index = build_index([
+        ("old", "Amazon order"),
+        ("new", "Amazon order"),
+        ("rare", "Amazon kindle"),
+    ])
+    results = list(index.search("amazon kindle"))
+    assert [doc_id for doc_id, _ in results] == ["rare"]
+    assert ranked_ids(index, "amazon") == ["rare", "new", "old"]
+
+def test_reindexed_and_removed_rows_leave_their_postings():
+    index = build_index([("1", "Coffee"), ("2", "Tea")])
+    index.add("1", "Juice")
+    index.remove("2")
+
+    assert ranked_ids(index, "coffee") == []
+    assert ranked_ids(index, "tea") == []
+    assert ranked_ids(index, "juice") == ["1"]
+    assert len(index) == 1
+
+def test_blank_query_matches_nothing():
+    index = build_index([("1", "Coffee")])
+    assert ranked_ids(index, "  ") == []
+
+def transaction_row(transaction_id: str, category_id: str, description: str, amount: float = 10.0):
+    return {
+        "id": transaction_id,
+        "category_id": category_id,
+        "amount": amount,
+        "description": description,
+        "date": "2026-01-15T00:00:00",
+        "created_at": "2026-01-15T00:00:00",
+        "updated_at": "2026-01-15T00:00:00"
+    }
+
+@pytest.mark.anyio
+async def test_sqlite_search_ranks_and_scopes_to_the_user(storage):
+    category_id = "11111111-1111-1111-1111-111111111111"
+    await storage.create_category(USER_ID, category_row(category_id))
+    await storage.insert_transactions(USER_ID, [
+        transaction_row("t-typo", category_id, "Grocrey run"),
+        transaction_row("t-prefix", category_id, "Grocerystore haul", amount=50.0),
+        transaction_row("t-exact", category_id, "Grocery shopping"),
+    ])
+    other_category_id = "22222222-2222-2222-2222-222222222222"
+    await storage.create_category("someone-else", category_row(other_category_id))
+    await storage.insert_transactions("someone-else", [transaction_row("t-other", other_category_id, "Grocery")])
+
+    rows = await storage.search_transactions(USER_ID, "grocery", limit=10)
+    assert [row["id"] for row in rows] == ["t-exact", "t-prefix", "t-typo"]
+    assert rows[0]["rank"] > rows[1]["rank"] > rows[2]["rank"]
+
+    rows = await storage.search_transactions(USER_ID, "grocery", limit=1, offset=1)
+    assert [row["id"] for row in rows] == ["t-prefix"]
+    rows = await storage.search_transactions(USER_ID, "grocery", limit=10, min_amount=20)
+    assert [row["id"] for row in rows] == ["t-prefix"]
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from conftest import category_row
+from storage import to_datetime
+
+pytestmark = pytest.mark.anyio
+
+CATEGORY_ID = "11111111-1111-1111-1111-111111111111"
+
+def local_offset():
+    return datetime.now().astimezone().utcoffset()
+
+def test_to_datetime_converts_offsets_to_local_time():
+    expected = datetime(2026, 1, 15, 10, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert to_datetime("2026-01-15T12:00:00+02:00") == expected
+    assert to_datetime("2026-01-15T10:00:00Z") == expected
+    # Naive values are already on the local clock
+    assert to_datetime("2026-01-15T12:00:00") == datetime(2026, 1, 15, 12, 0)
+
+@pytest.fixture
+async def category(server_storage):
+    await server_storage.create_category(server.DEFAULT_USER_ID, category_row(CATEGORY_ID))
+
+async def test_since_with_a_utc_offset_names_an_instant(client, category):
+    since = datetime.now().astimezone() - timedelta(minutes=10)
+    response = await client.post("/api/transactions", json={
+        "category_id": CATEGORY_ID, "amount": 12.5, "description": "Lunch", "date": "2026-01-15T12:00:00"
+    })
+    assert response.status_code == 200
+    transaction_id = response.json()["id"]
+
+    # Ten minutes ago, written in a zone two hours ahead of this machine's: read as
+    # wall-clock time it would lie in the future and hide the write
+    ahead = timezone(local_offset() + timedelta(hours=2))
+    for watermark in (since.astimezone(ahead), since.astimezone(timezone.utc)):
+        response = await client.get("/api/transactions", params={"since": watermark.isoformat()})
+        assert response.status_code == 200
+        assert [row["id"] for row in response.json()["changed"]] == [transaction_id]
+
+        response = await client.get("/api/categories", params={"since": watermark.isoformat()})
+        assert response.status_code == 200
+        assert [row["id"] for row in response.json()["changed"]] == [CATEGORY_ID]
+
+async def test_issued_watermark_round_trips(client, category):
+    response = await client.get("/api/transactions", params={"since": datetime.now().isoformat()})
+    watermark = response.json()["watermark"]
+    await client.post("/api/transactions", json={
+        "category_id": CATEGORY_ID, "amount": 3, "description": "Coffee", "date": "2026-01-15T08:00:00"
+    })
+    response = await client.get("/api/transactions", params={"since": watermark})
+    assert [row["description"] for row in response.json()["changed"]] == ["Coffee"]
+
+async def test_watermark_past_the_deletion_history_is_gone(client, category):
+    since = datetime.now(timezone.utc) - timedelta(days=server.TOMBSTONE_RETENTION_DAYS + 1)
+    response = await client.get("/api/transactions", params={"since": since.isoformat()})
+    assert response.status_code == 410
@@ -0,0 +1,427 @@
+import requests
+import httpx
+import asyncio
+import json
+import time
+import statistics
+import argparse
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+# Get the backend URL from the frontend .env file
+import os
+from dotenv import load_dotenv
+
+# Load the frontend .env file to get the backend URL
+frontend_env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', '.env')
+load_dotenv(frontend_env_path)
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+BACKEND_URL = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001')
+
+# Colors for terminal output
+class Colors:
+    HEADER = '\033[95m'
+    OKBLUE = '\033[94m'
+    OKGREEN = '\033[92m'
+    WARNING = '\033[93m'
+    FAIL = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+def print_header(title):
+    print(f"\n{Colors.HEADER}{Colors.BOLD}Benchmark: {title}{Colors.ENDC}")
+
+def print_info(message):
+    print(f"{Colors.OKBLUE}ℹ {message}{Colors.ENDC}")
+
+def print_failure(message):
+    print(f"{Colors.FAIL}✗ {message}{Colors.ENDC}")
+
+# Local server: server.py on the SQLite storage backend, so no Supabase project is needed
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+async def seed_local_database(db_path, categories, transactions, days=730):
+    """Write benchmark data straight through the SQLite storage backend"""
+    sys.path.insert(0, BACKEND_DIR)
+    from sql_storage import SQLiteStorage
+    # The local server runs without a JWT secret, so every request acts as this user
+    from auth import DEFAULT_USER_ID
+
+    storage = SQLiteStorage(db_path)
+    await storage.startup()
+    try:
+        now = datetime.now()
+        category_ids = []
+        for i in range(categories):
+            category_id = str(uuid.uuid4())
+            await storage.create_category(DEFAULT_USER_ID, {
+                "id": category_id,
+                "name": f"bench-{i}",
+                "budget_amount": 1000.00,
+                "color": "#3B82F6",
+                "created_at": now.isoformat(),
+                "updated_at": now.isoformat()
+            })
+            category_ids.append(category_id)
+
+        batch = []
+        for i in range(transactions if category_ids else 0):
+            batch.append({
+                "id": str(uuid.uuid4()),
+                "category_id": random.choice(category_ids),
+                "amount": round(random.uniform(1, 200), 2),
+                "description": f"bench transaction {i}",
+                "date": (now - timedelta(days=random.uniform(0, days))).isoformat(),
+                "created_at": now.isoformat()
+            })
+            if len(batch) >= 5000:
+                await storage.insert_transactions(DEFAULT_USER_ID, batch)
+                batch = []
+        if batch:
+            await storage.insert_transactions(DEFAULT_USER_ID, batch)
+        return category_ids
+    finally:
+        await storage.shutdown()
+
+def start_local_server(db_path, port, cache=True):
+    env = dict(os.environ, STORAGE_BACKEND="sqlite", SQLITE_PATH=db_path)
+    if not cache:
+        env["CACHE_MAX_ENTRIES"] = "0"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Local server exited during startup")
+        try:
+            if requests.get(f"{base_url}/api", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Local server did not become healthy within 30s")
+
+def stop_local_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+# Latency statistics
+def percentile(sorted_timings, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_timings:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_timings))))
+    return sorted_timings[min(rank, len(sorted_timings)) - 1]
+
+def print_report(results):
+    print(f"\n{Colors.BOLD}{'endpoint':<34} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}{Colors.ENDC}")
+    for name, stats in results.items():
+        print(f"{name:<34} {stats['requests']:>6} {stats['errors']:>6} "
+              f"{stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} {stats['throughput']:>9.1f}")
+
+def summarize(timings, errors, elapsed):
+    timings = sorted(timings)
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "p99": percentile(timings, 99),
+        "throughput": (len(timings) / elapsed) if elapsed > 0 else 0
+    }
+
+# Load scenarios; each operation returns a list of (label, latency_ms, ok)
+async def timed(client, label, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    return response, (label, (time.perf_counter() - start) * 1000, ok)
+
+def read_scenario(label, path, params=None):
+    async def run(client, category_ids):
+        _, sample = await timed(client, label, "GET", path, params=params)
+        return [sample]
+    return run
+
+async def crud_scenario(client, category_ids):
+    samples = []
+    payload = {
+        "category_id": random.choice(category_ids),
+        "amount": round(random.uniform(1, 200), 2),
+        "description": "bench crud",
+        "date": datetime.now().isoformat()
+    }
+    response, sample = await timed(client, "POST /api/transactions", "POST", "/api/transactions", json=payload)
+    samples.append(sample)
+    if response is None or response.status_code >= 400:
+        return samples
+    transaction_id = response.json()["id"]
+    payload["amount"] += 1
+    _, sample = await timed(client, "PUT /api/transactions/{id}", "PUT", f"/api/transactions/{transaction_id}", json=payload)
+    samples.append(sample)
+    _, sample = await timed(client, "DELETE /api/transactions/{id}", "DELETE", f"/api/transactions/{transaction_id}")
+    samples.append(sample)
+    return samples
+
+SCENARIOS = {
+    "categories": read_scenario("GET /api/categories", "/api/categories"),
+    "dashboard": read_scenario("GET /api/dashboard", "/api/dashboard"),
+    "transactions": read_scenario("GET /api/transactions?limit=100", "/api/transactions", {"limit": 100}),
+    "crud": crud_scenario
+}
+
+async def run_scenario(base_url, scenario, operations, concurrency, category_ids):
+    """Run `operations` iterations of a scenario with `concurrency` workers"""
+    samples = []
+    remaining = iter(range(operations))
+
+    async def worker(client):
+        for _ in remaining:
+            samples.extend(await scenario(client, category_ids))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    by_label = {}
+    for label, latency, ok in samples:
+        timings, errors = by_label.setdefault(label, ([], [0]))
+        timings.append(latency)
+        errors[0] += 0 if ok else 1
+    return {label: summarize(timings, errors[0], elapsed) for label, (timings, errors) in by_label.items()}
+
+async def fetch_category_ids(base_url):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        response = await client.get("/api/categories")
+        response.raise_for_status()
+        return [category["id"] for category in response.json()]
+
+async def benchmark_load(base_url, scenarios, operations, concurrency):
+    print_header(f"Concurrent load ({concurrency} workers, {operations} operations per scenario)")
+    print_info(f"Using backend URL: {base_url}")
+    category_ids = await fetch_category_ids(base_url)
+    if "crud" in scenarios and not category_ids:
+        print_failure("Skipping crud scenario: no categories to attach transactions to")
+        scenarios = [name for name in scenarios if name != "crud"]
+
+    results = {}
+    for name in scenarios:
+        results.update(await run_scenario(base_url, SCENARIOS[name], operations, concurrency, category_ids))
+    print_report(results)
+    return results
+
+# Category scaling: seeds through the API so it also works against a remote server
+def seed_categories(api_url, count, transactions_per_category):
+    """Create `count` benchmark categories, each with a few transactions"""
+    category_ids = []
+    for i in range(count):
+        response = requests.post(f"{api_url}/categories", json={
+            "name": f"bench-{i}",
+            "budget_amount": 100.00,
+            "color": "#3B82F6"
+        })
+        response.raise_for_status()
+        category_id = response.json()["id"]
+        category_ids.append(category_id)
+        for j in range(transactions_per_category):
+            response = requests.post(f"{api_url}/transactions", json={
+                "category_id": category_id,
+                "amount": 1.00 + j,
+                "description": f"bench transaction {j}",
+                "date": "2024-01-01T00:00:00"
+            })
+            response.raise_for_status()
+    return category_ids
+
+def cleanup_categories(api_url, category_ids):
+    for category_id in category_ids:
+        requests.delete(f"{api_url}/categories/{category_id}")
+
+def time_endpoint(api_url, path, runs):
+    """Return the wall-clock latency in milliseconds of `runs` sequential GETs"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = requests.get(f"{api_url}{path}")
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return timings
+
+def benchmark_categories(base_url, steps, transactions_per_category, runs):
+    api_url = f"{base_url}/api"
+    print_header("GET /api/categories latency vs. category count")
+    print_info(f"Using backend URL: {base_url}")
+
+    seeded = []
+    rows = []
+    try:
+        for target in steps:
+            seeded += seed_categories(api_url, target - len(seeded), transactions_per_category)
+            timings = time_endpoint(api_url, "/categories", runs)
+            rows.append((target, statistics.median(timings), max(timings)))
+            print_info(f"{target} categories seeded, median {rows[-1][1]:.1f} ms")
+    finally:
+        cleanup_categories(api_url, seeded)
+
+    print(f"\n{Colors.BOLD}{'categories':>12} {'median ms':>12} {'max ms':>12}{Colors.ENDC}")
+    for count, median, worst in rows:
+        print(f"{count:>12} {median:>12.1f} {worst:>12.1f}")
+
+    # With the aggregated view the latency should stay roughly flat; a linear
+    # increase points at a per-category query creeping back in.
+    if len(rows) > 1 and rows[0][1] > 0:
+        growth = rows[-1][1] / rows[0][1]
+        color = Colors.OKGREEN if growth < 2 else Colors.WARNING
+        print(f"\n{color}Latency grew {growth:.2f}x from {rows[0][0]} to {rows[-1][0]} categories{Colors.ENDC}")
+    return rows
+
+# Serialization: in-process CPU time and bytes for the list payloads, no server needed
+def sample_payloads(transactions, categories):
+    """Rows shaped like the storage backends return them: JSON-ready dicts"""
+    now = datetime.now()
+    category_rows = []
+    for i in range(categories):
+        spent = round(random.uniform(0, 500), 2)
+        category_rows.append({
+            "id": str(uuid.uuid4()),
+            "name": f"bench-{i}",
+            "budget_amount": 400.0,
+            "color": "#3B82F6",
+            "total_spent": spent,
+            "remaining_budget": 400.0 - spent,
+            "percentage_used": spent / 4,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat()
+        })
+    transaction_rows = [{
+        "id": str(uuid.uuid4()),
+        "category_id": random.choice(category_rows)["id"],
+        "amount": round(random.uniform(1, 200), 2),
+        "description": f"bench transaction {i}",
+        "date": (now - timedelta(minutes=i)).isoformat(),
+        "created_at": now.isoformat(),
+        "updated_at": now.isoformat()
+    } for i in range(transactions)]
+    return transaction_rows, category_rows
+
+def cpu_ms(func, runs):
+    """Mean process CPU time of func() in milliseconds"""
+    start = time.process_time()
+    for _ in range(runs):
+        result = func()
+    return (time.process_time() - start) * 1000 / runs, result
+
+def benchmark_serialization(transactions, categories, runs):
+    os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+    os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.gettempdir(), "budget-bench-serialization.db"))
+    sys.path.insert(0, BACKEND_DIR)
+    from typing import List
+    from pydantic import TypeAdapter
+    from fastapi.encoders import jsonable_encoder
+    import server
+    from compression import STREAMS, brotli
+
+    print_header(f"Response serialization ({transactions} transactions, {categories} categories, {runs} runs)")
+    print_info(f"orjson: {'yes' if server.orjson else 'no'}, brotli: {'yes' if brotli else 'no'}")
+    transaction_rows, category_rows = sample_payloads(transactions, categories)
+    payloads = {
+        # Before: categories were validated against response_model, and every
+        # response went through jsonable_encoder and json.dumps
+        "GET /api/transactions": (transaction_rows, None),
+        "GET /api/categories": (category_rows, TypeAdapter(List[server.CategoryWithSpending]))
+    }
+
+    print(f"\n{Colors.BOLD}{'payload':<24} {'path':<16} {'cpu ms':>9} {'bytes':>10}{Colors.ENDC}")
+    for name, (rows, adapter) in payloads.items():
+        def before():
+            content = adapter.validate_python(rows) if adapter else rows
+            return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        def after():
+            return server.render_json(rows)[0]
+
+        results = [("before", *cpu_ms(before, runs)), ("after", *cpu_ms(after, runs))]
+        body = results[-1][2]
+        for encoding in [name for name in STREAMS if name != "br" or brotli is not None]:
+            elapsed, compressed = cpu_ms(lambda: STREAMS[encoding]().compress(body, final=True), runs)
+            results.append((f"after + {encoding}", results[1][1] + elapsed, compressed))
+        for label, elapsed, output in results:
+            print(f"{name:<24} {label:<16} {elapsed:>9.2f} {len(output):>10}")
+
+def run_benchmark(args):
+    if args.mode == "serialization":
+        benchmark_serialization(args.transactions, args.categories, args.runs)
+        return
+    process = None
+    base_url = args.url
+    workdir = None
+    try:
+        if not base_url:
+            workdir = tempfile.TemporaryDirectory(prefix="budget-bench-")
+            db_path = os.path.join(workdir.name, "bench.db")
+            if args.mode == "load":
+                print_info(f"Seeding {args.categories} categories and {args.transactions} transactions into {db_path}")
+                asyncio.run(seed_local_database(db_path, args.categories, args.transactions))
+            process, base_url = start_local_server(db_path, free_port(), cache=not args.no_cache)
+
+        if args.mode == "scaling":
+            steps = sorted(int(step) for step in args.steps.split(","))
+            benchmark_categories(base_url, steps, args.transactions_per_category, args.runs)
+        else:
+            scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+            asyncio.run(benchmark_load(base_url, scenarios, args.operations, args.concurrency))
+    finally:
+        if process is not None:
+            stop_local_server(process)
+        if workdir is not None:
+            workdir.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Budget Bubbles API latency benchmark")
+    parser.add_argument("mode", nargs="?", choices=["load", "scaling", "serialization"], default="load",
+                        help="load: concurrent latency per endpoint; scaling: GET /api/categories vs. category count; "
+                             "serialization: CPU time and bytes per list response")
+    parser.add_argument("--url", help=f"benchmark a running server (e.g. {BACKEND_URL}) instead of a local SQLite one")
+    parser.add_argument("--no-cache", action="store_true", help="disable the local server's read cache")
+    # load mode
+    parser.add_argument("--categories", type=int, default=50, help="categories seeded into the local database (or serialized)")
+    parser.add_argument("--transactions", type=int, default=20000, help="transactions seeded into the local database (or serialized)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--operations", type=int, default=500, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent client workers")
+    # scaling mode
+    parser.add_argument("--steps", default="10,50,200", help="comma-separated category counts to measure at")
+    parser.add_argument("--transactions-per-category", type=int, default=3, help="transactions seeded per category")
+    parser.add_argument("--runs", type=int, default=20, help="requests timed per step (or serializations per payload)")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios.split(",") if name.strip() and name.strip() not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    try:
+        run_benchmark(args)
+    except (requests.RequestException, httpx.HTTPError, RuntimeError) as e:
+        print_failure(f"Benchmark aborted: {str(e)}")
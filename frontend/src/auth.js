@@ -0,0 +1,59 @@
+import axios from 'axios';
+
+const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
+// supabase-js persists the signed-in session in localStorage as sb-<project ref>-auth-token
+const SUPABASE_URL = process.env.REACT_APP_SUPABASE_URL;
+
+const sessionStorageKey = () => {
+  if (!SUPABASE_URL) {
+    return null;
+  }
+  try {
+    return `sb-${new URL(SUPABASE_URL).hostname.split('.')[0]}-auth-token`;
+  } catch (err) {
+    return null;
+  }
+};
+
+// Access token of the signed-in Supabase user, or null when nobody is signed in
+// (the API then only answers if it runs without SUPABASE_JWT_SECRET)
+export const getAccessToken = () => {
+  try {
+    const wanted = sessionStorageKey();
+    const keys = wanted ? [wanted] : Object.keys(window.localStorage).filter(
+      key => key.startsWith('sb-') && key.endsWith('-auth-token')
+    );
+    for (const key of keys) {
+      const session = JSON.parse(window.localStorage.getItem(key) || 'null');
+      const token = session && (session.access_token || (session.currentSession && session.currentSession.access_token));
+      if (token) {
+        return token;
+      }
+    }
+  } catch (err) {
+    // Storage unavailable or holding something else; carry on unauthenticated
+  }
+  return null;
+};
+
+// EventSource cannot send headers, so the API also reads ?access_token=
+export const withAccessToken = (url) => {
+  const token = getAccessToken();
+  if (!token) {
+    return url;
+  }
+  return `${url}${url.includes('?') ? '&' : '?'}access_token=${encodeURIComponent(token)}`;
+};
+
+// Sends the current token with every API request; read per request so refreshed
+// sessions are picked up. Other hosts never see it.
+export const installAuthInterceptor = () => {
+  axios.interceptors.request.use((config) => {
+    const token = getAccessToken();
+    if (token && (config.url || '').startsWith(API_BASE_URL)) {
+      config.headers = config.headers || {};
+      config.headers.Authorization = `Bearer ${token}`;
+    }
+    return config;
+  });
+};
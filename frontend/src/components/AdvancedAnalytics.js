@@ -1,27 +1,24 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { useCategories } from '../contexts/CategoryContext';
 import {
   BarChart, Bar, XAxis, YAxis, Tooltip, ResponsiveContainer, LineChart, Line, CartesianGrid, Legend,
 } from 'recharts';
 
-// Helper to generate dummy monthly trend data
-function getMonthlyTrend(categories) {
-  // For demo, just sum total spent per month for the last 6 months
-  const now = new Date();
-  const months = Array.from({ length: 6 }, (_, i) => {
-    const d = new Date(now.getFullYear(), now.getMonth() - (5 - i), 1);
-    return d.toLocaleString('default', { month: 'short', year: '2-digit' });
+// Helper to turn the server's monthly series into chart points
+function getMonthlyTrend(series) {
+  return series.map(point => {
+    const [year, month] = point.bucket.split('-').map(Number);
+    const d = new Date(year, month - 1, 1);
+    return {
+      month: d.toLocaleString('default', { month: 'short', year: '2-digit' }),
+      spent: Math.round(point.total_spent),
+    };
   });
-  // Dummy: spread total spent randomly
-  const totalSpent = categories.reduce((sum, cat) => sum + cat.total_spent, 0);
-  return months.map((m, i) => ({
-    month: m,
-    spent: Math.round((totalSpent / 6) * (0.8 + 0.4 * Math.random())),
-  }));
 }
 
 const AdvancedAnalytics = () => {
-  const { categories } = useCategories();
+  const { categories, getSpendingSeries } = useCategories();
+  const [trendSeries, setTrendSeries] = useState([]);
   const overspent = categories.filter(cat => cat.percentage_used > 100);
   const topOverspent = overspent.sort((a, b) => b.percentage_used - a.percentage_used).slice(0, 3);
 
@@ -32,8 +29,15 @@ const AdvancedAnalytics = () => {
     budget: cat.budget_amount,
   }));
 
-  // Line chart data: monthly trend (dummy)
-  const trendData = getMonthlyTrend(categories);
+  // Line chart data: monthly trend, bucketed by the backend.
+  // Refetched whenever categories reload, i.e. after any spending change.
+  useEffect(() => {
+    getSpendingSeries({ interval: 'month' })
+      .then(data => setTrendSeries(data.series))
+      .catch(() => setTrendSeries([]));
+  }, [categories]);
+
+  const trendData = getMonthlyTrend(trendSeries);
 
   return (
     <div className="max-w-4xl mx-auto bg-white rounded-xl shadow-lg p-6 mt-6">
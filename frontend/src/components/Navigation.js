@@ -1,11 +1,16 @@
 import React, { useState, useRef } from 'react';
 import { Link, useLocation } from 'react-router-dom';
-import { Home, Plus, CreditCard, List, Circle, FolderOpen, BarChart2, DollarSign, User, Settings as SettingsIcon } from 'lucide-react';
+import { Home, Plus, CreditCard, List, Circle, FolderOpen, BarChart2, DollarSign, User, Bell, Settings as SettingsIcon } from 'lucide-react';
+import { useCategories } from '../contexts/CategoryContext';
 
 const Navigation = () => {
   const location = useLocation();
   const [analyticsOpen, setAnalyticsOpen] = useState(false);
   const analyticsRef = useRef(null);
+  const [alertsOpen, setAlertsOpen] = useState(false);
+  const alertsRef = useRef(null);
+  const { notifications, markNotificationsRead } = useCategories();
+  const unreadCount = notifications.filter(alert => !alert.read).length;
 
   const isActive = (path) => {
     return location.pathname === path;
@@ -17,6 +22,9 @@ const Navigation = () => {
       if (analyticsRef.current && !analyticsRef.current.contains(event.target)) {
         setAnalyticsOpen(false);
       }
+      if (alertsRef.current && !alertsRef.current.contains(event.target)) {
+        setAlertsOpen(false);
+      }
     }
     document.addEventListener('mousedown', handleClickOutside);
     return () => {
@@ -156,6 +164,55 @@ const Navigation = () => {
               )}
             </div>
 
+            {/* Budget Alerts Dropdown */}
+            <div className="relative" ref={alertsRef}>
+              <button
+                onClick={() => setAlertsOpen((open) => !open)}
+                className="relative flex items-center px-3 py-2 rounded-lg text-gray-600 hover:bg-gray-100 transition-colors"
+              >
+                <Bell className="w-4 h-4" />
+                {unreadCount > 0 && (
+                  <span className="absolute -top-1 -right-1 min-w-[1.25rem] h-5 px-1 rounded-full bg-red-500 text-white text-xs flex items-center justify-center">
+                    {unreadCount}
+                  </span>
+                )}
+              </button>
+              {alertsOpen && (
+                <div className="absolute right-0 mt-2 w-80 bg-white border border-gray-200 rounded-lg shadow-lg z-50">
+                  <div className="flex items-center justify-between px-4 py-2 border-b border-gray-100">
+                    <span className="font-semibold text-gray-800">Budget alerts</span>
+                    {unreadCount > 0 && (
+                      <button
+                        onClick={() => markNotificationsRead()}
+                        className="text-sm text-blue-600 hover:text-blue-800"
+                      >
+                        Mark all read
+                      </button>
+                    )}
+                  </div>
+                  {notifications.length === 0 ? (
+                    <div className="px-4 py-6 text-center text-sm text-gray-500">No alerts</div>
+                  ) : (
+                    <div className="max-h-80 overflow-y-auto">
+                      {notifications.slice(0, 20).map((alert) => (
+                        <div
+                          key={alert.id}
+                          className={`px-4 py-2 border-b border-gray-50 text-sm ${alert.read ? 'text-gray-500' : 'text-gray-800'}`}
+                        >
+                          <div className="font-medium">
+                            {alert.category_name} passed {alert.threshold}% of its budget
+                          </div>
+                          <div className="text-xs text-gray-500">
+                            ${alert.total_spent.toFixed(2)} of ${alert.budget_amount.toFixed(2)} ({alert.percentage_used.toFixed(0)}%)
+                          </div>
+                        </div>
+                      ))}
+                    </div>
+                  )}
+                </div>
+              )}
+            </div>
+
             {/* Profile Button */}
             <Link
               to="/profile"
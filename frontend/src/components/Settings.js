@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
+import { useCategories } from '../contexts/CategoryContext';
 
 const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 const CURRENCIES = ['USD', 'EUR', 'GBP', 'JPY', 'CAD'];
@@ -26,6 +27,7 @@ const Settings = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [notifyMsg, setNotifyMsg] = useState('');
+  const { fetchNotifications } = useCategories();
 
   // Dark mode effect
   useEffect(() => {
@@ -63,6 +65,8 @@ const Settings = () => {
         setSettings(res.data);
         setSaved(true);
         setLoading(false);
+        // Budget alerts are only listed while notifications are on
+        fetchNotifications();
         if (settings.notifications) {
           setNotifyMsg('Notifications enabled!');
           setTimeout(() => setNotifyMsg(''), 2000);
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useCategories } from '../contexts/CategoryContext';
 import { Link } from 'react-router-dom';
-import { Edit2, Trash2, Plus, Calendar, DollarSign, Filter } from 'lucide-react';
+import { Edit2, Trash2, Plus, Calendar, DollarSign, Filter, Search } from 'lucide-react';
 import { format } from 'date-fns';
 
 const TransactionList = () => {
@@ -10,22 +10,56 @@ const TransactionList = () => {
     categories, 
     deleteTransaction, 
     loading,
-    fetchTransactions
+    fetchTransactions,
+    searchTransactions
   } = useCategories();
   
   const [filteredTransactions, setFilteredTransactions] = useState([]);
   const [selectedCategory, setSelectedCategory] = useState('');
   const [sortBy, setSortBy] = useState('date');
   const [sortOrder, setSortOrder] = useState('desc');
+  const [searchQuery, setSearchQuery] = useState('');
+  // Ranked matches from the search endpoint; null when not searching
+  const [searchResults, setSearchResults] = useState(null);
 
+  // Search on the server once typing pauses, so large ledgers never load in full
   useEffect(() => {
-    let filtered = [...transactions];
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const { results } = await searchTransactions({ q: query, category_id: selectedCategory || undefined });
+        if (!cancelled) {
+          setSearchResults(results);
+        }
+      } catch (error) {
+        console.error('Error searching transactions:', error);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, selectedCategory, transactions]);
+
+  useEffect(() => {
+    let filtered = [...(searchResults || transactions)];
 
     // Filter by category
     if (selectedCategory) {
       filtered = filtered.filter(transaction => transaction.category_id === selectedCategory);
     }
 
+    // Search results keep the server's ranking unless another order is picked
+    if (searchResults && sortBy === 'relevance') {
+      setFilteredTransactions(filtered);
+      return;
+    }
+
     // Sort transactions
     filtered.sort((a, b) => {
       let aValue, bValue;
@@ -56,7 +90,7 @@ const TransactionList = () => {
     });
 
     setFilteredTransactions(filtered);
-  }, [transactions, selectedCategory, sortBy, sortOrder]);
+  }, [transactions, searchResults, selectedCategory, sortBy, sortOrder]);
 
   const handleDeleteTransaction = async (transactionId) => {
     if (window.confirm('Are you sure you want to delete this transaction?')) {
@@ -103,6 +137,24 @@ const TransactionList = () => {
 
         {/* Filters and sorting */}
         <div className="flex flex-wrap gap-4 mb-6">
+          <div className="flex items-center space-x-2">
+            <Search className="w-4 h-4 text-gray-500" />
+            <input
+              type="search"
+              value={searchQuery}
+              onChange={(e) => {
+                if (!searchQuery.trim() && e.target.value.trim()) {
+                  setSortBy('relevance');
+                } else if (!e.target.value.trim() && sortBy === 'relevance') {
+                  setSortBy('date');
+                }
+                setSearchQuery(e.target.value);
+              }}
+              placeholder="Search descriptions"
+              className="px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
+            />
+          </div>
+
           <div className="flex items-center space-x-2">
             <Filter className="w-4 h-4 text-gray-500" />
             <select
@@ -126,6 +178,7 @@ const TransactionList = () => {
               onChange={(e) => setSortBy(e.target.value)}
               className="px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
             >
+              {searchResults && <option value="relevance">Relevance</option>}
               <option value="date">Date</option>
               <option value="amount">Amount</option>
               <option value="description">Description</option>
@@ -161,7 +214,9 @@ const TransactionList = () => {
               No transactions found
             </h3>
             <p className="text-gray-600 mb-4">
-              {selectedCategory ? 'No transactions for this category' : 'Start by adding your first transaction'}
+              {searchResults
+                ? 'No transactions match your search'
+                : selectedCategory ? 'No transactions for this category' : 'Start by adding your first transaction'}
             </p>
             <Link
               to="/transactions/new"
@@ -1,8 +1,17 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { withAccessToken } from '../auth';
 
 const CategoryContext = createContext();
 
+const TRANSACTIONS_PAGE_SIZE = 1000;
+// Wait before reopening an event stream the browser gave up on
+const EVENTS_RECONNECT_MS = 5000;
+
+// Newest first, matching the API's (date, id) ordering
+const compareTransactions = (a, b) =>
+  a.date === b.date ? (a.id < b.id ? 1 : -1) : (a.date < b.date ? 1 : -1);
+
 export const useCategories = () => {
   const context = useContext(CategoryContext);
   if (!context) {
@@ -16,6 +25,14 @@ export const CategoryProvider = ({ children }) => {
   const [transactions, setTransactions] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  // Budget threshold alerts, newest first
+  const [notifications, setNotifications] = useState([]);
+  // Where the next ?since= sync of the full transaction list starts; null means reload
+  const transactionsWatermark = useRef(null);
+  // Category the loaded transactions are filtered to, if any
+  const transactionsCategory = useRef(null);
+  // True while the /api/events stream is connected; writes then arrive as pushed changes
+  const liveUpdates = useRef(false);
 
   const API_BASE_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 
@@ -34,16 +51,97 @@ export const CategoryProvider = ({ children }) => {
     }
   };
 
+  // Prepend alerts not seen yet; a write's response and its pushed event carry the same ones
+  const addNotifications = (alerts = []) => {
+    if (!alerts.length) {
+      return;
+    }
+    setNotifications(current => {
+      const known = new Set(current.map(alert => alert.id));
+      return alerts.filter(alert => !known.has(alert.id)).concat(current);
+    });
+  };
+
+  // Fetch budget alerts (empty while notifications are turned off in settings)
+  const fetchNotifications = async () => {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/notifications`);
+      setNotifications(response.data);
+    } catch (err) {
+      console.error('Error fetching notifications:', err);
+    }
+  };
+
+  // Mark the given alerts read, or all of them without ids
+  const markNotificationsRead = async (ids = null) => {
+    try {
+      const response = await axios.post(`${API_BASE_URL}/api/notifications/read`, { ids });
+      const read = new Set(response.data.read);
+      setNotifications(current => current.map(alert => (read.has(alert.id) ? { ...alert, read: true } : alert)));
+    } catch (err) {
+      console.error('Error marking notifications read:', err);
+    }
+  };
+
+  // Apply only what changed since the last full load; returns false if the server asks for a reload
+  const syncTransactions = async () => {
+    let changes;
+    let watermark = transactionsWatermark.current;
+    const changed = new Map();
+    let deleted = new Set();
+    try {
+      do {
+        const response = await axios.get(`${API_BASE_URL}/api/transactions`, {
+          params: { since: watermark, limit: TRANSACTIONS_PAGE_SIZE }
+        });
+        changes = response.data;
+        changes.changed.forEach(transaction => changed.set(transaction.id, transaction));
+        deleted = new Set([...deleted, ...changes.deleted]);
+        watermark = changes.watermark;
+      } while (changes.has_more);
+    } catch (err) {
+      if (err.response && err.response.status === 410) {
+        return false;
+      }
+      throw err;
+    }
+    transactionsWatermark.current = watermark;
+    setTransactions(current => {
+      const kept = current.filter(t => !deleted.has(t.id) && !changed.has(t.id));
+      const updated = [...changed.values()].filter(t => !deleted.has(t.id));
+      return kept.concat(updated).sort(compareTransactions);
+    });
+    return true;
+  };
+
   // Fetch transactions
   const fetchTransactions = async (categoryId = null) => {
     setLoading(true);
     setError(null);
     try {
-      const url = categoryId 
-        ? `${API_BASE_URL}/api/transactions?category_id=${categoryId}`
-        : `${API_BASE_URL}/api/transactions`;
-      const response = await axios.get(url);
-      setTransactions(response.data);
+      // The full list is kept current with delta syncs once it has been loaded
+      if (!categoryId && transactionsWatermark.current && await syncTransactions()) {
+        return;
+      }
+      // The API pages by keyset; follow X-Next-Cursor until the last page
+      const params = { limit: TRANSACTIONS_PAGE_SIZE };
+      if (categoryId) {
+        params.category_id = categoryId;
+      }
+      let allTransactions = [];
+      let cursor = null;
+      let watermark = null;
+      do {
+        const response = await axios.get(`${API_BASE_URL}/api/transactions`, {
+          params: cursor ? { ...params, cursor } : params
+        });
+        allTransactions = allTransactions.concat(response.data);
+        watermark = watermark || response.headers['x-sync-watermark'];
+        cursor = response.headers['x-next-cursor'];
+      } while (cursor);
+      setTransactions(allTransactions);
+      transactionsWatermark.current = categoryId ? null : watermark;
+      transactionsCategory.current = categoryId;
     } catch (err) {
       setError('Failed to fetch transactions');
       console.error('Error fetching transactions:', err);
@@ -52,13 +150,81 @@ export const CategoryProvider = ({ children }) => {
     }
   };
 
+  // Merge categories with fresh spending into the list by id, dropping deleted ones
+  const mergeCategories = (changed, deleted = []) => {
+    const deletedCategories = new Set(deleted);
+    const changedCategories = new Map(changed.map(category => [category.id, category]));
+    setCategories(current => {
+      const merged = current
+        .filter(category => !deletedCategories.has(category.id))
+        .map(category => changedCategories.get(category.id) || category);
+      const known = new Set(merged.map(category => category.id));
+      const added = changed.filter(category => !known.has(category.id) && !deletedCategories.has(category.id));
+      return merged.concat(added);
+    });
+  };
+
+  // After a write, reload only when no change event will arrive for it. Single-row
+  // writes answer with the affected categories' new spending, which is merged directly.
+  const refreshAfterWrite = async ({ transactions: withTransactions = true, categories, deletedCategories } = {}) => {
+    if (liveUpdates.current) {
+      return;
+    }
+    if (categories || deletedCategories) {
+      mergeCategories(categories || [], deletedCategories);
+    } else {
+      await fetchCategories();
+    }
+    if (withTransactions) {
+      await fetchTransactions(transactionsCategory.current);
+    }
+  };
+
+  // Apply a change event from /api/events; updates carry only changed fields, merged by id
+  const applyChangeEvent = (event) => {
+    if (event.type === 'resync') {
+      fetchCategories();
+      fetchTransactions(transactionsCategory.current);
+      return;
+    }
+    if (event.type === 'budget.alert') {
+      addNotifications(event.alerts);
+      return;
+    }
+    // Only data changes carry rows; others (job.finished, ...) are not for this context
+    if (!Array.isArray(event.categories)) {
+      return;
+    }
+    const deletedCategories = new Set(event.deleted_categories);
+    mergeCategories(event.categories, event.deleted_categories);
+
+    if (event.resync.includes('transactions')) {
+      fetchTransactions(transactionsCategory.current);
+      return;
+    }
+    const deletedTransactions = new Set(event.deleted_transactions);
+    const changedTransactions = new Map(event.transactions.map(transaction => [transaction.id, transaction]));
+    const filter = transactionsCategory.current;
+    setTransactions(current => {
+      const merged = current
+        .filter(t => !deletedTransactions.has(t.id) && !deletedCategories.has(t.category_id))
+        .map(t => (changedTransactions.has(t.id) ? { ...t, ...changedTransactions.get(t.id) } : t));
+      const known = new Set(merged.map(t => t.id));
+      const added = event.transactions.filter(t => !known.has(t.id) && t.created_at);
+      return merged
+        .concat(added)
+        .filter(t => !filter || t.category_id === filter)
+        .sort(compareTransactions);
+    });
+  };
+
   // Create category
   const createCategory = async (categoryData) => {
     setLoading(true);
     setError(null);
     try {
       const response = await axios.post(`${API_BASE_URL}/api/categories`, categoryData);
-      await fetchCategories(); // Refresh categories
+      await refreshAfterWrite({ transactions: false, categories: response.data.categories });
       return response.data;
     } catch (err) {
       setError('Failed to create category');
@@ -75,7 +241,8 @@ export const CategoryProvider = ({ children }) => {
     setError(null);
     try {
       const response = await axios.put(`${API_BASE_URL}/api/categories/${id}`, categoryData);
-      await fetchCategories(); // Refresh categories
+      await refreshAfterWrite({ transactions: false, categories: response.data.categories });
+      addNotifications(response.data.alerts);
       return response.data;
     } catch (err) {
       setError('Failed to update category');
@@ -92,7 +259,7 @@ export const CategoryProvider = ({ children }) => {
     setError(null);
     try {
       await axios.delete(`${API_BASE_URL}/api/categories/${id}`);
-      await fetchCategories(); // Refresh categories
+      await refreshAfterWrite({ transactions: false, deletedCategories: [id] });
     } catch (err) {
       setError('Failed to delete category');
       console.error('Error deleting category:', err);
@@ -108,8 +275,8 @@ export const CategoryProvider = ({ children }) => {
     setError(null);
     try {
       const response = await axios.post(`${API_BASE_URL}/api/transactions`, transactionData);
-      await fetchCategories(); // Refresh categories to update spending
-      await fetchTransactions(); // Refresh transactions
+      await refreshAfterWrite({ categories: response.data.categories }); // New spending comes back with the write
+      addNotifications(response.data.alerts);
       return response.data;
     } catch (err) {
       setError('Failed to create transaction');
@@ -126,8 +293,8 @@ export const CategoryProvider = ({ children }) => {
     setError(null);
     try {
       const response = await axios.put(`${API_BASE_URL}/api/transactions/${id}`, transactionData);
-      await fetchCategories(); // Refresh categories to update spending
-      await fetchTransactions(); // Refresh transactions
+      await refreshAfterWrite({ categories: response.data.categories }); // New spending comes back with the write
+      addNotifications(response.data.alerts);
       return response.data;
     } catch (err) {
       setError('Failed to update transaction');
@@ -143,9 +310,9 @@ export const CategoryProvider = ({ children }) => {
     setLoading(true);
     setError(null);
     try {
-      await axios.delete(`${API_BASE_URL}/api/transactions/${id}`);
-      await fetchCategories(); // Refresh categories to update spending
-      await fetchTransactions(); // Refresh transactions
+      const response = await axios.delete(`${API_BASE_URL}/api/transactions/${id}`);
+      await refreshAfterWrite({ categories: response.data.categories }); // New spending comes back with the write
+      addNotifications(response.data.alerts);
     } catch (err) {
       setError('Failed to delete transaction');
       console.error('Error deleting transaction:', err);
@@ -171,6 +338,29 @@ export const CategoryProvider = ({ children }) => {
     }
   };
 
+  // Get spending bucketed by day/week/month; params: interval, start_date, end_date, category_id, by_category
+  const getSpendingSeries = async (params = {}) => {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/analytics/spending`, { params });
+      return response.data;
+    } catch (err) {
+      console.error('Error fetching spending series:', err);
+      throw err;
+    }
+  };
+
+  // Search descriptions server-side; params: q, category_id, start_date, end_date,
+  // min_amount, max_amount, limit, cursor. Results are ranked best match first.
+  const searchTransactions = async (params = {}) => {
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/transactions/search`, { params });
+      return { results: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+    } catch (err) {
+      console.error('Error searching transactions:', err);
+      throw err;
+    }
+  };
+
   // Helper function to get category by ID
   const getCategoryById = (id) => {
     return categories.find(cat => cat.id === id);
@@ -185,6 +375,43 @@ export const CategoryProvider = ({ children }) => {
   useEffect(() => {
     fetchCategories();
     fetchTransactions();
+    fetchNotifications();
+  }, []);
+
+  // Live changes from this and other tabs or devices
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') {
+      return undefined;
+    }
+    let source = null;
+    let retryTimer = null;
+    const connect = (reconnected) => {
+      source = new EventSource(withAccessToken(`${API_BASE_URL}/api/events`));
+      source.onopen = () => {
+        liveUpdates.current = true;
+        if (reconnected) {
+          // A fresh stream has no Last-Event-ID to replay from
+          applyChangeEvent({ type: 'resync' });
+          reconnected = false;
+        }
+      };
+      source.onerror = () => {
+        // EventSource reconnects on its own; refetch after writes until it does
+        liveUpdates.current = false;
+        // It gives up on HTTP errors, e.g. a 401 once the token in the URL expired;
+        // start over with the current token
+        if (source.readyState === EventSource.CLOSED) {
+          retryTimer = setTimeout(() => connect(true), EVENTS_RECONNECT_MS);
+        }
+      };
+      source.onmessage = (message) => applyChangeEvent(JSON.parse(message.data));
+    };
+    connect(false);
+    return () => {
+      liveUpdates.current = false;
+      clearTimeout(retryTimer);
+      source.close();
+    };
   }, []);
 
   const contextValue = {
@@ -192,6 +419,7 @@ export const CategoryProvider = ({ children }) => {
     transactions,
     loading,
     error,
+    notifications,
     fetchCategories,
     fetchTransactions,
     createCategory,
@@ -201,6 +429,10 @@ export const CategoryProvider = ({ children }) => {
     updateTransaction,
     deleteTransaction,
     getDashboardData,
+    getSpendingSeries,
+    searchTransactions,
+    fetchNotifications,
+    markNotificationsRead,
     getCategoryById,
     getTransactionsByCategory,
     setError // Allow components to clear errors